@@ -18,22 +18,83 @@ import logging
 eps = 1e-7
 logger = logging.getLogger(__name__)
 
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+
+def _sim_step_numpy(w0, p0, w1, y1, cost, time_cost, out):
+    """
+    Vectorised PortfolioSim step over a batch of episodes.
+
+    w0, w1 - (batch, assets + 1) previous and new portfolio weights
+    p0 - (batch,) previous portfolio value
+    y1 - (batch, assets + 1) price relative vector
+    out - (3, batch) preallocated buffer, filled with [p1, c1, r1]
+    """
+    growth = (y1 * w0).sum(axis=1)
+    dw1 = (y1 * w0) / (growth + eps)[:, None]  # (eq7) weights evolve into
+
+    # (eq16) cost to change portfolio
+    # (excluding change in cash to avoid double counting for transaction cost)
+    c1 = cost * np.abs(dw1[:, 1:] - w1[:, 1:]).sum(axis=1)
+
+    p1 = p0 * (1 - c1) * growth * (1 - time_cost)  # (eq11) final portfolio value
+    np.clip(p1, 0, np.inf, out=out[0])  # no shorts in this model
+    out[1] = c1
+    out[2] = np.log((out[0] + eps) / (p0 + eps))  # (eq10) log rate of return
+    return out
+
+
+def _sim_step_loop(w0, p0, w1, y1, cost, time_cost, out):
+    """Same as _sim_step_numpy, written as plain loops for numba."""
+    batch, width = w0.shape
+    for b in range(batch):
+        growth = 0.0
+        for i in range(width):
+            growth += y1[b, i] * w0[b, i]
+
+        c1 = 0.0
+        for i in range(1, width):
+            c1 += abs(y1[b, i] * w0[b, i] / (growth + eps) - w1[b, i])
+        c1 *= cost
+
+        p1 = p0[b] * (1 - c1) * growth * (1 - time_cost)
+        if p1 < 0:
+            p1 = 0.0
+
+        out[0, b] = p1
+        out[1, b] = c1
+        out[2, b] = np.log((p1 + eps) / (p0[b] + eps))
+    return out
+
+
+# compiled step kernel if numba is installed, otherwise the numpy version
+sim_step = njit(cache=True)(_sim_step_loop) if njit else _sim_step_numpy
+
 
 class DataSrc(object):
     """Acts as data provider for each new episode."""
 
-    def __init__(self, df, steps=252, scale=True, scale_extra_cols=True, augment=0.00, window_length=50, random_reset=True):
+    price_columns = ['close', 'high', 'low', 'open']
+
+    def __init__(self, df, steps=252, scale=True, scale_extra_cols=True, augment=0.00, window_length=50, random_reset=True,
+                 asset_names=None, features=None, times=None, reuse_buffer=False):
         """
         DataSrc.
 
-        df - csv for data frame index of timestamps
+        df - data frame index of timestamps
              and multi-index columns levels=[['LTCBTC'],...],['open','low','high','close',...]]
-             an example is included as an hdf file in this repository
+             an example is included as an hdf file in this repository,
+             or a raw tensor of shape (assets, times, features)
         steps - total steps in episode
         scale - scale the data for each episode
         scale_extra_cols - scale extra columns by global mean and std
         augment - fraction to augment the data by
         random_reset - reset to a random time (otherwise continue through time)
+        asset_names, features, times - labels of the tensor axes, only used for raw tensor input
+        reuse_buffer - return history in a buffer that is overwritten on next step, instead of a new array
         """
         self.steps = steps + 1
         self.augment = augment
@@ -41,64 +102,68 @@ class DataSrc(object):
         self.scale = scale
         self.scale_extra_cols = scale_extra_cols
         self.window_length = window_length
+        self.reuse_buffer = reuse_buffer
         self.idx = self.window_length
 
-        # get rid of NaN's
-        df = df.copy()
-        df.replace(np.nan, 0, inplace=True)
-        df = df.fillna(method="pad")
+        self._load(df, asset_names, features, times)
 
-        # dataframe to matrix
-        self.asset_names = df.columns.levels[0].tolist()
-        self.features = df.columns.levels[1].tolist()
-        data = df.as_matrix().reshape(
-            (len(df), len(self.asset_names), len(self.features)))
-        self._data = np.transpose(data, (1, 0, 2))
-        self._times = df.index
-
-        self.price_columns = ['close', 'high', 'low', 'open']
-        self.non_price_columns = set(
-            df.columns.levels[1]) - set(self.price_columns)
+        self.non_price_columns = set(self.features) - set(self.price_columns)
 
         # Stats to let us normalize non price columns
         if scale_extra_cols:
             x = self._data.reshape((-1, len(self.features)))
             self.stats = dict(mean=x.mean(0), std=x.std(0))
-            # for column in self._data.columns.levels[1].tolist():
-            #     x = df.xs(key=column, axis=1, level='Price').as_matrix()[:, :]
-            #     self.stats["mean"].append(x.mean())
-            #      = dict(mean=x.mean(), std=x.std())
 
+        self._history = None
         self.reset()
 
+    def _load(self, df, asset_names=None, features=None, times=None):
+        """Load a multi-index data frame or a raw tensor into (assets, times, features) array."""
+        if isinstance(df, pd.DataFrame):
+            # get rid of NaN's
+            df = df.replace(np.nan, 0).ffill()
+
+            # dataframe to matrix
+            self.asset_names = df.columns.levels[0].tolist()
+            self.features = df.columns.levels[1].tolist()
+            data = df.to_numpy(dtype=np.float64).reshape(
+                (len(df), len(self.asset_names), len(self.features)))
+            self._data = np.ascontiguousarray(np.transpose(data, (1, 0, 2)))
+            self._times = df.index
+        else:
+            data = np.nan_to_num(np.asarray(df, dtype=np.float64))
+            assert data.ndim == 3, 'raw tensor should have shape (assets, times, features)'
+            self._data = data
+            self.asset_names = list(asset_names) if asset_names is not None else [
+                'asset_%d' % i for i in range(data.shape[0])]
+            self.features = list(features) if features is not None else \
+                self.price_columns + ['feature_%d' % i for i in range(data.shape[2] - len(self.price_columns))]
+            self._times = pd.Index(times) if times is not None else pd.RangeIndex(data.shape[1])
+
     def _step(self):
-        # get history matrix from dataframe
-        data_window = self.data[:, self.step:self.step +
-                                self.window_length].copy()
+        # history window is a view of the normalised episode data, no copy needed
+        start = self.step
+        window = self.norm_data[:, start:start + self.window_length]
 
-        # (eq.1) prices
-        y1 = data_window[:, -1, 0] / data_window[:, -2, 0]
-        y1 = np.concatenate([[1.0], y1])  # add cash price
+        # (eq.1) prices, precomputed on reset
+        y1 = self.returns[start + self.window_length - 1]
 
         # (eq 18) X: prices are divided by close price
-        nb_pc = len(self.price_columns)
         if self.scale:
-            last_close_price = data_window[:, -1, 0]
-            data_window[:, :, :nb_pc] /= last_close_price[:,
-                                                          np.newaxis, np.newaxis]
-
-        if self.scale_extra_cols:
-            # normalize non price columns
-            data_window[:, :, nb_pc:] -= self.stats["mean"][None, None, nb_pc:]
-            data_window[:, :, nb_pc:] /= self.stats["std"][None, None, nb_pc:]
-            data_window[:, :, nb_pc:] = np.clip(
-                data_window[:, :, nb_pc:],
-                self.stats["mean"][nb_pc:] - self.stats["std"][nb_pc:] * 10,
-                self.stats["mean"][nb_pc:] + self.stats["std"][nb_pc:] * 10
-            )
+            nb_pc = len(self.price_columns)
+            if self.reuse_buffer:
+                history = self._history
+            else:
+                history = np.empty_like(window)
+            last_close_price = window[:, -1, 0]
+            np.divide(window[:, :, :nb_pc], last_close_price[:, np.newaxis, np.newaxis], out=history[:, :, :nb_pc])
+            history[:, :, nb_pc:] = window[:, :, nb_pc:]
+        elif self.reuse_buffer:
+            history = window
+        else:
+            history = window.copy()
 
         self.step += 1
-        history = data_window
         done = bool(self.step >= self.steps)
 
         return history, y1, done
@@ -122,9 +187,32 @@ class DataSrc(object):
                                  self.window_length:self.idx + self.steps + 1]
 
         # augment data to prevent overfitting
-        data += np.random.normal(loc=0, scale=self.augment, size=data.shape)
+        if self.augment:
+            data += np.random.normal(loc=0, scale=self.augment, size=data.shape)
 
         self.data = data
+        self._prepare()
+
+    def _prepare(self):
+        """Precompute price relatives and normalised extra columns of the episode once."""
+        close = self.data[:, :, 0]
+        self.returns = np.ones((close.shape[1], close.shape[0] + 1))
+        self.returns[1:, 1:] = (close[:, 1:] / close[:, :-1]).T
+
+        norm_data = self.data
+        if self.scale_extra_cols:
+            # normalize non price columns
+            nb_pc = len(self.price_columns)
+            mean = self.stats["mean"][nb_pc:]
+            std = self.stats["std"][nb_pc:]
+            norm_data = self.data.copy()
+            norm_data[:, :, nb_pc:] -= mean
+            norm_data[:, :, nb_pc:] /= std
+            np.clip(norm_data[:, :, nb_pc:], mean - std * 10, mean + std * 10, out=norm_data[:, :, nb_pc:])
+        self.norm_data = norm_data
+
+        if self.reuse_buffer and self.scale:
+            self._history = np.empty((self.data.shape[0], self.window_length, self.data.shape[2]))
 
 
 class PortfolioSim(object):
@@ -142,6 +230,12 @@ class PortfolioSim(object):
         self.time_cost = time_cost
         self.steps = steps
         self.asset_names = asset_names
+        self.info_names = ['BTCBTC'] + list(asset_names)
+
+        # preallocated buffers of the step kernel, batch size is 1
+        self._w0 = np.zeros((1, len(asset_names) + 1))
+        self._p0 = np.zeros(1)
+        self._out = np.zeros((3, 1))
         self.reset()
 
     def _step(self, w1, y1):
@@ -153,25 +247,14 @@ class PortfolioSim(object):
             e.g. [1.0, 0.9, 1.1]
         Numbered equations are from https://arxiv.org/abs/1706.10059
         """
-        w0 = self.w0
         p0 = self.p0
+        self._w0[0] = self.w0
+        self._p0[0] = p0
 
-        dw1 = (y1 * w0) / (np.dot(y1, w0) + eps)  # (eq7) weights evolve into
-
-        # (eq16) cost to change portfolio
-        # (excluding change in cash to avoid double counting for transaction cost)
-        c1 = self.cost * (
-            np.abs(dw1[1:] - w1[1:])).sum()
-
-        p1 = p0 * (1 - c1) * np.dot(y1, w0)  # (eq11) final portfolio value
-
-        p1 = p1 * (1 - self.time_cost)  # we can add a cost to holding
-
-        # can't have negative holdings in this model (no shorts)
-        p1 = np.clip(p1, 0, np.inf)
+        sim_step(self._w0, self._p0, w1[np.newaxis], y1[np.newaxis], self.cost, self.time_cost, self._out)
+        p1, c1, r1 = float(self._out[0, 0]), float(self._out[1, 0]), float(self._out[2, 0])
 
         rho1 = p1 / p0 - 1  # rate of returns
-        r1 = np.log((p1 + eps) / (p0 + eps))  # (eq10) log rate of return
         # (eq22) immediate reward is log rate of return scaled by episode length
         reward = r1 / self.steps
 
@@ -194,7 +277,7 @@ class PortfolioSim(object):
             "cost": c1,
         }
         # record weights and prices
-        for i, name in enumerate(['BTCBTC'] + self.asset_names):
+        for i, name in enumerate(self.info_names):
             info['weight_' + name] = w1[i]
             info['price_' + name] = y1[i]
 
@@ -207,6 +290,42 @@ class PortfolioSim(object):
         self.p0 = 1.0
 
 
+class BatchPortfolioSim(object):
+    """
+    Portfolio management sim stepping many episodes at once with the compiled kernel.
+
+    Keeps weights and values as (episodes, assets + 1) and (episodes,) arrays,
+    no per-episode info dict is recorded.
+    """
+
+    def __init__(self, n_episodes, asset_names=[], steps=128, trading_cost=0.0025, time_cost=0.0):
+        self.n_episodes = n_episodes
+        self.cost = trading_cost
+        self.time_cost = time_cost
+        self.steps = steps
+        self.asset_names = asset_names
+        self._out = np.zeros((3, n_episodes))
+        self.reset()
+
+    def _step(self, w1, y1):
+        """
+        w1, y1 - (episodes, assets + 1) weights and price relatives
+        return reward, portfolio value and done arrays of shape (episodes,)
+        """
+        sim_step(self.w0, self.p0, w1, y1, self.cost, self.time_cost, self._out)
+
+        reward = self._out[2] / self.steps
+        self.w0[:] = w1
+        self.p0[:] = self._out[0]
+
+        return reward, self.p0.copy(), self.p0 == 0
+
+    def reset(self):
+        self.w0 = np.zeros((self.n_episodes, len(self.asset_names) + 1))
+        self.w0[:, 0] = 1.0
+        self.p0 = np.ones(self.n_episodes)
+
+
 class PortfolioEnv(gym.Env):
     """
     An environment for financial portfolio management.
@@ -230,7 +349,8 @@ class PortfolioEnv(gym.Env):
                  log_dir=None,
                  scale=True,
                  scale_extra_cols=True,
-                 random_reset=True
+                 random_reset=True,
+                 reuse_buffer=False
                  ):
         """
         An environment for financial portfolio management.
@@ -250,10 +370,11 @@ class PortfolioEnv(gym.Env):
             log_dir: directory to save plots to
             scale - scales price data by last opening price on each episode (except return)
             scale_extra_cols - scales non price data using mean and std for whole dataset
+            reuse_buffer - observation["history"] is overwritten on next step, copy it if it must be kept
         """
         self.src = DataSrc(df=df, steps=steps, scale=scale, scale_extra_cols=scale_extra_cols,
                            augment=augment, window_length=window_length,
-                           random_reset=random_reset)
+                           random_reset=random_reset, reuse_buffer=reuse_buffer)
         self._plot = self._plot2 = self._plot3 = None
         self.output_mode = output_mode
         self.sim = PortfolioSim(
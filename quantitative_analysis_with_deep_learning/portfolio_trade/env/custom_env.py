@@ -78,11 +78,12 @@ from gym.spaces import Box, Dict
 import pandas as pd 
 import numpy as np 
 import arrow
-import random
 from sklearn.metrics import mean_squared_error as MSE
 
 from utils.data_process import DataProcessor 
+from utils.tools import telemetry, DEBUG
 from vnpy.trader.constant import Status, Direction
+from vnpy.trader.utility import SimulationClock
 
 # 买卖
 BUY = Direction.LONG
@@ -92,16 +93,19 @@ SUBMIT = Status.SUBMITTING
 TRADE = Status.ALLTRADED
 CANCEL = Status.CANCELLED
 REJECT = Status.REJECTED
+# 未指定模拟时钟时使用的全局默认时钟
+default_clock = SimulationClock()
 
 class Order(object):
     """
     订单类
     """
-    def __init__(self, stock_symbol, direction, price, volume, status):
+    def __init__(self, stock_symbol, direction, price, volume, status, orderid=None):
         """
-        
+        参数：
+            orderid，订单号，由模拟时钟SimulationClock生成，未指定时使用全局默认时钟
         """
-        self.orderid = arrow.now().format('YYYYMMDD-HHmmss-SSSSSS')
+        self.orderid = orderid if orderid is not None else default_clock.new_id()
         self.stock = stock_symbol
         self.direction = direction
         self.price = price
@@ -252,7 +256,7 @@ class QuotationManager(object):
             try:
                 quote = v[v.index >= window_start].iloc[:self.window_len]
             except Exception as e:
-                print(e)
+                telemetry.warning('quotation_error', str(e), stock=k, date=current_date)
 
             window_quotation.append(quote.values)
 
@@ -270,7 +274,7 @@ class QuotationManager(object):
             try:
                 prediction = v[v.index > current_date].iloc[0]
             except Exception as e:
-                print(e)
+                telemetry.warning('prediction_error', str(e), stock=k, date=current_date)
 
             # 将有效数据列放入window中
             prediction_list.append(prediction[self.prediction_col].values)
@@ -287,7 +291,7 @@ class QuotationManager(object):
             try:
                 high_low = v[['daily_high', 'daily_low', 'daily_open', 'daily_close']].loc[current_date]
             except Exception as e:
-                print(e)
+                telemetry.warning('high_low_error', str(e), stock=k, date=current_date)
             high_low['stock'] = k
             high_low_price[k] = high_low
 
@@ -306,7 +310,9 @@ class PortfolioManager(object):
                         start_trade_date=None,
                         stop_trade_date=None,
                         window_len=32,
-                        save=True
+                        save=True,
+                        seed=0,
+                        log_every=5
                         ):
         """
         参数：
@@ -317,6 +323,8 @@ class PortfolioManager(object):
             tax_rate，交易税率
             start_trade_date，开始交易时间
             window_len，观察窗口长度
+            seed，随机种子，决定订单号和下单顺序，相同种子的回测可以完全复现
+            log_every，资产向量的输出采样间隔，仅在telemetry开启DEBUG级别时输出
 
         """
         self.config = config
@@ -328,6 +336,7 @@ class PortfolioManager(object):
         self.stop_trade_date = stop_trade_date
         self.window_len = window_len
         self.save = save
+        self.log_every = log_every
 
         self.date_col = config['data']['date_col']
         self.target_col = config['data']['target']
@@ -336,6 +345,9 @@ class PortfolioManager(object):
 
         self.metadata = {'render.modes':['human',]}
 
+        # 模拟时钟，生成与模拟日期绑定的订单号
+        self.clock = SimulationClock(seed)
+
         self._reset(start_trade_date)
 
 
@@ -372,6 +384,7 @@ class PortfolioManager(object):
 
         # 获取今日价格
         P1 = self.get_price_vector(step_date)
+        self.clock.update(step_date)
 
         # 首先处理存量订单，计算手续费，更新V1
         for stock,order in self.order_list.items():
@@ -399,11 +412,12 @@ class PortfolioManager(object):
         A1 = P1 * V1
         W1 = A1 / A1.sum()
 
-        # 输出成交的订单情况
-        for stock,his_order in order_history.items():
-            order_info = his_order.get_info()
-            if order_info['status'] == TRADE:
-                self.print_order(order_info, V1 * P1, step_date)
+        # 输出成交的订单情况，训练时默认关闭
+        if telemetry.is_enabled(DEBUG):
+            for stock,his_order in order_history.items():
+                order_info = his_order.get_info()
+                if order_info['status'] == TRADE:
+                    self.print_order(order_info, V1 * P1, step_date)
 
         # 清空订单列表
         self.order_list = {}
@@ -422,7 +436,7 @@ class PortfolioManager(object):
 
         # 计算订单，计算顺序为随机的，避免头部的资产频繁交易但尾部资产无法交易
         trade_tuple = [i for i in zip(self.stock_list, delta_A[1:], offer_price[1:], V1[1:])]
-        random.shuffle(trade_tuple)
+        self.clock.random.shuffle(trade_tuple)
 
         for stock_i, delta_A_i, Offer_i, V_i in trade_tuple:
             # 买卖方向，使用long表示买 使用short表示卖
@@ -434,17 +448,20 @@ class PortfolioManager(object):
                 if direction == SELL:
                     # 卖出的量不能大于持仓
                     volume = V_i if volume > V_i else volume
-                    order = Order(stock_symbol=stock_i, direction=SELL, price=price, volume=volume, status=SUBMIT)
+                    order = Order(stock_symbol=stock_i, direction=SELL, price=price, volume=volume, status=SUBMIT,
+                                  orderid=self.clock.new_id())
                     self.order_list[stock_i] = order
                 # 买入股票需要由足够的position
                 if direction == BUY:
                     if position >= price * volume: # 资金足够
-                        order = Order(stock_symbol=stock_i, direction=BUY, price=price, volume=volume, status=SUBMIT)
+                        order = Order(stock_symbol=stock_i, direction=BUY, price=price, volume=volume, status=SUBMIT,
+                                      orderid=self.clock.new_id())
                         self.order_list[stock_i] = order
                         position = position - price * volume
                     else:
                         # 资金不够，被拒绝的订单也增加到列表中，便于记录
-                        order = Order(stock_symbol=stock_i, direction=BUY, price=price, volume=volume, status=REJECT)
+                        order = Order(stock_symbol=stock_i, direction=BUY, price=price, volume=volume, status=REJECT,
+                                      orderid=self.clock.new_id())
                         self.order_list[stock_i] = order
 
         # 尝试的总步数
@@ -509,10 +526,9 @@ class PortfolioManager(object):
                             }
         }
 
-        # 打印资产向量，逢5日打印一次
-        if step_date.day % 5 == 0:
-            print("日期：%s" %step_date.strftime('%Y%m%d'))
-            self.print_portfolio(info)
+        # 打印资产向量，按log_every采样输出，训练时默认关闭
+        if telemetry.is_enabled(DEBUG):
+            self.print_portfolio(info, step_date)
 
         # 如果损失大于阈值，则中断
         if accumulated_reward < 0.9:
@@ -538,6 +554,8 @@ class PortfolioManager(object):
         self.infos = []
         # 订单列表，存储次日的订单
         self.order_list = {}
+        # 重置模拟时钟，保证每个episode的订单号和下单顺序可以复现
+        self.clock.reset(step_date)
         # 定义价格向量
         self.P0 = self.get_price_vector(step_date)
         # 定义持有量向量
@@ -558,7 +576,7 @@ class PortfolioManager(object):
             try:
                 price = history[self.target_col].loc[current_date]
             except Exception as e:
-                print(e)
+                telemetry.warning('price_error', str(e), stock=stock, date=current_date)
             price_list.append(price)
 
         P = np.array([[1.0] + price_list]).reshape((-1))
@@ -614,7 +632,7 @@ class PortfolioManager(object):
         volume = order_info['volume']
         status = "SUCCESS" if order_info['status'] == TRADE else "CANCEL" if order_info['status'] == CANCEL else "REJECT"
 
-        print(
+        msg = " ".join([
             "日期 : " + step_date.strftime("%Y-%m-%d") + "|",
             #"订单号 : " + orderid + "|",
             "股票 : " + stock + "|",
@@ -623,9 +641,11 @@ class PortfolioManager(object):
             "交易额 : " + str('%.2f' %(volume * price)) + "|",
             # "订单状态 : " + status + "|",
             "总资产 :  " + str('%.2f' %A.sum()) + "|"
-        )
+        ])
+        telemetry.debug('order', msg, orderid=orderid, stock=stock, direction=direction.strip(),
+                        price=price, volume=volume, status=status, total_asset=A.sum())
 
-    def print_portfolio(self, info):
+    def print_portfolio(self, info, step_date):
         """"""
         total = info['total_asset']
         portfolio = info['asset_vector']['A1']
@@ -634,9 +654,12 @@ class PortfolioManager(object):
         asset_list = ['Position'] + self.stock_list
 
         assert len(portfolio) == len(asset_list)
+        lines = ["日期：%s" %step_date.strftime('%Y%m%d')]
         for a,p,v,pr in zip(asset_list, portfolio, volume, price):
-            print(a, ':\t', str(p), '\t 持有量：', v, '\t 现价：', pr)
-        print('Total: %f' %total)
+            lines.append('%s :\t %s \t 持有量： %s \t 现价： %s' %(a, p, v, pr))
+        lines.append('Total: %f' %total)
+        telemetry.debug('portfolio', '\n'.join(lines), every=self.log_every,
+                        date=step_date, total_asset=total)
 
 
 
@@ -658,13 +681,15 @@ class Portfolio_Prediction_Env(gym.GoalEnv):
                     window_len=1, 
                     start_trade_date=None,
                     stop_trade_date=None,
-                    save=True):
+                    save=True,
+                    seed=0):
         """
         参数：
             config, 配置文件
             calender, 交易日历 datetime对象的list
             stock_history, 股价历史数据
             prediction_history，预测历史数据
+            seed，随机种子，相同种子下回测结果可以逐位复现
 
         说明：
             1.模拟环境在交易日收盘之后运行，预测未来价格，并做出投资决策
@@ -723,7 +748,8 @@ class Portfolio_Prediction_Env(gym.GoalEnv):
                                                 window_len=window_len,
                                                 start_trade_date=self.decision_daterange[0],
                                                 stop_trade_date=self.decision_daterange[-1],
-                                                save=save)
+                                                save=save,
+                                                seed=seed)
         # 定义行为空间，offer的scale为100
         action_space_shape = [(self.n_asset + 1) * 2,]
         action_space_low = np.array([0.0] * (self.n_asset + 1) + [-10.0]* (self.n_asset + 1))
@@ -825,6 +851,15 @@ class Portfolio_Prediction_Env(gym.GoalEnv):
         else:
             return obs
 
+    def seed(self, seed=None):
+        """
+        设置模拟时钟的随机种子，下次reset后生效
+        """
+        seed = 0 if seed is None else seed
+        self.portfolio_mgr.clock.reset(seed=seed)
+
+        return [seed]
+
     def compute_reward(self, achieved_goal, desired_goal, info):
         """
         使用achieved_goal，desired_goal计算出reward，必须与环境step中得到的reward一致
@@ -867,7 +902,7 @@ class Portfolio_Prediction_Env(gym.GoalEnv):
                 info_df = pd.DataFrame({k:v for k,v in info.items() if k in statistics_keys}, index=[info['current_date']])
                 statistics_df = pd.concat((statistics_df, info_df), axis=0, ignore_index=False)
             except Exception as e:
-                print(e)
+                telemetry.warning('save_history_error', str(e))
                 pass
 
         order_df = pd.DataFrame()
@@ -881,7 +916,7 @@ class Portfolio_Prediction_Env(gym.GoalEnv):
                     info_df = pd.DataFrame(keys, index=[0])
                     order_df = pd.concat((order_df, info_df), axis=0, ignore_index=True)
             except Exception as e:
-                print(e)
+                telemetry.warning('save_history_error', str(e))
                 pass
 
         portfolio_df = pd.DataFrame()
@@ -894,7 +929,7 @@ class Portfolio_Prediction_Env(gym.GoalEnv):
                 info_df = pd.DataFrame(flatten_keys, index=[info['current_date']])
                 portfolio_df = pd.concat((portfolio_df, info_df), axis=0, ignore_index=False)
             except Exception as e:
-                print(e)
+                telemetry.warning('save_history_error', str(e))
 
         now = arrow.now().format('YYYYMMDD-HHmmss')
         save_path = os.path.join(sys.path[0], 'output')
@@ -903,7 +938,7 @@ class Portfolio_Prediction_Env(gym.GoalEnv):
         order_df.to_csv(os.path.join(save_path, 'order_' + tag + '_' + now + '.csv'))
         portfolio_df.to_csv(os.path.join(save_path, 'portfolio_' + tag + '_' + now + '.csv'))
 
-        print('Env trading status %s is saved to %s' %(tag, save_path))
+        telemetry.info('save_history', 'Env trading status %s is saved to %s' %(tag, save_path), tag=tag, path=save_path)
 
         return statistics_df, order_df, portfolio_df
 
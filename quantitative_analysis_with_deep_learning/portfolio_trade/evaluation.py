@@ -0,0 +1,265 @@
+"""
+    决策模型的离线批量评估
+
+    加载保存的策略，在多个日期区间和股票组合上并行回放，同一进程内的多个环境同步前进，
+    将观察向量堆叠后一次调用predict，最后汇总每个区间的收益、夏普、最大回撤、换手率和成交率，
+    并与上证50指数（000016.SH）对比。
+
+    用法：
+        windows = [{'start_date': '20190102', 'stop_date': '20190628'},
+                   {'start_date': '20190701', 'stop_date': '20191231', 'stock_code': [...]}]
+        table = evaluate_policy(model_path, windows, config, calender, history, predict_results_dict,
+                                reference=load_reference_index(output_path))
+"""
+import copy
+import multiprocessing
+import numpy as np
+import pandas as pd
+import arrow
+
+from portfolio_trade.env.custom_env import Portfolio_Prediction_Env, sharpe, TRADE
+from utils.tools import search_file, telemetry
+
+# 以上证50为参考
+REFERENCE_INDEX = '000016.SH'
+
+METRIC_COLUMNS = ['start_date', 'stop_date', 'stock_code', 'steps', 'total_return', 'annual_return', 'sharpe',
+                  'max_drawdown', 'turnover', 'fill_ratio', 'reference_return', 'reference_max_drawdown',
+                  'excess_return']
+
+
+def load_model(model_name, model_path):
+    """
+    加载stable_baselines模型，仅用于预测，不需要环境
+    """
+    from stable_baselines import DDPG, TD3, HER
+
+    model_class = {'DDPG': DDPG, 'TD3': TD3, 'HER': HER}[model_name]
+    return model_class.load(model_path)
+
+
+def load_reference_index(path, name=REFERENCE_INDEX):
+    """
+    读取参考指数的日线，与test/plot_decision.py相同，以trade_date转换后的date为索引
+    """
+    ref_index = search_file(path, name)
+    ref_index = pd.read_csv(ref_index[0], index_col=0)
+    ref_index = ref_index.set_index(pd.Series([arrow.get(str(i), 'YYYYMMDD').date()
+                                               for i in ref_index['trade_date'].values]))
+    return ref_index.sort_index()
+
+
+def drawdown(values):
+    """
+    向量化的最大回撤率，与custom_env.max_drawdown结果一致
+    """
+    values = np.asarray(values, dtype=float)
+    if len(values) == 0:
+        return 0.0
+    peak = np.maximum.accumulate(values)
+    return float(((peak - values) / peak).max())
+
+
+def flatten_obs(obs):
+    """GoalEnv的字典观察按HERGoalEnvWrapper的方式拼接为向量"""
+    if isinstance(obs, dict):
+        return np.concatenate([obs['observation'], obs['achieved_goal'], obs['desired_goal']])
+    return obs
+
+
+def make_env(window, config, calender, history, predict_results_dict):
+    """
+    按区间和股票组合创建交易环境
+
+    参数：
+        window，dict，包括start_date, stop_date, 可选stock_code（股票组合，数量需与训练时一致）
+        config，配置文件
+        calender，交易日历
+        history，与config['data']['stock_code']顺序一致的行情列表
+        predict_results_dict，预测结果，与train_decision相同，以股票代码为键
+    """
+    stock_code = config['data']['stock_code']
+    subset = window.get('stock_code') or stock_code
+
+    env_config = copy.deepcopy(config)
+    env_config['data']['stock_code'] = list(subset)
+    env_history = [history[stock_code.index(st)] for st in subset]
+
+    predict_dict = {}
+    for st in subset:
+        v = predict_results_dict[st]
+        if isinstance(v['predict_date'].iloc[0], str):
+            tmp = v['predict_date'].apply(lambda x: arrow.get(x, 'YYYY-MM-DD').date())
+            v = v.rename(index=tmp)
+        predict_dict[st] = v
+
+    return Portfolio_Prediction_Env(config=env_config,
+                                    calender=calender,
+                                    stock_history=env_history,
+                                    window_len=1,
+                                    prediction_history=predict_dict,
+                                    start_trade_date=window['start_date'],
+                                    stop_trade_date=window['stop_date'],
+                                    save=False,
+                                    seed=window.get('seed', 0))
+
+
+def run_windows(model, envs, max_steps=1000, deterministic=True):
+    """
+    同步回放一组环境，每步将未结束环境的观察堆叠后批量predict
+
+    返回每个环境的infos列表
+    """
+    obs = [flatten_obs(env.reset()) for env in envs]
+    active = list(range(len(envs)))
+
+    for _ in range(max_steps):
+        if not active:
+            break
+        actions, _states = model.predict(np.stack([obs[i] for i in active]), deterministic=deterministic)
+
+        still_active = []
+        for i, action in zip(active, actions):
+            o, reward, done, info = envs[i].step(action)
+            obs[i] = flatten_obs(o)
+            if not done:
+                still_active.append(i)
+        active = still_active
+
+    return [env.infos for env in envs]
+
+
+def window_metrics(infos, init_asset, reference=None, freq=250, rfr=0.02):
+    """
+    由环境的infos计算单个区间的评估指标
+
+    参数：
+        infos，环境的info列表，第一个为reset时的info
+        init_asset，初始资产
+        reference，参考指数日线，包括close列
+        freq，年化交易日数
+        rfr，年化无风险利率
+    """
+    infos = [i for i in infos if 'total_asset' in i]
+    dates = [i['current_date'] for i in infos]
+    total_asset = np.array([init_asset] + [i['total_asset'] for i in infos], dtype=float)
+    returns = total_asset[1:] / total_asset[:-1] - 1
+
+    # 成交额和订单数
+    traded_value = 0.0
+    n_orders = 0
+    n_traded = 0
+    for info in infos:
+        for order in info['order_history'].values():
+            n_orders += 1
+            if order.status == TRADE:
+                n_traded += 1
+                traded_value += order.price * order.volume
+
+    total_return = total_asset[-1] / total_asset[0] - 1
+    steps = len(infos)
+    metrics = {
+        'start_date': dates[0] if dates else None,
+        'stop_date': dates[-1] if dates else None,
+        'steps': steps,
+        'total_return': total_return,
+        'annual_return': (1 + total_return) ** (freq / max(steps, 1)) - 1,
+        'sharpe': sharpe(returns, freq=freq, rfr=rfr / freq) if steps else 0.0,
+        'max_drawdown': drawdown(total_asset),
+        'turnover': traded_value / total_asset.mean(),
+        'fill_ratio': n_traded / n_orders if n_orders else np.nan,
+        'reference_return': np.nan,
+        'reference_max_drawdown': np.nan,
+    }
+
+    if reference is not None and dates:
+        close = reference['close'].loc[dates[0]:dates[-1]].values
+        if len(close) > 0:
+            metrics['reference_return'] = close[-1] / close[0] - 1
+            metrics['reference_max_drawdown'] = drawdown(close)
+    metrics['excess_return'] = metrics['total_return'] - metrics['reference_return']
+
+    return metrics
+
+
+class _Worker(object):
+    """
+    评估进程的状态，由进程池的initializer创建，模型和行情在每个进程中只加载一次
+    """
+    instance = None
+
+    def __init__(self, model_name, model_path, config, calender, history, predict_results_dict, reference, max_steps):
+        self.model = load_model(model_name, model_path)
+        self.config = config
+        self.calender = calender
+        self.history = history
+        self.predict_results_dict = predict_results_dict
+        self.reference = reference
+        self.max_steps = max_steps
+
+    @classmethod
+    def init(cls, *args):
+        cls.instance = cls(*args)
+
+    @classmethod
+    def evaluate(cls, windows):
+        return cls.instance.run(windows)
+
+    def run(self, windows):
+        envs = [make_env(w, self.config, self.calender, self.history, self.predict_results_dict) for w in windows]
+        results = []
+        for w, env, infos in zip(windows, envs, run_windows(self.model, envs, self.max_steps)):
+            metrics = window_metrics(infos, env.init_asset, self.reference)
+            metrics['stock_code'] = ','.join(env.stock_list)
+            metrics['window'] = w
+            results.append(metrics)
+        return results
+
+
+def evaluate_policy(model_path,
+                    windows,
+                    config,
+                    calender,
+                    history,
+                    predict_results_dict,
+                    model_name='DDPG',
+                    reference=None,
+                    processes=None,
+                    batch_size=16,
+                    max_steps=1000):
+    """
+    并行评估保存的策略，返回每个区间一行的指标表
+
+    参数：
+        model_path，保存的模型文件
+        windows，区间列表，每个元素为dict：start_date, stop_date, 可选stock_code, seed
+        config, calender, history, predict_results_dict，与train_decision相同
+        model_name，DDPG TD3 HER
+        reference，load_reference_index读取的参考指数
+        processes，进程数，默认为CPU核数
+        batch_size，每个进程同步回放的环境数，即每次predict的batch大小
+        max_steps，每个区间的最大步数
+    """
+    # 数据区间不足一个窗口时没有可评估的区间
+    if not windows:
+        return pd.DataFrame(columns=METRIC_COLUMNS + ['window'])
+
+    batches = [windows[i:i + batch_size] for i in range(0, len(windows), batch_size)]
+    processes = min(processes or multiprocessing.cpu_count(), len(batches))
+
+    telemetry.info('evaluate_policy', 'Evaluating %d windows in %d batches with %d processes'
+                   % (len(windows), len(batches), processes), windows=len(windows), processes=processes)
+
+    initargs = (model_name, model_path, config, calender, history, predict_results_dict, reference, max_steps)
+    if processes <= 1:
+        _Worker.init(*initargs)
+        results = [_Worker.evaluate(b) for b in batches]
+    else:
+        # 使用spawn，避免fork已经初始化的tensorflow会话
+        ctx = multiprocessing.get_context('spawn')
+        with ctx.Pool(processes, initializer=_Worker.init, initargs=initargs) as pool:
+            results = pool.map(_Worker.evaluate, batches)
+
+    rows = [metrics for batch in results for metrics in batch]
+    table = pd.DataFrame(rows)
+    return table[METRIC_COLUMNS + ['window']]
@@ -0,0 +1,330 @@
+import os
+import json
+import glob
+import numpy as np
+import pandas as pd
+from multiprocessing import shared_memory
+
+from utils.tools import telemetry
+
+
+class ReplayBuffer(object):
+    """
+    可持久化的经验回放池，数据保存在一块连续内存中，支持三种存储方式：
+        1.进程内的numpy数组（默认）
+        2.磁盘上的内存映射文件（path），可以在多次训练之间保存和加载
+        3.共享内存（shm_name），rollout进程写入，learner进程采样
+
+    内存布局：[头部 (next_idx, n_entries)] + obs + action + reward + obs_tp1 + done
+    """
+    HEADER = 2
+    FILE_NAME = 'buffer.bin'
+    META_NAME = 'meta.json'
+
+    def __init__(self, size, obs_shape, action_shape, path=None, shm_name=None, create=True, lock=None):
+        """
+        参数：
+            size，回放池容量，写满后覆盖最早的经验
+            obs_shape，观察向量的形状
+            action_shape，行为向量的形状
+            path，内存映射文件的目录，为None时不落盘
+            shm_name，共享内存名称，create=True且为None时自动生成
+            create，创建新的存储，False时挂载已有的文件或共享内存
+            lock，多进程写入时使用的multiprocessing.Lock，单进程写入时可以为None
+        """
+        self.size = int(size)
+        self.obs_shape = tuple(obs_shape)
+        self.action_shape = tuple(action_shape)
+        self.path = path
+        self.lock = lock
+        self._shm = None
+        self._mmap = None
+
+        self.fields = [
+            ('obs', self.obs_shape),
+            ('action', self.action_shape),
+            ('reward', ()),
+            ('obs_tp1', self.obs_shape),
+            ('done', ()),
+        ]
+        nbytes = self.HEADER * 8 + sum(self.size * int(np.prod(shape)) * 4 for _, shape in self.fields)
+
+        if path is not None:
+            if create:
+                os.makedirs(path, exist_ok=True)
+                self._write_meta()
+            self._mmap = np.memmap(os.path.join(path, self.FILE_NAME), dtype=np.uint8,
+                                   mode='w+' if create else 'r+', shape=(nbytes,))
+            raw = self._mmap
+        elif shm_name is not None:
+            self._shm = shared_memory.SharedMemory(name=shm_name, create=create, size=nbytes if create else 0)
+            raw = self._shm.buf
+        else:
+            raw = np.zeros(nbytes, dtype=np.uint8)
+        self._bind(raw, reset=create)
+
+    def _bind(self, raw, reset):
+        """在原始内存上建立各个字段的数组视图"""
+        self.header = np.ndarray((self.HEADER,), dtype=np.int64, buffer=raw, offset=0)
+        offset = self.HEADER * 8
+        for name, shape in self.fields:
+            array = np.ndarray((self.size,) + shape, dtype=np.float32, buffer=raw, offset=offset)
+            setattr(self, name, array)
+            offset += array.nbytes
+        if reset:
+            self.header[:] = 0
+
+    def _write_meta(self):
+        meta = {'size': self.size, 'obs_shape': list(self.obs_shape), 'action_shape': list(self.action_shape)}
+        with open(os.path.join(self.path, self.META_NAME), 'w') as f:
+            json.dump(meta, f)
+
+    @classmethod
+    def load(cls, path, lock=None):
+        """
+        挂载保存在path中的回放池，数据不会被复制，写入直接落到映射文件上
+        """
+        with open(os.path.join(path, cls.META_NAME)) as f:
+            meta = json.load(f)
+        return cls(meta['size'], meta['obs_shape'], meta['action_shape'], path=path, create=False, lock=lock)
+
+    @classmethod
+    def shared(cls, size, obs_shape, action_shape, lock=None):
+        """
+        创建一个共享内存回放池，通过spec在其他进程中挂载
+        """
+        name = 'replay_%d_%d' % (os.getpid(), np.random.randint(1 << 30))
+        return cls(size, obs_shape, action_shape, shm_name=name, create=True, lock=lock)
+
+    @classmethod
+    def from_spec(cls, spec, lock=None):
+        """
+        在子进程中按spec挂载同一块存储（共享内存或映射文件）
+        """
+        return cls(spec['size'], spec['obs_shape'], spec['action_shape'],
+                   path=spec['path'], shm_name=spec['shm_name'], create=False, lock=lock)
+
+    @property
+    def spec(self):
+        """可以pickle的存储描述，传给rollout进程"""
+        return {
+            'size': self.size,
+            'obs_shape': self.obs_shape,
+            'action_shape': self.action_shape,
+            'path': self.path,
+            'shm_name': self._shm.name if self._shm is not None else None,
+        }
+
+    def __len__(self):
+        return int(self.header[1])
+
+    @property
+    def buffer_size(self):
+        return self.size
+
+    def is_full(self):
+        return len(self) == self.size
+
+    def can_sample(self, n_samples):
+        return len(self) >= n_samples
+
+    def _reserve(self, n):
+        """预留n个写入位置，返回位置索引，多进程写入时加锁"""
+        if self.lock is not None:
+            self.lock.acquire()
+        try:
+            start = int(self.header[0])
+            self.header[0] = (start + n) % self.size
+            self.header[1] = min(int(self.header[1]) + n, self.size)
+        finally:
+            if self.lock is not None:
+                self.lock.release()
+        return np.arange(start, start + n) % self.size
+
+    def add(self, obs_t, action, reward, obs_tp1, done):
+        """添加一条经验"""
+        idx = self._reserve(1)[0]
+        self.obs[idx] = obs_t
+        self.action[idx] = action
+        self.reward[idx] = reward
+        self.obs_tp1[idx] = obs_tp1
+        self.done[idx] = done
+
+    def extend(self, obs_t, action, reward, obs_tp1, done):
+        """批量添加经验，各参数第一维为经验条数"""
+        reward = np.asarray(reward).reshape(-1)
+        n = len(reward)
+        if n > self.size:
+            return self.extend(obs_t[-self.size:], action[-self.size:], reward[-self.size:],
+                               obs_tp1[-self.size:], np.asarray(done).reshape(-1)[-self.size:])
+        idx = self._reserve(n)
+        self.obs[idx] = obs_t
+        self.action[idx] = action
+        self.reward[idx] = reward
+        self.obs_tp1[idx] = obs_tp1
+        self.done[idx] = np.asarray(done).reshape(-1)
+
+    def sample(self, batch_size, **_kwargs):
+        """
+        随机采样一个batch，返回 (obs, action, reward, obs_tp1, done)，与stable_baselines的ReplayBuffer一致
+        """
+        idx = np.random.randint(0, len(self), size=batch_size)
+        return self.obs[idx], self.action[idx], self.reward[idx], self.obs_tp1[idx], self.done[idx]
+
+    def flush(self):
+        """将映射文件写回磁盘"""
+        if self._mmap is not None:
+            self._mmap.flush()
+
+    def save(self, path):
+        """
+        将回放池保存到path，已经映射到path时只刷新到磁盘
+        """
+        if self.path is not None and os.path.abspath(path) == os.path.abspath(self.path):
+            self.flush()
+            return self
+        saved = ReplayBuffer(self.size, self.obs_shape, self.action_shape, path=path)
+        saved.header[:] = self.header
+        for name, _ in self.fields:
+            getattr(saved, name)[:] = getattr(self, name)
+        saved.flush()
+        telemetry.info('replay_buffer_save', 'Replay buffer with %d entries is saved to %s' % (len(self), path),
+                       entries=len(self), path=path)
+        return saved
+
+    def close(self, unlink=False):
+        """
+        释放存储，创建共享内存的进程退出前应调用close(unlink=True)
+        """
+        self.flush()
+        # 先释放所有视图，共享内存才能关闭
+        self.header = None
+        for name, _ in self.fields:
+            setattr(self, name, None)
+        self._mmap = None
+        if self._shm is not None:
+            self._shm.close()
+            if unlink:
+                self._shm.unlink()
+            self._shm = None
+
+
+class DDPGMemory(object):
+    """
+    将ReplayBuffer包装为stable_baselines DDPG的Memory接口
+    """
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.limit = buffer.size
+
+    @property
+    def nb_entries(self):
+        return len(self.buffer)
+
+    def append(self, obs0, action, reward, obs1, terminal1, training=True):
+        if not training:
+            return
+        self.buffer.add(obs0, action, reward, obs1, terminal1)
+
+    def sample(self, batch_size):
+        obs0, actions, rewards, obs1, terminals1 = self.buffer.sample(batch_size)
+        return {
+            'obs0': obs0,
+            'obs1': obs1,
+            'rewards': rewards.reshape(-1, 1),
+            'actions': actions,
+            'terminals1': terminals1.reshape(-1, 1),
+        }
+
+
+def attach_replay_buffer(model, buffer):
+    """
+    用持久化回放池替换模型内部的回放池，需要在模型创建之后、learn之前调用
+
+    参数：
+        model，DDPG或TD3模型
+        buffer，ReplayBuffer
+    """
+    if hasattr(model, 'memory'):
+        model.memory = DDPGMemory(buffer)
+    elif hasattr(model, 'replay_buffer'):
+        model.replay_buffer = buffer
+        model.buffer_size = buffer.size
+    else:
+        raise TypeError('模型 %s 不支持替换回放池' % type(model).__name__)
+    return model
+
+
+def collect_rollouts(env, buffer, n_steps, predict=None):
+    """
+    rollout进程的主循环，与环境交互并将经验写入回放池
+
+    参数：
+        env，交易环境
+        buffer，ReplayBuffer，通常由ReplayBuffer.from_spec在子进程中挂载
+        n_steps，交互步数
+        predict，行为函数 obs -> action，为None时随机采样行为空间
+    """
+    obs = env.reset()
+    for _ in range(n_steps):
+        action = env.action_space.sample() if predict is None else predict(obs)
+        obs_tp1, reward, done, _info = env.step(action)
+        buffer.add(obs, action, reward, obs_tp1, float(done))
+        obs = env.reset() if done else obs_tp1
+    buffer.flush()
+    return buffer
+
+
+def prefill_from_history(buffer, env, history_dir, tag='*'):
+    """
+    用save_history输出的csv离线填充回放池
+
+    观察向量按日期由env.quotation_mgr重新计算，行为向量由次日的权重W1和订单报价还原：
+    offer = (订单价格 / 当日价格 - 1) * 100，未下单的资产offer为0
+
+    参数：
+        buffer，ReplayBuffer
+        env，Portfolio_Prediction_Env，用于计算观察向量
+        history_dir，save_history的输出目录
+        tag，文件名中的标签，例如 from-20190101-to-20191231
+    """
+    st_list = env.stock_list
+    n_added = 0
+    for stat_file in sorted(glob.glob(os.path.join(history_dir, 'statistics_' + tag + '.csv'))):
+        suffix = os.path.basename(stat_file)[len('statistics_'):]
+        statistics_df = pd.read_csv(stat_file, index_col=0, parse_dates=True)
+        portfolio_df = pd.read_csv(os.path.join(history_dir, 'portfolio_' + suffix), index_col=0, parse_dates=True)
+        order_df = pd.read_csv(os.path.join(history_dir, 'order_' + suffix), index_col=0)
+        statistics_df.index = statistics_df.index.date
+        portfolio_df.index = portfolio_df.index.date
+
+        dates = [d for d in statistics_df.index if d in portfolio_df.index]
+        if len(dates) < 2:
+            continue
+
+        weights = portfolio_df.loc[dates, ['W1_' + name for name in ['position'] + st_list]].values
+        prices = portfolio_df.loc[dates, ['P1_' + name for name in ['position'] + st_list]].values
+        rewards = statistics_df.loc[dates, 'target_reward'].values
+        dones = statistics_df.loc[dates, 'done'].astype(float).values
+
+        offers = np.zeros_like(prices)
+        if len(order_df) > 0:
+            order_df['current_date'] = pd.to_datetime(order_df['current_date']).dt.date
+            price_table = order_df.pivot_table(index='current_date', columns='stock', values='price', aggfunc='last')
+            for j, name in enumerate(st_list, start=1):
+                if name in price_table.columns:
+                    order_price = price_table[name].reindex(dates).values
+                    offer = (order_price / prices[:, j] - 1) * 100
+                    offers[:, j] = np.nan_to_num(offer)
+
+        obs = np.array([np.vstack((env.quotation_mgr.get_window_quotation(d),
+                                   env.quotation_mgr.get_prediction(d))).reshape(-1) for d in dates])
+
+        # 第t天的行为导致第t+1天的权重和奖励
+        buffer.extend(obs[:-1], np.hstack((weights[1:], offers[:-1])), rewards[1:], obs[1:], dones[1:])
+        n_added += len(dates) - 1
+
+    telemetry.info('replay_buffer_prefill', 'Prefilled %d transitions from %s' % (n_added, history_dir),
+                   entries=n_added, path=history_dir)
+    buffer.flush()
+    return n_added
@@ -14,10 +14,11 @@ from stable_baselines.td3.policies import MlpPolicy as TD3_MlpPolicy
 from stable_baselines.her import GoalSelectionStrategy, HERGoalEnvWrapper
 from stable_baselines.common.env_checker import check_env
 from portfolio_trade.policy.custom_policy import CustomDDPGPolicy, CustomTD3Policy
+from portfolio_trade.policy.replay_buffer import ReplayBuffer, attach_replay_buffer
 
 from portfolio_trade.env.custom_env import Portfolio_Prediction_Env, QuotationManager, PortfolioManager
 
-from utils.tools import search_file
+from utils.tools import search_file, telemetry, DEBUG
 
 
 def train_decision( config=None, 
@@ -30,7 +31,8 @@ def train_decision( config=None,
                     start_date=None,
                     stop_date=None,
                     episode_steps=1000,
-                    model='DDPG'):
+                    model='DDPG',
+                    buffer_path=None):
     """
     训练决策模型，从数据库读取数据并进行决策训练
 
@@ -41,6 +43,7 @@ def train_decision( config=None,
         history：行情信息, 
         all_quotes:拼接之后的行情信息
         predict_results_dict：预测结果信息
+        buffer_path：回放池目录，指定时经验保存在内存映射文件中，下次训练可以继续使用（仅DDPG TD3）
     """
     # 首先处理预测数据中字符串日期
 
@@ -61,19 +64,24 @@ def train_decision( config=None,
                                     stop_trade_date=stop_date,
                                     save=save)
     
-    # 测试模式
+    # 测试模式，输出每个成交订单和采样的资产向量
     if test_mode:
-        obs = env.reset()
-        # check_env(env)
-        for i in range(1000):
-            W = np.random.uniform(0.0, 1.0, size=(6,))
-            offer = np.random.uniform(-10.0, 10.0, size=(6,))
-            obs, reward, done, infos = env.step(np.hstack((W, offer)))
-            # env.render()
-            if done:
-                env.save_history()
-                break
-        env.close()
+        level = telemetry.level
+        telemetry.set_level(DEBUG)
+        try:
+            obs = env.reset()
+            # check_env(env)
+            for i in range(1000):
+                W = np.random.uniform(0.0, 1.0, size=(6,))
+                offer = np.random.uniform(-10.0, 10.0, size=(6,))
+                obs, reward, done, infos = env.step(np.hstack((W, offer)))
+                # env.render()
+                if done:
+                    env.save_history()
+                    break
+            env.close()
+        finally:
+            telemetry.set_level(level)
         
     # 训练模式
     if MODEL == "DDPG":
@@ -100,9 +108,12 @@ def train_decision( config=None,
                         action_noise=action_noise,
                         # tensorboard_log='./tb_log',
                         )
+        replay_buffer = open_replay_buffer(model, env, buffer_path)
         # 训练步数
         model.learn(total_timesteps=episode_steps,)
         model.save(os.path.join(sys.path[0],'saved_models',MODEL,MODEL + '.h5'))
+        if replay_buffer is not None:
+            replay_buffer.flush()
 
     elif MODEL == 'TD3':
         n_actions = env.action_space.shape[-1]
@@ -124,9 +135,12 @@ def train_decision( config=None,
                         action_noise=action_noise,
                         # tensorboard_log='./tb_log',
                         )
+        replay_buffer = open_replay_buffer(model, env, buffer_path)
         # 训练步数
         model.learn(total_timesteps=episode_steps,)
         model.save(os.path.join(sys.path[0],'saved_models',MODEL, MODEL + '.h5'))
+        if replay_buffer is not None:
+            replay_buffer.flush()
 
     elif MODEL == "HER":
         """
@@ -163,6 +177,33 @@ def train_decision( config=None,
     env.close()
 
 
+def open_replay_buffer(model, env, buffer_path):
+    """
+    打开或创建buffer_path下的回放池，并替换模型内部的回放池
+
+    参数：
+        model，DDPG或TD3模型
+        env，交易环境，用于确定观察和行为向量的形状
+        buffer_path，回放池目录，为None时使用模型自带的回放池
+    """
+    if buffer_path is None:
+        return None
+
+    if os.path.exists(os.path.join(buffer_path, ReplayBuffer.META_NAME)):
+        replay_buffer = ReplayBuffer.load(buffer_path)
+    else:
+        replay_buffer = ReplayBuffer(size=model.buffer_size,
+                                     obs_shape=env.observation_space.shape,
+                                     action_shape=env.action_space.shape,
+                                     path=buffer_path)
+    telemetry.info('replay_buffer_open', 'Replay buffer %s has %d entries' % (buffer_path, len(replay_buffer)),
+                   entries=len(replay_buffer), path=buffer_path)
+
+    attach_replay_buffer(model, replay_buffer)
+
+    return replay_buffer
+
+
 def order_process_trade():
     """
     处理订单（实盘环境）
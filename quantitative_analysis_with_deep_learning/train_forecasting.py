@@ -45,7 +45,7 @@ from utils.data_process import DataProcessor, DataVisualiser
 
 from model.baseline import LSTM_Model
 
-from utils.tools import search_file, parse_filename, add_to_df
+from utils.tools import search_file, parse_filename, add_to_df, telemetry
 
 
 def train_forecasting(config=None, save=False, calender=None, history=None, forecasting_deadline=None):
@@ -61,6 +61,9 @@ def train_forecasting(config=None, save=False, calender=None, history=None, fore
     """
     assert config is not None
 
+    # 训练日志异步写入文件，避免阻塞训练
+    telemetry.start_file_sink()
+
     data_pro = DataProcessor(   date_col=config['data']['date_col'],
                                 daily_quotes=config['data']['daily_quotes'],
                                 target_col=config['data']['target'])
@@ -156,7 +159,7 @@ def train_forecasting(config=None, save=False, calender=None, history=None, fore
             try:
                 parser_list = [parse_filename(filename=filename) for filename in model_para_path]
             except Exception as e:
-                print(e)
+                telemetry.warning('parse_filename_error', str(e), stock=idx)
             parser_list = [s for s in parser_list if s is not None]
             
             # 查找最近训练的权重
@@ -349,7 +352,8 @@ def train_forecasting(config=None, save=False, calender=None, history=None, fore
                 save_path = os.path.join(config['prediction']['save_result_path'], now + '-' + idx + '-' + current_date.strftime('%Y%m%d') + '.csv')
                 results_df.to_csv(save_path)
 
-            print('[Predict] Prediction of %s is saved to file.' %current_date.strftime("%Y%m%d"))
+            telemetry.info('predict_step', '[Predict] Prediction of %s is saved to file.' %current_date.strftime("%Y%m%d"),
+                            stock=idx, date=current_date, loss=epoch_loss, val_loss=epoch_val_loss)
 
             # 最后一次训练、保存权重，保存训练结果
             if save_model_value:
@@ -376,5 +380,7 @@ def train_forecasting(config=None, save=False, calender=None, history=None, fore
             pass
 
         predict_results_dict[idx] = results_df
-    
+
+    telemetry.stop_file_sink()
+
     return predict_results_dict
@@ -246,8 +246,8 @@ class DataProcessor():
             data_ = data.drop_duplicates(subset=[date_col], keep='first')
             data_ = pd.merge(data_, history, how='outer', left_on=data_[
                              date_col], right_on=history[date_col])
-            print("[INFO] Data drop duplications at %d rows." %
-                  (data.shape[0] - data_.shape[0]))
+            telemetry.info('drop_duplications', "[INFO] Data drop duplications at %d rows." %
+                           (data.shape[0] - data_.shape[0]), rows=data.shape[0] - data_.shape[0])
         return data_
 
     def drop_dup_fill_nan(self, dataframe):
@@ -268,7 +268,9 @@ class DataProcessor():
         填充空值，支持对DataFrame填充
         """
         data = dataframe
-        print('Filled %d Nans .' % (data.isnull().sum().sum()))
+        if telemetry.is_enabled(INFO):
+            nan_count = data.isnull().sum().sum()
+            telemetry.info('fill_nan', 'Filled %d Nans .' % nan_count, count=nan_count)
         data.fillna(axis=0, method='ffill', inplace=True)
         data.fillna(value, inplace=True)
         return data
@@ -486,12 +488,12 @@ class DataProcessor():
                 plt.bar(plot_dataset['macdh'].loc[plot_dataset['macdh'] >= 0].index, plot_dataset['macdh']
                         .loc[plot_dataset['macdh'] >= 0], label='macd histgram', width=linewidth, color='r')
             except Exception as e:
-                print(e)
+                telemetry.warning('data_process_error', str(e))
             try:
                 plt.bar(plot_dataset['macdh'].loc[plot_dataset['macdh'] < 0].index, plot_dataset['macdh']
                         .loc[plot_dataset['macdh'] < 0], label='macd histgram', width=linewidth, color='g')
             except Exception as e:
-                print(e)
+                telemetry.warning('data_process_error', str(e))
 
             plt.legend()
             if save:
@@ -713,7 +715,7 @@ class DataProcessor():
                     tmp = arrow.get(x)
                     date_list.append(tmp)
                 except Exception as e:
-                    print(e)
+                    telemetry.warning('data_process_error', str(e))
         elif isinstance(timeseries, pd.Series):
             date_list = pd.to_datetime(timeseries, format='%Y%m%d').to_list()
             date_list = [arrow.get(t) for t in date_list]
@@ -894,7 +896,7 @@ class DataProcessor():
             try:
                 other_features_col.remove(d)
             except Exception as e:
-                print(e)
+                telemetry.warning('data_process_error', str(e))
 
         return data[other_features_col]
 
@@ -1112,12 +1114,12 @@ class DataProcessor():
             try:
                 single_window_x = window_x[single_window_idx]
             except Exception as e:
-                print(e)
+                telemetry.warning('data_process_error', str(e))
                 single_window_x = None
             try:
                 single_window_y = window_y[single_window_idx]
             except Exception as e:
-                print(e)
+                telemetry.warning('data_process_error', str(e))
                 single_window_y = None
 
             return single_window_x, single_window_y
@@ -1142,7 +1144,7 @@ class DataProcessor():
         try:
             x = X[start_idx: x_end_idx]
         except Exception as e:
-            print(e)
+            telemetry.warning('data_process_error', str(e))
 
         # 对窗口数据降维
         # pca = PCA(n_components=self.pca_n_comp)
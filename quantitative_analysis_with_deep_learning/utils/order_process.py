@@ -1,10 +1,20 @@
 import numpy as np 
 
+from vnpy.trader.utility import SimulationClock
 
 
 class TradeSimulator:
     """
     用于回测的交易模拟
     """
-    def __init__(self, config):
-        self.cfg = config
\ No newline at end of file
+    def __init__(self, config, seed=0):
+        self.cfg = config
+        # 模拟时钟，与gym环境和vnpy回测引擎使用相同的订单号规则
+        self.clock = SimulationClock(seed)
+
+    def new_orderid(self, trade_date):
+        """
+        生成与模拟交易日绑定的订单号
+        """
+        self.clock.update(trade_date)
+        return self.clock.new_id()
@@ -1,12 +1,22 @@
 import time
 import datetime as dt
 import sys,os
+import json
 import logging
+import logging.handlers
+import queue
+from collections import defaultdict
 from functools import wraps
 import traceback
 import arrow
 import pandas as pd 
 
+# 日志级别，与logging保持一致
+DEBUG = logging.DEBUG
+INFO = logging.INFO
+WARNING = logging.WARNING
+ERROR = logging.ERROR
+
 class Timer():
     '''
     定义一个计时器类 stop方法输出用时
@@ -61,20 +71,153 @@ class Logger():
         return  self.logger
 
 
+class JsonFormatter(logging.Formatter):
+    '''
+    将结构化事件格式化为一行json，用于文件输出
+    '''
+    def format(self, record):
+        data = {
+            'time': self.formatTime(record, '%Y-%m-%d %H:%M:%S'),
+            'level': record.levelname,
+            'event': getattr(record, 'event', ''),
+            'message': record.getMessage(),
+        }
+        data.update(getattr(record, 'fields', {}))
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class Telemetry():
+    '''
+    分级的结构化日志和遥测记录器
+
+    1.低于设定级别的事件在调用处直接返回，关闭时几乎没有开销，热点代码可以先判断is_enabled
+    2.逐步事件（每个step、每个订单）支持按照固定间隔采样输出
+    3.文件输出通过队列异步写入，不阻塞训练和回测线程
+    '''
+
+    def __init__(self, name='quant.telemetry', level=INFO, console=True):
+        self.name = name
+        self.level = level
+        self.counters = defaultdict(int)
+
+        self.logger = logging.getLogger(name)
+        self.logger.setLevel(DEBUG)
+        self.logger.propagate = False
+
+        self.console_handler = None
+        self.listener = None
+        if console:
+            self.console_handler = logging.StreamHandler(sys.stdout)
+            self.console_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)-8s: %(message)s'))
+            self.logger.addHandler(self.console_handler)
+
+    def set_level(self, level):
+        '''
+        设置输出级别，WARNING以上即为静默模式
+        '''
+        self.level = level
+
+    def is_enabled(self, level):
+        '''
+        判断该级别的事件是否需要输出
+        '''
+        return level >= self.level
+
+    def sampled(self, event, every=1):
+        '''
+        按事件名计数，每every次返回一次True
+        '''
+        if every <= 1:
+            return True
+        count = self.counters[event]
+        self.counters[event] = count + 1
+        return count % every == 0
+
+    def emit(self, level, event, msg='', every=1, **fields):
+        '''
+        输出一个结构化事件
+
+        参数：
+            level，事件级别
+            event，事件名称，同时作为采样计数的键
+            msg，用于控制台显示的消息
+            every，采样间隔，1表示每次都输出
+            fields，附加字段，写入文件时作为json的键值
+        '''
+        if level < self.level:
+            return
+        if every > 1 and not self.sampled(event, every):
+            return
+        self.logger.log(level, msg or event, extra={'event': event, 'fields': fields})
+
+    def debug(self, event, msg='', every=1, **fields):
+        ''''''
+        self.emit(DEBUG, event, msg, every, **fields)
+
+    def info(self, event, msg='', every=1, **fields):
+        ''''''
+        self.emit(INFO, event, msg, every, **fields)
+
+    def warning(self, event, msg='', every=1, **fields):
+        ''''''
+        self.emit(WARNING, event, msg, every, **fields)
+
+    def error(self, event, msg='', every=1, **fields):
+        ''''''
+        self.emit(ERROR, event, msg, every, **fields)
+
+    def start_file_sink(self, log_path=None):
+        '''
+        启动异步文件输出，事件先进入队列，由后台线程写入json行文件
+        '''
+        if self.listener:
+            return
+
+        if log_path is None:
+            log_path = Logger().log_path
+
+        file_handler = logging.FileHandler(log_path, encoding="utf8")
+        file_handler.setFormatter(JsonFormatter())
+
+        log_queue = queue.Queue(-1)
+        self.queue_handler = logging.handlers.QueueHandler(log_queue)
+        self.logger.addHandler(self.queue_handler)
+
+        self.listener = logging.handlers.QueueListener(log_queue, file_handler)
+        self.listener.start()
+
+    def stop_file_sink(self):
+        '''
+        停止异步文件输出，并写完队列中剩余的事件
+        '''
+        if not self.listener:
+            return
+
+        self.logger.removeHandler(self.queue_handler)
+        self.listener.stop()
+        self.listener = None
+
+
+# 全局遥测记录器，训练环境中设置为WARNING即可关闭热点路径上的全部输出
+telemetry = Telemetry()
+
+
 def info(func):
     @wraps(func)
     def log(*args,**kwargs):
-        logger = Logger()
         try:
-            logger.get_logger().info("Method: \" {name} \" is starting...".format(name = func.__name__))
-            timer = Timer(func.__name__)
-            timer.start()
+            # 未开启INFO级别时，直接调用，不计时也不输出
+            if not telemetry.is_enabled(INFO):
+                return func(*args,**kwargs)
+            telemetry.info('method_start', "Method: \" {name} \" is starting...".format(name = func.__name__), method=func.__name__)
+            start_dt = dt.datetime.now()
             result = func(*args,**kwargs)
-            timer.stop()
-            logger.get_logger().info("Method: \" {name} \" is completed .".format(name = func.__name__))
+            cost = dt.datetime.now() - start_dt
+            telemetry.info('method_complete', "Method: \" {name} \" is completed in {cost} .".format(name = func.__name__, cost=cost),
+                            method=func.__name__, seconds=cost.total_seconds())
             return result
         except Exception as e:
-            logger.get_logger().error(f"{func.__name__} is error,here are details:{traceback.format_exc()}")
+            telemetry.error('method_error', f"{func.__name__} is error,here are details:{traceback.format_exc()}", method=func.__name__)
     return log
 
 
@@ -6,6 +6,10 @@ Load data from a csv file.
 Differences to 1.9.2:
     * combine Date column and Time column into one Datetime column
 
+File is parsed and saved chunk by chunk with pandas, so memory usage
+stays flat for large files. Gzip (.gz) and zip (.zip) files are read
+directly, all files in a folder can be loaded by multiple processes.
+
 Sample csv file:
 
 ```csv
@@ -20,18 +24,28 @@ Sample csv file:
 
 """
 
-import csv
+import gzip
+import io
+import multiprocessing
+import os
+import zipfile
+from contextlib import contextmanager
 from datetime import datetime
-from typing import TextIO
+from typing import Callable, Iterator, List, TextIO, Tuple
+
+import numpy as np
+import pandas as pd
 
 from vnpy.event import EventEngine
+from vnpy.trader.columnar import BarColumns, get_bucket_starts
 from vnpy.trader.constant import Exchange, Interval
 from vnpy.trader.database import database_manager
 from vnpy.trader.engine import BaseEngine, MainEngine
-from vnpy.trader.object import BarData
 
 APP_NAME = "CsvLoader"
 
+CSV_SUFFIXES = (".csv", ".csv.gz", ".zip")
+
 
 class CsvLoaderEngine(BaseEngine):
     """"""
@@ -52,6 +66,8 @@ class CsvLoaderEngine(BaseEngine):
         self.high_head: str = ""
         self.volume_head: str = ""
 
+        self.chunk_size: int = 100_000
+
     def load_by_handle(
         self,
         f: TextIO,
@@ -65,46 +81,30 @@ class CsvLoaderEngine(BaseEngine):
         close_head: str,
         volume_head: str,
         datetime_format: str,
+        window_interval: Interval = None,
     ):
         """
         load by text mode file handle
-        """
-        buf = [line.replace("\0", "") for line in f]
-        reader = csv.DictReader(buf, delimiter=",")
-
-        bars = []
-        start = None
-        count = 0
-        for item in reader:
-            if datetime_format:
-                dt = datetime.strptime(item[datetime_head], datetime_format)
-            else:
-                dt = datetime.fromisoformat(item[datetime_head])
-
-            bar = BarData(
-                symbol=symbol,
-                exchange=exchange,
-                datetime=dt,
-                interval=interval,
-                volume=item[volume_head],
-                open_price=item[open_head],
-                high_price=item[high_head],
-                low_price=item[low_head],
-                close_price=item[close_head],
-                gateway_name="DB",
-            )
 
-            bars.append(bar)
-
-            # do some statistics
-            count += 1
-            if not start:
-                start = bar.datetime
-        end = bar.datetime
-
-        # insert into database
-        database_manager.save_bar_data(bars)
-        return start, end, count
+        window_interval: aggregate csv bars into bars of this interval
+        before saving, e.g. 1 minute csv into 1 hour bars.
+        """
+        return load_csv(
+            f,
+            symbol=symbol,
+            exchange=exchange,
+            interval=interval,
+            datetime_head=datetime_head,
+            open_head=open_head,
+            high_head=high_head,
+            low_head=low_head,
+            close_head=close_head,
+            volume_head=volume_head,
+            datetime_format=datetime_format,
+            window_interval=window_interval,
+            chunk_size=self.chunk_size,
+            callback=self.write_progress,
+        )
 
     def load(
         self,
@@ -119,11 +119,12 @@ class CsvLoaderEngine(BaseEngine):
         close_head: str,
         volume_head: str,
         datetime_format: str,
+        window_interval: Interval = None,
     ):
         """
-        load by filename
+        load by filename, .gz and .zip files are decompressed while reading
         """
-        with open(file_path, "rt") as f:
+        with open_csv(file_path) as f:
             return self.load_by_handle(
                 f,
                 symbol=symbol,
@@ -136,4 +137,230 @@ class CsvLoaderEngine(BaseEngine):
                 close_head=close_head,
                 volume_head=volume_head,
                 datetime_format=datetime_format,
+                window_interval=window_interval,
             )
+
+    def load_folder(
+        self,
+        folder_path: str,
+        exchange: Exchange,
+        interval: Interval,
+        datetime_head: str,
+        open_head: str,
+        high_head: str,
+        low_head: str,
+        close_head: str,
+        volume_head: str,
+        datetime_format: str,
+        window_interval: Interval = None,
+        processes: int = None,
+    ) -> List[Tuple[str, datetime, datetime, int]]:
+        """
+        load all csv files in folder with a process pool, symbol is the
+        file name without suffix.
+
+        Each process writes into database separately, for sqlite the writes
+        are serialized by database lock.
+        """
+        file_paths = sorted(
+            os.path.join(folder_path, name)
+            for name in os.listdir(folder_path)
+            if name.lower().endswith(CSV_SUFFIXES)
+        )
+        if not file_paths:
+            self.write_log(f"文件夹中没有CSV文件：{folder_path}")
+            return []
+
+        setting = {
+            "exchange": exchange,
+            "interval": interval,
+            "datetime_head": datetime_head,
+            "open_head": open_head,
+            "high_head": high_head,
+            "low_head": low_head,
+            "close_head": close_head,
+            "volume_head": volume_head,
+            "datetime_format": datetime_format,
+            "window_interval": window_interval,
+            "chunk_size": self.chunk_size,
+        }
+
+        results = []
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(processes or multiprocessing.cpu_count()) as pool:
+            async_results = [
+                (file_path, pool.apply_async(load_csv_file, (file_path, setting)))
+                for file_path in file_paths
+            ]
+
+            for n, (file_path, async_result) in enumerate(async_results):
+                start, end, count = async_result.get()
+                results.append((file_path, start, end, count))
+                self.write_log(f"CSV载入完成[{n + 1}/{len(file_paths)}]：{file_path}，数量{count}")
+
+        return results
+
+    def write_progress(self, count: int, end: datetime):
+        """"""
+        self.write_log(f"CSV载入进度：已保存{count}条，最新时间{end}")
+
+    def write_log(self, msg: str):
+        """"""
+        self.main_engine.write_log(msg, APP_NAME)
+
+
+@contextmanager
+def open_csv(file_path: str) -> Iterator[TextIO]:
+    """
+    Open csv file in text mode, gzip and zip (first csv inside) are supported.
+    """
+    if file_path.lower().endswith(".gz"):
+        with gzip.open(file_path, "rt") as f:
+            yield f
+
+    elif file_path.lower().endswith(".zip"):
+        with zipfile.ZipFile(file_path) as archive:
+            names = [name for name in archive.namelist() if name.lower().endswith(".csv")]
+            if not names:
+                raise ValueError(f"No csv file in {file_path}")
+
+            with io.TextIOWrapper(archive.open(names[0])) as f:
+                yield f
+
+    else:
+        with open(file_path, "rt") as f:
+            yield f
+
+
+class NullFilter:
+    """
+    File wrapper removing null characters, which breaks csv parsing.
+    """
+
+    def __init__(self, f: TextIO):
+        """"""
+        self.f = f
+
+    def read(self, size: int = -1) -> str:
+        """"""
+        return self.f.read(size).replace("\0", "")
+
+    def __iter__(self):
+        """"""
+        return (line.replace("\0", "") for line in self.f)
+
+
+def load_csv(
+    f: TextIO,
+    symbol: str,
+    exchange: Exchange,
+    interval: Interval,
+    datetime_head: str,
+    open_head: str,
+    high_head: str,
+    low_head: str,
+    close_head: str,
+    volume_head: str,
+    datetime_format: str,
+    window_interval: Interval = None,
+    chunk_size: int = 100_000,
+    callback: Callable = None,
+):
+    """
+    Parse csv bars chunk by chunk and save every chunk into database.
+
+    Returns start, end datetime and count of saved bars.
+    callback: called with saved count and end datetime after each chunk.
+    """
+    heads = [volume_head, open_head, high_head, low_head, close_head]
+    reader = pd.read_csv(
+        NullFilter(f),
+        usecols=[datetime_head] + heads,
+        dtype={head: np.float64 for head in heads},
+        chunksize=chunk_size,
+    )
+
+    resample = window_interval and window_interval != interval
+
+    start = None
+    end = None
+    count = 0
+    remains = None
+
+    for df in reader:
+        if datetime_format:
+            dts = pd.to_datetime(df[datetime_head], format=datetime_format)
+        else:
+            dts = pd.to_datetime(df[datetime_head])
+
+        tzinfo = dts.dt.tz
+        if tzinfo:
+            dts = dts.dt.tz_localize(None)
+
+        columns = BarColumns(
+            symbol=symbol,
+            exchange=exchange,
+            interval=interval,
+            datetime=dts.to_numpy(dtype="datetime64[us]").view(np.int64),
+            tzinfo=tzinfo,
+            volume=df[volume_head].to_numpy(),
+            open_interest=np.zeros(len(df)),
+            open_price=df[open_head].to_numpy(),
+            high_price=df[high_head].to_numpy(),
+            low_price=df[low_head].to_numpy(),
+            close_price=df[close_head].to_numpy(),
+        )
+
+        if resample:
+            # Bars of the last window may continue in next chunk
+            if remains:
+                columns = BarColumns.concat([remains, columns])
+
+            starts = get_bucket_starts(columns.datetime, 1, window_interval)
+            remains = columns[int(starts[-1]):]
+            columns = columns[:int(starts[-1])].resample(1, window_interval)
+
+        if not len(columns):
+            continue
+
+        save_columns(columns)
+
+        count += len(columns)
+        if not start:
+            start = columns[0].datetime
+        end = columns[-1].datetime
+
+        if callback:
+            callback(count, end)
+
+    if remains:
+        columns = remains.resample(1, window_interval)
+        save_columns(columns)
+
+        count += len(columns)
+        if not start:
+            start = columns[0].datetime
+        end = columns[-1].datetime
+
+    return start, end, count
+
+
+def load_csv_file(file_path: str, setting: dict):
+    """
+    Load one csv file in worker process of CsvLoaderEngine.load_folder.
+    """
+    symbol = os.path.basename(file_path).split(".")[0]
+    with open_csv(file_path) as f:
+        return load_csv(f, symbol=symbol, **setting)
+
+
+def save_columns(columns: BarColumns):
+    """
+    Save bar columns with array interface of database if available.
+    """
+    if hasattr(database_manager, "save_bar_arrays"):
+        arrays = {"datetime": columns.datetime}
+        arrays.update({name: getattr(columns, name) for name in columns.fields})
+        database_manager.save_bar_arrays(columns.symbol, columns.exchange, columns.interval, arrays)
+    else:
+        database_manager.save_bar_data(columns.to_bars())
@@ -11,6 +11,7 @@ from vnpy.trader.engine import BaseEngine, MainEngine
 from vnpy.trader.constant import Interval
 from vnpy.trader.utility import extract_vt_symbol
 from vnpy.trader.object import HistoryRequest
+from vnpy.trader.columnar import BarColumns
 from vnpy.trader.rqdata import rqdata_client
 from vnpy.trader.database import database_manager
 from vnpy.app.cta_strategy import (
@@ -45,6 +46,8 @@ class BacktesterEngine(BaseEngine):
 
         # Optimization result
         self.result_values = None
+        self.walk_forward_df = None
+        self.walk_forward_stability = None
 
     def init_engine(self):
         """"""
@@ -233,6 +236,12 @@ class BacktesterEngine(BaseEngine):
         """"""
         return self.result_values
 
+    def get_walk_forward_result(self):
+        """
+        Return table of folds and parameter stability of walk-forward optimization.
+        """
+        return self.walk_forward_df, self.walk_forward_stability
+
     def get_default_setting(self, class_name: str):
         """"""
         strategy_class = self.classes[class_name]
@@ -252,15 +261,24 @@ class BacktesterEngine(BaseEngine):
         capital: int,
         inverse: bool,
         optimization_setting: OptimizationSetting,
-        use_ga: bool
+        use_ga: bool,
+        walk_forward: dict = None
     ):
-        """"""
-        if use_ga:
+        """
+        walk_forward: arguments of walk-forward optimization, e.g.
+                      {"train_days": 250, "test_days": 60, "anchored": False},
+                      stitched out-of-sample result is shown as backtesting result.
+        """
+        if walk_forward is not None:
+            self.write_log("开始滚动参数优化")
+        elif use_ga:
             self.write_log("开始遗传算法参数优化")
         else:
             self.write_log("开始多进程参数优化")
 
         self.result_values = None
+        self.walk_forward_df = None
+        self.walk_forward_stability = None
 
         engine = self.backtesting_engine
         engine.clear_data()
@@ -284,7 +302,20 @@ class BacktesterEngine(BaseEngine):
             {}
         )
 
-        if use_ga:
+        if walk_forward is not None:
+            self.result_values = engine.run_walk_forward_optimization(
+                optimization_setting,
+                use_ga=use_ga,
+                output=False,
+                **walk_forward
+            )
+            self.walk_forward_df = engine.walk_forward_df
+            self.walk_forward_stability = engine.walk_forward_stability
+
+            if self.result_values:
+                self.result_df = engine.daily_df
+                self.result_statistics = engine.calculate_statistics(output=False)
+        elif use_ga:
             self.result_values = engine.run_ga_optimization(
                 optimization_setting,
                 output=False
@@ -317,7 +348,8 @@ class BacktesterEngine(BaseEngine):
         capital: int,
         inverse: bool,
         optimization_setting: OptimizationSetting,
-        use_ga: bool
+        use_ga: bool,
+        walk_forward: dict = None
     ):
         if self.thread:
             self.write_log("已有任务在运行中，请等待完成")
@@ -339,7 +371,8 @@ class BacktesterEngine(BaseEngine):
                 capital,
                 inverse,
                 optimization_setting,
-                use_ga
+                use_ga,
+                walk_forward
             )
         )
         self.thread.start()
@@ -431,7 +464,10 @@ class BacktesterEngine(BaseEngine):
 
     def get_history_data(self):
         """"""
-        return self.backtesting_engine.history_data
+        history_data = self.backtesting_engine.history_data
+        if isinstance(history_data, BarColumns):
+            return history_data.to_bars()
+        return history_data
 
     def get_strategy_class_file(self, class_name: str):
         """"""
@@ -8,7 +8,8 @@ from vnpy.trader.utility import BarGenerator, ArrayManager
 from .base import APP_NAME, StopOrder
 from .engine import CtaEngine
 from .backtesting import BacktestingEngine, OptimizationSetting
-from .template import CtaTemplate, CtaSignal, TargetPosTemplate
+from .portfolio_backtesting import PortfolioBacktestingEngine
+from .template import CtaTemplate, CtaSignal, TargetPosTemplate, PortfolioTemplate
 
 
 class CtaStrategyApp(BaseApp):
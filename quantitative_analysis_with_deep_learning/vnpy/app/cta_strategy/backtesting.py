@@ -1,29 +1,33 @@
-from collections import defaultdict
-from datetime import date, datetime, timedelta
+from datetime import date, datetime, time as dtime, timedelta
 from typing import Callable
 from itertools import product
 from functools import lru_cache
 from time import time
 import multiprocessing
+import os
+import pickle
 import random
 import traceback
 
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-from pandas import DataFrame
+from pandas import DataFrame, concat
 from deap import creator, base, tools, algorithms
 
 from vnpy.trader.constant import (Direction, Offset, Exchange,
                                   Interval, Status)
 from vnpy.trader.database import database_manager
 from vnpy.trader.object import OrderData, TradeData, BarData, TickData
-from vnpy.trader.utility import round_to
+from vnpy.trader.utility import round_to, SimulationClock
+from vnpy.trader.columnar import BarColumns
+from vnpy.trader.pnl import DAILY_FIELDS, trades_to_arrays, calculate_daily_result, calculate_statistics
 
 from .base import (
     BacktestingMode,
     EngineType,
     STOPORDER_PREFIX,
+    OrderBook,
     StopOrder,
     StopOrderStatus,
     INTERVAL_DELTA_MAP
@@ -120,6 +124,9 @@ class BacktestingEngine:
         self.capital = 1_000_000
         self.mode = BacktestingMode.BAR
         self.inverse = False
+        self.reuse_bar = False
+        self.window = 1
+        self.source_interval = None
 
         self.strategy_class = None
         self.strategy = None
@@ -131,23 +138,30 @@ class BacktestingEngine:
         self.days = 0
         self.callback = None
         self.history_data = []
+        self.history_key = None         # Parameters of loaded history data
 
         self.stop_order_count = 0
         self.stop_orders = {}
-        self.active_stop_orders = {}
+        self.active_stop_orders = OrderBook()
 
         self.limit_order_count = 0
         self.limit_orders = {}
-        self.active_limit_orders = {}
+        self.active_limit_orders = OrderBook()
+        self.submitting_orderids = []
 
         self.trade_count = 0
         self.trades = {}
 
+        self.clock = SimulationClock()
+
         self.logs = []
 
         self.daily_results = {}
         self.daily_df = None
 
+        self.walk_forward_df = None
+        self.walk_forward_stability = None
+
     def clear_data(self):
         """
         Clear all data of last backtesting.
@@ -164,10 +178,13 @@ class BacktestingEngine:
         self.limit_order_count = 0
         self.limit_orders.clear()
         self.active_limit_orders.clear()
+        self.submitting_orderids = []
 
         self.trade_count = 0
         self.trades.clear()
 
+        self.clock.reset()
+
         self.logs.clear()
         self.daily_results.clear()
 
@@ -183,9 +200,18 @@ class BacktestingEngine:
         capital: int = 0,
         end: datetime = None,
         mode: BacktestingMode = BacktestingMode.BAR,
-        inverse: bool = False
+        inverse: bool = False,
+        reuse_bar: bool = False,
+        window: int = 1,
+        source_interval: Interval = None
     ):
-        """"""
+        """
+        reuse_bar: replay bar history with one reusable bar object, only for
+                   strategies which do not keep reference of previous bars.
+        window, source_interval: load bars of source_interval from database and
+                   aggregate into bars of window * interval, e.g. 15 minute
+                   bars from 1 minute data.
+        """
         self.mode = mode
         self.vt_symbol = vt_symbol
         self.interval = Interval(interval)
@@ -202,6 +228,9 @@ class BacktestingEngine:
         self.end = end
         self.mode = mode
         self.inverse = inverse
+        self.reuse_bar = reuse_bar
+        self.window = window
+        self.source_interval = Interval(source_interval) if source_interval else self.interval
 
     def add_strategy(self, strategy_class: type, setting: dict):
         """"""
@@ -221,12 +250,14 @@ class BacktestingEngine:
             self.output("起始日期必须小于结束日期")
             return
 
-        self.history_data.clear()       # Clear previously loaded history data
+        self.history_data = []          # Clear previously loaded history data
+        self.history_key = self.get_history_key()
+        bar_columns = []
 
         # Load 30 days of data each time and allow for progress update
         progress_delta = timedelta(days=30)
         total_delta = self.end - self.start
-        interval_delta = INTERVAL_DELTA_MAP[self.interval]
+        interval_delta = INTERVAL_DELTA_MAP[self.source_interval]
 
         start = self.start
         end = self.start + progress_delta
@@ -236,13 +267,15 @@ class BacktestingEngine:
             end = min(end, self.end)  # Make sure end time stays within set range
 
             if self.mode == BacktestingMode.BAR:
-                data = load_bar_data(
+                columns = load_bar_columns(
                     self.symbol,
                     self.exchange,
-                    self.interval,
+                    self.source_interval,
                     start,
                     end
                 )
+                if columns:
+                    bar_columns.append(columns)
             else:
                 data = load_tick_data(
                     self.symbol,
@@ -250,8 +283,7 @@ class BacktestingEngine:
                     start,
                     end
                 )
-
-            self.history_data.extend(data)
+                self.history_data.extend(data)
 
             progress += progress_delta / total_delta
             progress = min(progress, 1)
@@ -261,8 +293,24 @@ class BacktestingEngine:
             start = end + interval_delta
             end += (progress_delta + interval_delta)
 
+        # Bar history is kept as numpy columns instead of list of BarData
+        if bar_columns:
+            self.history_data = BarColumns.concat(bar_columns)
+
+            # Aggregate after all chunks loaded so that no window is split
+            if self.window > 1 or self.source_interval != self.interval:
+                self.history_data = self.history_data.resample(self.window, self.interval)
+
         self.output(f"历史数据加载完成，数据量：{len(self.history_data)}")
 
+    def iter_history_data(self, history_data):
+        """
+        Iterate history data, bar columns are converted row by row.
+        """
+        if isinstance(history_data, BarColumns):
+            return history_data.iter_bars(reuse=self.reuse_bar)
+        return iter(history_data)
+
     def run_backtesting(self):
         """"""
         if self.mode == BacktestingMode.BAR:
@@ -276,13 +324,14 @@ class BacktestingEngine:
         day_count = 0
         ix = 0
 
-        for ix, data in enumerate(self.history_data):
+        for ix, data in enumerate(self.iter_history_data(self.history_data)):
             if self.datetime and data.datetime.day != self.datetime.day:
                 day_count += 1
                 if day_count >= self.days:
                     break
 
             self.datetime = data.datetime
+            self.clock.update(self.datetime)
 
             try:
                 self.callback(data)
@@ -299,7 +348,7 @@ class BacktestingEngine:
         self.output("开始回放历史数据")
 
         # Use the rest of history data for running backtesting
-        for data in self.history_data[ix:]:
+        for data in self.iter_history_data(self.history_data[ix:]):
             try:
                 func(data)
             except Exception:
@@ -323,31 +372,24 @@ class BacktestingEngine:
             daily_result = self.daily_results[d]
             daily_result.add_trade(trade)
 
-        # Calculate daily result by iteration.
-        pre_close = 0
-        start_pos = 0
-
-        for daily_result in self.daily_results.values():
-            daily_result.calculate_pnl(
-                pre_close,
-                start_pos,
-                self.size,
-                self.rate,
-                self.slippage,
-                self.inverse
-            )
-
-            pre_close = daily_result.close_price
-            start_pos = daily_result.end_pos
-
-        # Generate dataframe
-        results = defaultdict(list)
+        # Calculate daily result with vectorized group-by-day operations.
+        daily_results = list(self.daily_results.values())
+        df = calculate_daily_result(
+            [daily_result.date for daily_result in daily_results],
+            [daily_result.close_price for daily_result in daily_results],
+            *trades_to_arrays(self.trades.values()),
+            self.size,
+            self.rate,
+            self.slippage,
+            self.inverse
+        )
 
-        for daily_result in self.daily_results.values():
-            for key, value in daily_result.__dict__.items():
-                results[key].append(value)
+        # Write back into daily result objects.
+        for daily_result, values in zip(daily_results, df[DAILY_FIELDS].itertuples(index=False)):
+            daily_result.__dict__.update(zip(DAILY_FIELDS, values))
 
-        self.daily_df = DataFrame.from_dict(results).set_index("date")
+        df.insert(2, "trades", [daily_result.trades for daily_result in daily_results])
+        self.daily_df = df
 
         self.output("逐日盯市盈亏计算完成")
         return self.daily_df
@@ -360,161 +402,43 @@ class BacktestingEngine:
         if df is None:
             df = self.daily_df
 
-        # Check for init DataFrame
-        if df is None:
-            # Set all statistics to 0 if no trade.
-            start_date = ""
-            end_date = ""
-            total_days = 0
-            profit_days = 0
-            loss_days = 0
-            end_balance = 0
-            max_drawdown = 0
-            max_ddpercent = 0
-            max_drawdown_duration = 0
-            total_net_pnl = 0
-            daily_net_pnl = 0
-            total_commission = 0
-            daily_commission = 0
-            total_slippage = 0
-            daily_slippage = 0
-            total_turnover = 0
-            daily_turnover = 0
-            total_trade_count = 0
-            daily_trade_count = 0
-            total_return = 0
-            annual_return = 0
-            daily_return = 0
-            return_std = 0
-            sharpe_ratio = 0
-            return_drawdown_ratio = 0
-        else:
-            # Calculate balance related time series data
-            df["balance"] = df["net_pnl"].cumsum() + self.capital
-            df["return"] = np.log(df["balance"] / df["balance"].shift(1)).fillna(0)
-            df["highlevel"] = (
-                df["balance"].rolling(
-                    min_periods=1, window=len(df), center=False).max()
-            )
-            df["drawdown"] = df["balance"] - df["highlevel"]
-            df["ddpercent"] = df["drawdown"] / df["highlevel"] * 100
-
-            # Calculate statistics value
-            start_date = df.index[0]
-            end_date = df.index[-1]
-
-            total_days = len(df)
-            profit_days = len(df[df["net_pnl"] > 0])
-            loss_days = len(df[df["net_pnl"] < 0])
-
-            end_balance = df["balance"].iloc[-1]
-            max_drawdown = df["drawdown"].min()
-            max_ddpercent = df["ddpercent"].min()
-            max_drawdown_end = df["drawdown"].idxmin()
-
-            if isinstance(max_drawdown_end, date):
-                max_drawdown_start = df["balance"][:max_drawdown_end].idxmax()
-                max_drawdown_duration = (max_drawdown_end - max_drawdown_start).days
-            else:
-                max_drawdown_duration = 0
-
-            total_net_pnl = df["net_pnl"].sum()
-            daily_net_pnl = total_net_pnl / total_days
-
-            total_commission = df["commission"].sum()
-            daily_commission = total_commission / total_days
-
-            total_slippage = df["slippage"].sum()
-            daily_slippage = total_slippage / total_days
-
-            total_turnover = df["turnover"].sum()
-            daily_turnover = total_turnover / total_days
-
-            total_trade_count = df["trade_count"].sum()
-            daily_trade_count = total_trade_count / total_days
-
-            total_return = (end_balance / self.capital - 1) * 100
-            annual_return = total_return / total_days * 240
-            daily_return = df["return"].mean() * 100
-            return_std = df["return"].std() * 100
-
-            if return_std:
-                sharpe_ratio = daily_return / return_std * np.sqrt(240)
-            else:
-                sharpe_ratio = 0
-
-            return_drawdown_ratio = -total_return / max_ddpercent
+        statistics = calculate_statistics(df, self.capital)
 
         # Output
         if output:
             self.output("-" * 30)
-            self.output(f"首个交易日：\t{start_date}")
-            self.output(f"最后交易日：\t{end_date}")
+            self.output(f"首个交易日：\t{statistics['start_date']}")
+            self.output(f"最后交易日：\t{statistics['end_date']}")
 
-            self.output(f"总交易日：\t{total_days}")
-            self.output(f"盈利交易日：\t{profit_days}")
-            self.output(f"亏损交易日：\t{loss_days}")
+            self.output(f"总交易日：\t{statistics['total_days']}")
+            self.output(f"盈利交易日：\t{statistics['profit_days']}")
+            self.output(f"亏损交易日：\t{statistics['loss_days']}")
 
             self.output(f"起始资金：\t{self.capital:,.2f}")
-            self.output(f"结束资金：\t{end_balance:,.2f}")
-
-            self.output(f"总收益率：\t{total_return:,.2f}%")
-            self.output(f"年化收益：\t{annual_return:,.2f}%")
-            self.output(f"最大回撤: \t{max_drawdown:,.2f}")
-            self.output(f"百分比最大回撤: {max_ddpercent:,.2f}%")
-            self.output(f"最长回撤天数: \t{max_drawdown_duration}")
-
-            self.output(f"总盈亏：\t{total_net_pnl:,.2f}")
-            self.output(f"总手续费：\t{total_commission:,.2f}")
-            self.output(f"总滑点：\t{total_slippage:,.2f}")
-            self.output(f"总成交金额：\t{total_turnover:,.2f}")
-            self.output(f"总成交笔数：\t{total_trade_count}")
-
-            self.output(f"日均盈亏：\t{daily_net_pnl:,.2f}")
-            self.output(f"日均手续费：\t{daily_commission:,.2f}")
-            self.output(f"日均滑点：\t{daily_slippage:,.2f}")
-            self.output(f"日均成交金额：\t{daily_turnover:,.2f}")
-            self.output(f"日均成交笔数：\t{daily_trade_count}")
-
-            self.output(f"日均收益率：\t{daily_return:,.2f}%")
-            self.output(f"收益标准差：\t{return_std:,.2f}%")
-            self.output(f"Sharpe Ratio：\t{sharpe_ratio:,.2f}")
-            self.output(f"收益回撤比：\t{return_drawdown_ratio:,.2f}")
-
-        statistics = {
-            "start_date": start_date,
-            "end_date": end_date,
-            "total_days": total_days,
-            "profit_days": profit_days,
-            "loss_days": loss_days,
-            "capital": self.capital,
-            "end_balance": end_balance,
-            "max_drawdown": max_drawdown,
-            "max_ddpercent": max_ddpercent,
-            "max_drawdown_duration": max_drawdown_duration,
-            "total_net_pnl": total_net_pnl,
-            "daily_net_pnl": daily_net_pnl,
-            "total_commission": total_commission,
-            "daily_commission": daily_commission,
-            "total_slippage": total_slippage,
-            "daily_slippage": daily_slippage,
-            "total_turnover": total_turnover,
-            "daily_turnover": daily_turnover,
-            "total_trade_count": total_trade_count,
-            "daily_trade_count": daily_trade_count,
-            "total_return": total_return,
-            "annual_return": annual_return,
-            "daily_return": daily_return,
-            "return_std": return_std,
-            "sharpe_ratio": sharpe_ratio,
-            "return_drawdown_ratio": return_drawdown_ratio,
-        }
-
-        # Filter potential error infinite value
-        for key, value in statistics.items():
-            if value in (np.inf, -np.inf):
-                value = 0
-            statistics[key] = np.nan_to_num(value)
+            self.output(f"结束资金：\t{statistics['end_balance']:,.2f}")
+
+            self.output(f"总收益率：\t{statistics['total_return']:,.2f}%")
+            self.output(f"年化收益：\t{statistics['annual_return']:,.2f}%")
+            self.output(f"最大回撤: \t{statistics['max_drawdown']:,.2f}")
+            self.output(f"百分比最大回撤: {statistics['max_ddpercent']:,.2f}%")
+            self.output(f"最长回撤天数: \t{statistics['max_drawdown_duration']}")
+
+            self.output(f"总盈亏：\t{statistics['total_net_pnl']:,.2f}")
+            self.output(f"总手续费：\t{statistics['total_commission']:,.2f}")
+            self.output(f"总滑点：\t{statistics['total_slippage']:,.2f}")
+            self.output(f"总成交金额：\t{statistics['total_turnover']:,.2f}")
+            self.output(f"总成交笔数：\t{statistics['total_trade_count']}")
+
+            self.output(f"日均盈亏：\t{statistics['daily_net_pnl']:,.2f}")
+            self.output(f"日均手续费：\t{statistics['daily_commission']:,.2f}")
+            self.output(f"日均滑点：\t{statistics['daily_slippage']:,.2f}")
+            self.output(f"日均成交金额：\t{statistics['daily_turnover']:,.2f}")
+            self.output(f"日均成交笔数：\t{statistics['daily_trade_count']}")
+
+            self.output(f"日均收益率：\t{statistics['daily_return']:,.2f}%")
+            self.output(f"收益标准差：\t{statistics['return_std']:,.2f}%")
+            self.output(f"Sharpe Ratio：\t{statistics['sharpe_ratio']:,.2f}")
+            self.output(f"收益回撤比：\t{statistics['return_drawdown_ratio']:,.2f}")
 
         self.output("策略统计指标计算完成")
         return statistics
@@ -563,33 +487,43 @@ class BacktestingEngine:
             self.output("优化目标未设置，请检查")
             return
 
+        # Load bar data once and publish it into shared memory for all workers
+        shared_history = self.share_history_data()
+        history = shared_history.spec if shared_history else None
+
         # Use multiprocessing pool for running backtesting with different setting
         # Force to use spawn method to create new process (instead of fork on Linux)
         ctx = multiprocessing.get_context("spawn")
         pool = ctx.Pool(multiprocessing.cpu_count())
 
-        results = []
-        for setting in settings:
-            result = (pool.apply_async(optimize, (
-                target_name,
-                self.strategy_class,
-                setting,
-                self.vt_symbol,
-                self.interval,
-                self.start,
-                self.rate,
-                self.slippage,
-                self.size,
-                self.pricetick,
-                self.capital,
-                self.end,
-                self.mode,
-                self.inverse
-            )))
-            results.append(result)
-
-        pool.close()
-        pool.join()
+        try:
+            results = []
+            for setting in settings:
+                result = (pool.apply_async(optimize, (
+                    target_name,
+                    self.strategy_class,
+                    setting,
+                    self.vt_symbol,
+                    self.interval,
+                    self.start,
+                    self.rate,
+                    self.slippage,
+                    self.size,
+                    self.pricetick,
+                    self.capital,
+                    self.end,
+                    self.mode,
+                    self.inverse,
+                    history
+                )))
+                results.append(result)
+
+            pool.close()
+            pool.join()
+        finally:
+            if shared_history:
+                shared_history.close()
+                shared_history.unlink()
 
         # Sort results and output
         result_values = [result.get() for result in results]
@@ -602,8 +536,72 @@ class BacktestingEngine:
 
         return result_values
 
-    def run_ga_optimization(self, optimization_setting: OptimizationSetting, population_size=100, ngen_size=30, output=True):
-        """"""
+    def get_history_key(self) -> tuple:
+        """
+        Parameters deciding content of history data.
+        """
+        return (
+            self.mode,
+            self.vt_symbol,
+            self.interval,
+            self.window,
+            self.source_interval,
+            self.start,
+            self.end
+        )
+
+    def get_data_key(self) -> tuple:
+        """
+        Identify history data by loading parameters and resolved data range,
+        which is the first and last datetime of loaded history if available.
+        """
+        key = self.get_history_key()
+
+        if self.history_data and self.history_key == key:
+            return key[:-2] + (self.history_data[0].datetime, self.history_data[-1].datetime)
+        return key
+
+    def share_history_data(self):
+        """
+        Publish bar history into a shared memory block for optimization workers.
+        Tick mode is not supported, workers will load data by themselves.
+        """
+        if self.mode != BacktestingMode.BAR:
+            return None
+
+        # Reload if history data is not loaded for current parameters
+        if not self.history_data or self.history_key != self.get_history_key():
+            self.load_data()
+
+        if not self.history_data:
+            return None
+
+        if isinstance(self.history_data, BarColumns):
+            return self.history_data.to_shared()
+        return BarColumns.from_bars(self.history_data).to_shared()
+
+    def run_ga_optimization(
+        self,
+        optimization_setting: OptimizationSetting,
+        population_size=100,
+        ngen_size=30,
+        output=True,
+        cache_path: str = None,
+        patience: int = 5,
+        tolerance: float = 1e-6,
+        history: dict = None
+    ):
+        """
+        Genetic algorithm optimization, individuals are evaluated by a
+        persistent process pool sharing the same history data.
+
+        cache_path: file to persist fitness of evaluated parameters, so that
+                    repeated studies skip known points
+        patience: stop early if best fitness not improved for these generations,
+                  0 to always run ngen_size generations
+        history: spec of history already shared by caller, which covers
+                 the start/end range
+        """
         # Get optimization setting and target
         settings = optimization_setting.generate_setting_ga()
         target_name = optimization_setting.target_name
@@ -630,36 +628,48 @@ class BacktestingEngine:
                     individual[i] = paramlist[i]
             return individual,
 
-        # Create ga object function
-        global ga_target_name
-        global ga_strategy_class
-        global ga_setting
-        global ga_vt_symbol
-        global ga_interval
-        global ga_start
-        global ga_rate
-        global ga_slippage
-        global ga_size
-        global ga_pricetick
-        global ga_capital
-        global ga_end
-        global ga_mode
-        global ga_inverse
-
-        ga_target_name = target_name
-        ga_strategy_class = self.strategy_class
-        ga_setting = settings[0]
-        ga_vt_symbol = self.vt_symbol
-        ga_interval = self.interval
-        ga_start = self.start
-        ga_rate = self.rate
-        ga_slippage = self.slippage
-        ga_size = self.size
-        ga_pricetick = self.pricetick
-        ga_capital = self.capital
-        ga_end = self.end
-        ga_mode = self.mode
-        ga_inverse = self.inverse
+        # Load bar data once and publish it into shared memory for all workers
+        shared_history = None
+        if not history:
+            shared_history = self.share_history_data()
+            history = shared_history.spec if shared_history else None
+
+        evaluator = GaFitnessEvaluator(
+            target_name,
+            self.strategy_class,
+            self.vt_symbol,
+            self.interval,
+            self.start,
+            self.rate,
+            self.slippage,
+            self.size,
+            self.pricetick,
+            self.capital,
+            self.end,
+            self.mode,
+            self.inverse,
+            history,
+            self.get_data_key()
+        )
+        cache = GaFitnessCache(evaluator.study_key, cache_path)
+
+        # Force to use spawn method to create new process (instead of fork on Linux)
+        ctx = multiprocessing.get_context("spawn")
+        pool = ctx.Pool(multiprocessing.cpu_count())
+
+        def cached_map(func, individuals):
+            """
+            Evaluate only parameters not in cache, results are kept across generations.
+            """
+            keys = [tuple(individual) for individual in individuals]
+            missing = [key for key in dict.fromkeys(keys) if key not in cache]
+
+            if missing:
+                for key, fitness in zip(missing, pool.map(func, missing)):
+                    cache[key] = fitness
+                cache.save()
+
+            return [cache[key] for key in keys]
 
         # Set up genetic algorithem
         toolbox = base.Toolbox()
@@ -667,8 +677,9 @@ class BacktestingEngine:
         toolbox.register("population", tools.initRepeat, list, toolbox.individual)
         toolbox.register("mate", tools.cxTwoPoint)
         toolbox.register("mutate", mutate_individual, indpb=1)
-        toolbox.register("evaluate", ga_optimize)
+        toolbox.register("evaluate", evaluator)
         toolbox.register("select", tools.selNSGA2)
+        toolbox.register("map", cached_map)
 
         total_size = len(settings)
         pop_size = population_size                      # number of individuals in each generation
@@ -689,10 +700,6 @@ class BacktestingEngine:
         stats.register("min", np.min, axis=0)
         stats.register("max", np.max, axis=0)
 
-        # Multiprocessing is not supported yet.
-        # pool = multiprocessing.Pool(multiprocessing.cpu_count())
-        # toolbox.register("map", pool.map)
-
         # Run ga optimization
         self.output(f"参数优化空间：{total_size}")
         self.output(f"每代族群总数：{pop_size}")
@@ -700,20 +707,31 @@ class BacktestingEngine:
         self.output(f"迭代次数：{ngen}")
         self.output(f"交叉概率：{cxpb:.0%}")
         self.output(f"突变概率：{mutpb:.0%}")
+        self.output(f"已缓存结果：{len(cache)}")
 
         start = time()
 
-        algorithms.eaMuPlusLambda(
-            pop,
-            toolbox,
-            mu,
-            lambda_,
-            cxpb,
-            mutpb,
-            ngen,
-            stats,
-            halloffame=hof
-        )
+        try:
+            self.run_mu_plus_lambda(
+                pop,
+                toolbox,
+                mu,
+                lambda_,
+                cxpb,
+                mutpb,
+                ngen,
+                stats,
+                hof,
+                patience,
+                tolerance
+            )
+        finally:
+            pool.close()
+            pool.join()
+
+            if shared_history:
+                shared_history.close()
+                shared_history.unlink()
 
         end = time()
         cost = int((end - start))
@@ -725,11 +743,244 @@ class BacktestingEngine:
 
         for parameter_values in hof:
             setting = dict(parameter_values)
-            target_value = ga_optimize(parameter_values)[0]
+            target_value = cache[tuple(parameter_values)][0]
             results.append((setting, target_value, {}))
 
         return results
 
+    def run_mu_plus_lambda(
+        self,
+        population: list,
+        toolbox: base.Toolbox,
+        mu: int,
+        lambda_: int,
+        cxpb: float,
+        mutpb: float,
+        ngen: int,
+        stats: tools.Statistics,
+        halloffame: tools.ParetoFront,
+        patience: int,
+        tolerance: float
+    ):
+        """
+        Same as deap.algorithms.eaMuPlusLambda, with early termination
+        when best fitness is not improved for patience generations.
+        """
+        invalid_ind = [ind for ind in population if not ind.fitness.valid]
+        fitnesses = toolbox.map(toolbox.evaluate, invalid_ind)
+        for ind, fit in zip(invalid_ind, fitnesses):
+            ind.fitness.values = fit
+
+        halloffame.update(population)
+        record = stats.compile(population)
+        self.output(f"第0代：{record}")
+
+        best = max(ind.fitness.values[0] for ind in population)
+        stall = 0
+
+        for gen in range(1, ngen + 1):
+            offspring = algorithms.varOr(population, toolbox, lambda_, cxpb, mutpb)
+
+            invalid_ind = [ind for ind in offspring if not ind.fitness.valid]
+            fitnesses = toolbox.map(toolbox.evaluate, invalid_ind)
+            for ind, fit in zip(invalid_ind, fitnesses):
+                ind.fitness.values = fit
+
+            halloffame.update(offspring)
+            population[:] = toolbox.select(population + offspring, mu)
+
+            record = stats.compile(population)
+            self.output(f"第{gen}代：{record}")
+
+            gen_best = max(ind.fitness.values[0] for ind in population)
+            if gen_best > best + tolerance:
+                best = gen_best
+                stall = 0
+            else:
+                stall += 1
+
+            if patience and stall >= patience:
+                self.output(f"最优结果连续{stall}代没有提升，提前结束")
+                break
+
+        return population
+
+    def run_walk_forward_optimization(
+        self,
+        optimization_setting: OptimizationSetting,
+        train_days: int = 250,
+        test_days: int = 60,
+        anchored: bool = False,
+        use_ga: bool = False,
+        output: bool = True,
+        **ga_kwargs
+    ):
+        """
+        Walk-forward optimization over rolling in-sample/out-of-sample folds.
+
+        Parameters are optimized on the in-sample days of each fold and
+        tested on the following out-of-sample days. History is loaded once
+        and shared by all workers, grid optimization of all folds runs in
+        one process pool.
+
+        train_days/test_days: number of trading days in each fold
+        anchored: in-sample range always starts from the first day
+        use_ga: optimize each fold with run_ga_optimization, ga_kwargs
+                are passed to it
+
+        Stitched out-of-sample daily result is saved as daily_df, table of
+        folds as walk_forward_df and parameter stability as
+        walk_forward_stability. Return list of (setting, out-of-sample
+        target, fold data) for each fold.
+        """
+        settings = optimization_setting.generate_setting()
+        target_name = optimization_setting.target_name
+
+        if not settings:
+            self.output("优化参数组合为空，请检查")
+            return
+
+        if not target_name:
+            self.output("优化目标未设置，请检查")
+            return
+
+        if self.mode != BacktestingMode.BAR:
+            self.output("滚动优化仅支持K线模式")
+            return
+
+        shared_history = self.share_history_data()
+        if not shared_history:
+            self.output("历史数据为空，无法优化")
+            return
+
+        folds = generate_walk_forward_folds(
+            shared_history.get_dates(),
+            train_days,
+            test_days,
+            anchored,
+            shared_history.tzinfo
+        )
+        if not folds:
+            self.output("历史数据不足一个滚动区间，请检查")
+            shared_history.close()
+            shared_history.unlink()
+            return
+
+        self.output(f"滚动区间数量：{len(folds)}")
+
+        history = shared_history.spec
+        args = (
+            self.vt_symbol,
+            self.interval,
+            self.rate,
+            self.slippage,
+            self.size,
+            self.pricetick,
+            self.capital,
+            self.mode,
+            self.inverse
+        )
+
+        ctx = multiprocessing.get_context("spawn")
+
+        try:
+            # In-sample optimization of each fold
+            if use_ga:
+                start, end = self.start, self.end
+                try:
+                    for fold in folds:
+                        self.start = fold["train_start"]
+                        self.end = fold["train_end"]
+
+                        results = self.run_ga_optimization(
+                            optimization_setting,
+                            output=False,
+                            history=history,
+                            **ga_kwargs
+                        )
+                        best = max(results, key=lambda result: result[1])
+                        fold["setting"], fold["in_sample"] = best[0], best[1]
+                finally:
+                    self.start, self.end = start, end
+
+            with ctx.Pool(multiprocessing.cpu_count()) as pool:
+                if not use_ga:
+                    fold_results = []
+                    for fold in folds:
+                        results = [
+                            pool.apply_async(optimize, (
+                                target_name,
+                                self.strategy_class,
+                                setting,
+                                self.vt_symbol,
+                                self.interval,
+                                fold["train_start"],
+                                self.rate,
+                                self.slippage,
+                                self.size,
+                                self.pricetick,
+                                self.capital,
+                                fold["train_end"],
+                                self.mode,
+                                self.inverse,
+                                history
+                            ))
+                            for setting in settings
+                        ]
+                        fold_results.append(results)
+
+                    for fold, results in zip(folds, fold_results):
+                        target_values = [result.get()[1] for result in results]
+                        n = int(np.argmax(target_values))
+                        fold["setting"], fold["in_sample"] = settings[n], target_values[n]
+
+                # Out-of-sample test of each fold with its best setting
+                test_results = [
+                    pool.apply_async(walk_forward_test, (
+                        self.strategy_class,
+                        fold["setting"],
+                        fold["train_start"],
+                        fold["test_start"],
+                        fold["test_end"],
+                        *args,
+                        history
+                    ))
+                    for fold in folds
+                ]
+                test_dfs = [result.get() for result in test_results]
+        finally:
+            shared_history.close()
+            shared_history.unlink()
+
+        # Stitch out-of-sample daily results
+        for fold, df in zip(folds, test_dfs):
+            fold["out_of_sample"] = calculate_statistics(df.copy(), self.capital)[target_name]
+            if fold["in_sample"]:
+                fold["efficiency"] = fold["out_of_sample"] / fold["in_sample"]
+            else:
+                fold["efficiency"] = np.nan
+
+        self.daily_df = concat(test_dfs)
+        self.walk_forward_df = DataFrame(folds)
+        self.walk_forward_stability = calculate_parameter_stability(
+            [fold["setting"] for fold in folds]
+        )
+
+        result_values = [
+            (str(fold["setting"]), fold["out_of_sample"], fold)
+            for fold in folds
+        ]
+
+        if output:
+            for fold in folds:
+                msg = (
+                    f"样本外：{fold['test_start'].date()} - {fold['test_end'].date()}, "
+                    f"参数：{fold['setting']}, 样本内：{fold['in_sample']}, 样本外：{fold['out_of_sample']}"
+                )
+                self.output(msg)
+
+        return result_values
+
     def update_daily_close(self, price: float):
         """"""
         d = self.datetime.date()
@@ -744,6 +995,7 @@ class BacktestingEngine:
         """"""
         self.bar = bar
         self.datetime = bar.datetime
+        self.clock.update(self.datetime)
 
         self.cross_limit_order()
         self.cross_stop_order()
@@ -755,6 +1007,7 @@ class BacktestingEngine:
         """"""
         self.tick = tick
         self.datetime = tick.datetime
+        self.clock.update(self.datetime)
 
         self.cross_limit_order()
         self.cross_stop_order()
@@ -766,6 +1019,10 @@ class BacktestingEngine:
         """
         Cross limit order with last bar/tick data.
         """
+        if not self.active_limit_orders:
+            self.submitting_orderids = []
+            return
+
         if self.mode == BacktestingMode.BAR:
             long_cross_price = self.bar.low_price
             short_cross_price = self.bar.high_price
@@ -777,7 +1034,22 @@ class BacktestingEngine:
             long_best_price = long_cross_price
             short_best_price = short_cross_price
 
-        for order in list(self.active_limit_orders.values()):
+        # Only new orders and orders at crossed price levels need to be checked,
+        # they are processed in the order of sending as before.
+        orderids = self.submitting_orderids
+        self.submitting_orderids = []
+
+        if long_cross_price > 0:
+            orderids.extend(self.active_limit_orders.select(Direction.LONG, low=long_cross_price))
+        if short_cross_price > 0:
+            orderids.extend(self.active_limit_orders.select(Direction.SHORT, high=short_cross_price))
+
+        for vt_orderid in self.active_limit_orders.sort_orderids(orderids):
+            # Skip order cancelled in callback of former order.
+            order = self.active_limit_orders.get(vt_orderid, None)
+            if not order:
+                continue
+
             # Push order update with status "not traded" (pending).
             if order.status == Status.SUBMITTING:
                 order.status = Status.NOTTRADED
@@ -820,7 +1092,7 @@ class BacktestingEngine:
                 symbol=order.symbol,
                 exchange=order.exchange,
                 orderid=order.orderid,
-                tradeid=str(self.trade_count),
+                tradeid=str(self.clock.new_id()),
                 direction=order.direction,
                 offset=order.offset,
                 price=trade_price,
@@ -839,6 +1111,9 @@ class BacktestingEngine:
         """
         Cross stop order with last bar/tick data.
         """
+        if not self.active_stop_orders:
+            return
+
         if self.mode == BacktestingMode.BAR:
             long_cross_price = self.bar.high_price
             short_cross_price = self.bar.low_price
@@ -850,7 +1125,17 @@ class BacktestingEngine:
             long_best_price = long_cross_price
             short_best_price = short_cross_price
 
-        for stop_order in list(self.active_stop_orders.values()):
+        orderids = (
+            self.active_stop_orders.select(Direction.LONG, high=long_cross_price)
+            + self.active_stop_orders.select(Direction.SHORT, low=short_cross_price)
+        )
+
+        for stop_orderid in self.active_stop_orders.sort_orderids(orderids):
+            # Skip stop order cancelled in callback of former order.
+            stop_order = self.active_stop_orders.get(stop_orderid, None)
+            if not stop_order:
+                continue
+
             # Check whether stop order can be triggered.
             long_cross = (
                 stop_order.direction == Direction.LONG
@@ -871,7 +1156,7 @@ class BacktestingEngine:
             order = OrderData(
                 symbol=self.symbol,
                 exchange=self.exchange,
-                orderid=str(self.limit_order_count),
+                orderid=str(self.clock.new_id()),
                 direction=stop_order.direction,
                 offset=stop_order.offset,
                 price=stop_order.price,
@@ -897,7 +1182,7 @@ class BacktestingEngine:
                 symbol=order.symbol,
                 exchange=order.exchange,
                 orderid=order.orderid,
-                tradeid=str(self.trade_count),
+                tradeid=str(self.clock.new_id()),
                 direction=order.direction,
                 offset=order.offset,
                 price=trade_price,
@@ -974,7 +1259,7 @@ class BacktestingEngine:
             offset=offset,
             price=price,
             volume=volume,
-            stop_orderid=f"{STOPORDER_PREFIX}.{self.stop_order_count}",
+            stop_orderid=f"{STOPORDER_PREFIX}.{self.clock.new_id()}",
             strategy_name=self.strategy.strategy_name,
         )
 
@@ -996,7 +1281,7 @@ class BacktestingEngine:
         order = OrderData(
             symbol=self.symbol,
             exchange=self.exchange,
-            orderid=str(self.limit_order_count),
+            orderid=str(self.clock.new_id()),
             direction=direction,
             offset=offset,
             price=price,
@@ -1008,6 +1293,7 @@ class BacktestingEngine:
 
         self.active_limit_orders[order.vt_orderid] = order
         self.limit_orders[order.vt_orderid] = order
+        self.submitting_orderids.append(order.vt_orderid)
 
         return order.vt_orderid
 
@@ -1208,10 +1494,14 @@ def optimize(
     capital: int,
     end: datetime,
     mode: BacktestingMode,
-    inverse: bool
+    inverse: bool,
+    history: dict = None
 ):
     """
     Function for running in multiprocessing.pool
+
+    If spec of shared history is given, bars are rebuilt from the
+    shared memory block instead of loading from database.
     """
     engine = BacktestingEngine()
 
@@ -1230,7 +1520,13 @@ def optimize(
     )
 
     engine.add_strategy(strategy_class, setting)
-    engine.load_data()
+
+    if history:
+        history_data = attach_shared_history(tuple(history.items()))
+        engine.history_data = history_data.between(start, end)
+    else:
+        engine.load_data()
+
     engine.run_backtesting()
     engine.calculate_result()
     statistics = engine.calculate_statistics(output=False)
@@ -1239,33 +1535,253 @@ def optimize(
     return (str(setting), target_value, statistics)
 
 
-@lru_cache(maxsize=1000000)
-def _ga_optimize(parameter_values: tuple):
-    """"""
-    setting = dict(parameter_values)
-
-    result = optimize(
-        ga_target_name,
-        ga_strategy_class,
-        setting,
-        ga_vt_symbol,
-        ga_interval,
-        ga_start,
-        ga_rate,
-        ga_slippage,
-        ga_size,
-        ga_pricetick,
-        ga_capital,
-        ga_end,
-        ga_mode,
-        ga_inverse
+def walk_forward_test(
+    strategy_class: CtaTemplate,
+    setting: dict,
+    start: datetime,
+    test_start: datetime,
+    test_end: datetime,
+    vt_symbol: str,
+    interval: Interval,
+    rate: float,
+    slippage: float,
+    size: float,
+    pricetick: float,
+    capital: int,
+    mode: BacktestingMode,
+    inverse: bool,
+    history: dict
+):
+    """
+    Function for running in multiprocessing.pool
+
+    Backtest from start (beginning of in-sample range) so that strategy is
+    initialized and running when out-of-sample range begins, only daily
+    result of out-of-sample days is returned.
+    """
+    engine = BacktestingEngine()
+    engine.output = lambda msg: None
+
+    engine.set_parameters(
+        vt_symbol=vt_symbol,
+        interval=interval,
+        start=start,
+        rate=rate,
+        slippage=slippage,
+        size=size,
+        pricetick=pricetick,
+        capital=capital,
+        end=test_end,
+        mode=mode,
+        inverse=inverse
     )
-    return (result[1],)
+    engine.add_strategy(strategy_class, setting)
 
+    history_data = attach_shared_history(tuple(history.items()))
+    test_data = history_data.between(test_start, test_end)
+    engine.history_data = history_data.between(start, test_end)
 
-def ga_optimize(parameter_values: list):
-    """"""
-    return _ga_optimize(tuple(parameter_values))
+    engine.run_backtesting()
+    df = engine.calculate_result()
+
+    dates = test_data.get_dates()
+    if df is None:
+        df = DataFrame(0.0, index=dates, columns=DAILY_FIELDS)
+        df.index.name = "date"
+        return df
+    return df[DAILY_FIELDS].reindex(dates, fill_value=0)
+
+
+def generate_walk_forward_folds(
+    dates: list,
+    train_days: int,
+    test_days: int,
+    anchored: bool = False,
+    tzinfo=None
+):
+    """
+    Split trading dates into in-sample/out-of-sample folds, the last
+    out-of-sample range may be shorter than test_days.
+    """
+    folds = []
+
+    for test_begin in range(train_days, len(dates), test_days):
+        train_begin = 0 if anchored else test_begin - train_days
+        test_stop = min(test_begin + test_days, len(dates))
+
+        fold = {
+            "fold": len(folds),
+            "train_start": datetime.combine(dates[train_begin], dtime.min, tzinfo),
+            "train_end": datetime.combine(dates[test_begin - 1], dtime.max, tzinfo),
+            "test_start": datetime.combine(dates[test_begin], dtime.min, tzinfo),
+            "test_end": datetime.combine(dates[test_stop - 1], dtime.max, tzinfo),
+        }
+        folds.append(fold)
+
+    return folds
+
+
+def calculate_parameter_stability(settings: list):
+    """
+    Statistics of best parameters chosen in each fold.
+
+    changes: number of folds choosing a different value from previous fold
+    mode_ratio: share of folds choosing the most common value
+    """
+    df = DataFrame(settings)
+
+    data = {}
+    for name in df.columns:
+        values = df[name]
+        row = {
+            "changes": int((values != values.shift()).sum() - 1),
+            "mode_ratio": values.value_counts().iloc[0] / len(values),
+        }
+
+        if np.issubdtype(values.dtype, np.number):
+            row["mean"] = values.mean()
+            row["std"] = values.std(ddof=0)
+            row["min"] = values.min()
+            row["max"] = values.max()
+            row["cv"] = row["std"] / abs(row["mean"]) if row["mean"] else np.nan
+
+        data[name] = row
+
+    return DataFrame(data).T
+
+
+class GaFitnessEvaluator:
+    """
+    Picklable fitness function of GA, sent to worker processes together
+    with the backtesting parameters.
+    """
+
+    def __init__(
+        self,
+        target_name: str,
+        strategy_class: CtaTemplate,
+        vt_symbol: str,
+        interval: Interval,
+        start: datetime,
+        rate: float,
+        slippage: float,
+        size: float,
+        pricetick: float,
+        capital: int,
+        end: datetime,
+        mode: BacktestingMode,
+        inverse: bool,
+        history: dict = None,
+        data_key: tuple = None
+    ):
+        """
+        data_key: identity of history data, see BacktestingEngine.get_data_key
+        """
+        self.target_name = target_name
+        self.strategy_class = strategy_class
+        self.args = (
+            vt_symbol,
+            interval,
+            start,
+            rate,
+            slippage,
+            size,
+            pricetick,
+            capital,
+            end,
+            mode,
+            inverse
+        )
+        self.history = history
+        self.data_key = data_key
+
+    @property
+    def study_key(self):
+        """
+        Identify results of the same strategy, data, costs and target.
+        """
+        (
+            vt_symbol,
+            interval,
+            start,
+            rate,
+            slippage,
+            size,
+            pricetick,
+            capital,
+            end,
+            mode,
+            inverse
+        ) = self.args
+
+        data_key = self.data_key or (mode, vt_symbol, interval, start, end)
+        costs = (rate, slippage, size, pricetick, capital, inverse)
+        return str((self.target_name, self.strategy_class.__name__, data_key, costs))
+
+    def __call__(self, parameter_values: tuple):
+        """"""
+        setting = dict(parameter_values)
+
+        result = optimize(
+            self.target_name,
+            self.strategy_class,
+            setting,
+            *self.args,
+            history=self.history
+        )
+        return (result[1],)
+
+
+class GaFitnessCache:
+    """
+    Fitness of evaluated parameters, optionally persisted into a pickle file
+    holding results of different studies.
+    """
+
+    def __init__(self, study_key: str, path: str = None):
+        """"""
+        self.study_key = study_key
+        self.path = path
+        self.studies = {}
+
+        if path and os.path.exists(path):
+            with open(path, "rb") as f:
+                self.studies = pickle.load(f)
+
+        self.data = self.studies.setdefault(study_key, {})
+
+    def __contains__(self, key: tuple):
+        """"""
+        return key in self.data
+
+    def __getitem__(self, key: tuple):
+        """"""
+        return self.data[key]
+
+    def __setitem__(self, key: tuple, fitness: tuple):
+        """"""
+        self.data[key] = fitness
+
+    def __len__(self):
+        """"""
+        return len(self.data)
+
+    def save(self):
+        """"""
+        if not self.path:
+            return
+
+        with open(self.path, "wb") as f:
+            pickle.dump(self.studies, f)
+
+
+@lru_cache(maxsize=1)
+def attach_shared_history(history: tuple):
+    """
+    Attach shared history once in each worker process, bars are read
+    from the shared memory block directly without copy.
+    """
+    return BarColumns.attach(dict(history))
 
 
 @lru_cache(maxsize=999)
@@ -1282,6 +1798,20 @@ def load_bar_data(
     )
 
 
+@lru_cache(maxsize=999)
+def load_bar_columns(
+    symbol: str,
+    exchange: Exchange,
+    interval: Interval,
+    start: datetime,
+    end: datetime
+):
+    """"""
+    return database_manager.load_bar_columns(
+        symbol, exchange, interval, start, end
+    )
+
+
 @lru_cache(maxsize=999)
 def load_tick_data(
     symbol: str,
@@ -1294,18 +1824,3 @@ def load_tick_data(
         symbol, exchange, start, end
     )
 
-
-# GA related global value
-ga_end = None
-ga_mode = None
-ga_target_name = None
-ga_strategy_class = None
-ga_setting = None
-ga_vt_symbol = None
-ga_interval = None
-ga_start = None
-ga_rate = None
-ga_slippage = None
-ga_size = None
-ga_pricetick = None
-ga_capital = None
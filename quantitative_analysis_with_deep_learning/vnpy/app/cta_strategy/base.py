@@ -2,9 +2,12 @@
 Defines constants and objects used in CtaStrategy App.
 """
 
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
 from dataclasses import dataclass, field
 from enum import Enum
 from datetime import timedelta
+from typing import Any, Iterable, List
 
 from vnpy.trader.constant import Direction, Offset, Interval
 
@@ -42,6 +45,127 @@ class StopOrder:
     status: StopOrderStatus = StopOrderStatus.WAITING
 
 
+class OrderBook:
+    """
+    Active orders indexed by direction and price.
+
+    Works like a dict of orderid: order and also keeps a sorted price
+    ladder for each direction, so orders crossed by a price are found
+    by bisection instead of checking every active order.
+    """
+
+    def __init__(self):
+        """"""
+        self.orders = {}                    # orderid: order
+        self.index = {}                     # orderid: (sequence, direction, price)
+        self.count = 0
+
+        self.prices = defaultdict(list)     # direction: sorted price list
+        self.levels = defaultdict(dict)     # direction: {price: {orderid: order}}
+
+    def __setitem__(self, orderid: str, order: Any):
+        """"""
+        if orderid in self.orders:
+            self.pop(orderid)
+
+        self.count += 1
+        self.orders[orderid] = order
+        self.index[orderid] = (self.count, order.direction, order.price)
+
+        levels = self.levels[order.direction]
+        level = levels.get(order.price, None)
+        if level is None:
+            level = levels[order.price] = {}
+            insort(self.prices[order.direction], order.price)
+        level[orderid] = order
+
+    def __getitem__(self, orderid: str):
+        """"""
+        return self.orders[orderid]
+
+    def __contains__(self, orderid: str):
+        """"""
+        return orderid in self.orders
+
+    def __len__(self):
+        """"""
+        return len(self.orders)
+
+    def __iter__(self):
+        """"""
+        return iter(self.orders)
+
+    def get(self, orderid: str, default: Any = None):
+        """"""
+        return self.orders.get(orderid, default)
+
+    def keys(self):
+        """"""
+        return self.orders.keys()
+
+    def values(self):
+        """"""
+        return self.orders.values()
+
+    def items(self):
+        """"""
+        return self.orders.items()
+
+    def pop(self, orderid: str, *default):
+        """
+        Remove order from the book, empty price level is removed from ladder.
+        """
+        if orderid not in self.orders:
+            if default:
+                return default[0]
+            raise KeyError(orderid)
+
+        order = self.orders.pop(orderid)
+        _, direction, price = self.index.pop(orderid)
+
+        levels = self.levels[direction]
+        level = levels[price]
+        level.pop(orderid)
+
+        if not level:
+            levels.pop(price)
+            prices = self.prices[direction]
+            prices.pop(bisect_left(prices, price))
+
+        return order
+
+    def clear(self):
+        """"""
+        self.orders.clear()
+        self.index.clear()
+        self.prices.clear()
+        self.levels.clear()
+
+    def select(self, direction: Direction, low: float = None, high: float = None) -> List[str]:
+        """
+        Get orderids of one direction with price between low and high (inclusive).
+        """
+        prices = self.prices.get(direction, None)
+        if not prices:
+            return []
+
+        start = bisect_left(prices, low) if low is not None else 0
+        end = bisect_right(prices, high) if high is not None else len(prices)
+
+        levels = self.levels[direction]
+        orderids = []
+        for price in prices[start:end]:
+            orderids.extend(levels[price])
+        return orderids
+
+    def sort_orderids(self, orderids: Iterable[str]) -> List[str]:
+        """
+        Sort active orderids by the time they were added, duplicates are removed.
+        """
+        orderids = {orderid for orderid in orderids if orderid in self.orders}
+        return sorted(orderids, key=lambda orderid: self.index[orderid][0])
+
+
 EVENT_CTA_LOG = "eCtaLog"
 EVENT_CTA_STRATEGY = "eCtaStrategy"
 EVENT_CTA_STOPORDER = "eCtaStopOrder"
@@ -46,6 +46,7 @@ from .base import (
     EVENT_CTA_STRATEGY,
     EVENT_CTA_STOPORDER,
     EngineType,
+    OrderBook,
     StopOrder,
     StopOrderStatus,
     STOPORDER_PREFIX
@@ -90,6 +91,8 @@ class CtaEngine(BaseEngine):
 
         self.stop_order_count = 0   # for generating stop_orderid
         self.stop_orders = {}       # stop_orderid: stop_order
+        self.stop_order_books = defaultdict(
+            OrderBook)              # vt_symbol: active stop orders
 
         self.init_executor = ThreadPoolExecutor(max_workers=1)
 
@@ -229,63 +232,70 @@ class CtaEngine(BaseEngine):
 
     def check_stop_order(self, tick: TickData):
         """"""
-        for stop_order in list(self.stop_orders.values()):
-            if stop_order.vt_symbol != tick.vt_symbol:
+        book = self.stop_order_books.get(tick.vt_symbol, None)
+        if not book:
+            return
+
+        # Long stop orders priced at or below last price and short stop
+        # orders priced at or above it are triggered.
+        stop_orderids = (
+            book.select(Direction.LONG, high=tick.last_price)
+            + book.select(Direction.SHORT, low=tick.last_price)
+        )
+
+        for stop_orderid in book.sort_orderids(stop_orderids):
+            stop_order = book.get(stop_orderid, None)
+
+            # Skip stop order cancelled in callback of former order.
+            if not stop_order:
                 continue
 
-            long_triggered = (
-                stop_order.direction == Direction.LONG and tick.last_price >= stop_order.price
-            )
-            short_triggered = (
-                stop_order.direction == Direction.SHORT and tick.last_price <= stop_order.price
-            )
+            strategy = self.strategies[stop_order.strategy_name]
 
-            if long_triggered or short_triggered:
-                strategy = self.strategies[stop_order.strategy_name]
-
-                # To get excuted immediately after stop order is
-                # triggered, use limit price if available, otherwise
-                # use ask_price_5 or bid_price_5
-                if stop_order.direction == Direction.LONG:
-                    if tick.limit_up:
-                        price = tick.limit_up
-                    else:
-                        price = tick.ask_price_5
+            # To get excuted immediately after stop order is
+            # triggered, use limit price if available, otherwise
+            # use ask_price_5 or bid_price_5
+            if stop_order.direction == Direction.LONG:
+                if tick.limit_up:
+                    price = tick.limit_up
                 else:
-                    if tick.limit_down:
-                        price = tick.limit_down
-                    else:
-                        price = tick.bid_price_5
-
-                contract = self.main_engine.get_contract(stop_order.vt_symbol)
-
-                vt_orderids = self.send_limit_order(
-                    strategy,
-                    contract,
-                    stop_order.direction,
-                    stop_order.offset,
-                    price,
-                    stop_order.volume,
-                    stop_order.lock
-                )
+                    price = tick.ask_price_5
+            else:
+                if tick.limit_down:
+                    price = tick.limit_down
+                else:
+                    price = tick.bid_price_5
+
+            contract = self.main_engine.get_contract(stop_order.vt_symbol)
+
+            vt_orderids = self.send_limit_order(
+                strategy,
+                contract,
+                stop_order.direction,
+                stop_order.offset,
+                price,
+                stop_order.volume,
+                stop_order.lock
+            )
 
-                # Update stop order status if placed successfully
-                if vt_orderids:
-                    # Remove from relation map.
-                    self.stop_orders.pop(stop_order.stop_orderid)
+            # Update stop order status if placed successfully
+            if vt_orderids:
+                # Remove from relation map.
+                self.stop_orders.pop(stop_order.stop_orderid)
+                book.pop(stop_order.stop_orderid)
 
-                    strategy_vt_orderids = self.strategy_orderid_map[strategy.strategy_name]
-                    if stop_order.stop_orderid in strategy_vt_orderids:
-                        strategy_vt_orderids.remove(stop_order.stop_orderid)
+                strategy_vt_orderids = self.strategy_orderid_map[strategy.strategy_name]
+                if stop_order.stop_orderid in strategy_vt_orderids:
+                    strategy_vt_orderids.remove(stop_order.stop_orderid)
 
-                    # Change stop order status to cancelled and update to strategy.
-                    stop_order.status = StopOrderStatus.TRIGGERED
-                    stop_order.vt_orderids = vt_orderids
+                # Change stop order status to cancelled and update to strategy.
+                stop_order.status = StopOrderStatus.TRIGGERED
+                stop_order.vt_orderids = vt_orderids
 
-                    self.call_strategy_func(
-                        strategy, strategy.on_stop_order, stop_order
-                    )
-                    self.put_stop_order_event(stop_order)
+                self.call_strategy_func(
+                    strategy, strategy.on_stop_order, stop_order
+                )
+                self.put_stop_order_event(stop_order)
 
     def send_server_order(
         self,
@@ -414,6 +424,7 @@ class CtaEngine(BaseEngine):
         )
 
         self.stop_orders[stop_orderid] = stop_order
+        self.stop_order_books[stop_order.vt_symbol][stop_orderid] = stop_order
 
         vt_orderids = self.strategy_orderid_map[strategy.strategy_name]
         vt_orderids.add(stop_orderid)
@@ -446,6 +457,7 @@ class CtaEngine(BaseEngine):
 
         # Remove from relation map.
         self.stop_orders.pop(stop_orderid)
+        self.stop_order_books[stop_order.vt_symbol].pop(stop_orderid)
 
         vt_orderids = self.strategy_orderid_map[strategy.strategy_name]
         if stop_orderid in vt_orderids:
@@ -0,0 +1,462 @@
+"""
+Backtesting of a group of symbols with one time-ordered bar stream.
+"""
+
+import heapq
+import traceback
+from datetime import datetime
+from itertools import repeat
+from typing import Dict, Iterator, List, Sequence, Union
+
+from pandas import DataFrame, concat
+
+from vnpy.trader.constant import Direction, Offset, Interval
+from vnpy.trader.object import BarData
+from vnpy.trader.utility import SimulationClock
+from vnpy.trader.columnar import BarColumns
+
+from .base import EngineType
+from .backtesting import BacktestingEngine, load_bar_columns
+from .template import CtaTemplate, PortfolioTemplate
+
+
+# Daily result fields added up over symbols for portfolio result
+PORTFOLIO_FIELDS = [
+    "trade_count",
+    "turnover",
+    "commission",
+    "slippage",
+    "trading_pnl",
+    "holding_pnl",
+    "total_pnl",
+    "net_pnl",
+]
+
+
+class SymbolStrategy:
+    """
+    View of a portfolio strategy on one symbol, used as the strategy of
+    the symbol's backtesting engine. Bars are collected for on_bars and
+    order/trade updates are forwarded to the portfolio strategy.
+    """
+
+    def __init__(self, portfolio_engine: "PortfolioBacktestingEngine", vt_symbol: str):
+        """"""
+        self.portfolio_engine = portfolio_engine
+        self.strategy = portfolio_engine.strategy
+        self.strategy_name = self.strategy.strategy_name
+        self.vt_symbol = vt_symbol
+
+    @property
+    def pos(self):
+        """"""
+        return self.strategy.pos[self.vt_symbol]
+
+    @pos.setter
+    def pos(self, pos: float):
+        """"""
+        self.strategy.pos[self.vt_symbol] = pos
+
+    def on_bar(self, bar: BarData):
+        """"""
+        self.portfolio_engine.bars[self.vt_symbol] = bar
+
+    def on_order(self, order):
+        """"""
+        self.strategy.on_order(order)
+
+    def on_trade(self, trade):
+        """"""
+        self.strategy.on_trade(trade)
+
+    def on_stop_order(self, stop_order):
+        """"""
+        self.strategy.on_stop_order(stop_order)
+
+
+class PortfolioBacktestingEngine:
+    """
+    Backtest a group of symbols in one run.
+
+    Each symbol is simulated by its own BacktestingEngine, sharing one
+    simulation clock. Bar columns of all symbols are merged into one
+    time-ordered stream with a heap, then daily pnl of all symbols is
+    added up into portfolio daily result.
+
+    Strategy can be either a CtaTemplate, which runs one instance per
+    symbol, or a PortfolioTemplate, which trades all symbols together.
+    """
+
+    engine_type = EngineType.BACKTESTING
+    gateway_name = "BACKTESTING"
+
+    def __init__(self):
+        """"""
+        self.vt_symbols = []
+        self.interval = None
+        self.start = None
+        self.end = None
+        self.capital = 1_000_000
+
+        self.engines: Dict[str, BacktestingEngine] = {}
+        self.clock = SimulationClock()
+
+        self.strategy_class = None
+        self.strategy = None            # portfolio strategy
+        self.days = 0
+        self.bars = {}                  # vt_symbol: bar of current datetime
+        self.orderid_engine_map = {}    # vt_orderid: engine
+        self.datetime = None
+
+        self.logs = []
+        self.daily_df = None
+        self.symbol_daily_dfs = {}
+
+    def set_parameters(
+        self,
+        vt_symbols: Sequence[str],
+        interval: Interval,
+        start: datetime,
+        rate: Union[float, dict],
+        slippage: Union[float, dict],
+        size: Union[float, dict],
+        pricetick: Union[float, dict],
+        capital: int = 0,
+        end: datetime = None,
+        inverse: bool = False
+    ):
+        """
+        rate, slippage, size and pricetick can be a single value for all
+        symbols or a dict of vt_symbol: value.
+        """
+        self.vt_symbols = list(vt_symbols)
+        self.interval = Interval(interval)
+        self.start = start
+        self.end = end
+        self.capital = capital
+
+        def get_value(value, vt_symbol):
+            if isinstance(value, dict):
+                return value[vt_symbol]
+            return value
+
+        self.engines.clear()
+        for vt_symbol in self.vt_symbols:
+            engine = BacktestingEngine()
+            engine.output = self.output_symbol
+            engine.clock = self.clock
+            engine.set_parameters(
+                vt_symbol=vt_symbol,
+                interval=interval,
+                start=start,
+                rate=get_value(rate, vt_symbol),
+                slippage=get_value(slippage, vt_symbol),
+                size=get_value(size, vt_symbol),
+                pricetick=get_value(pricetick, vt_symbol),
+                capital=capital,
+                end=end,
+                inverse=inverse
+            )
+            self.engines[vt_symbol] = engine
+
+    def add_strategy(self, strategy_class: type, setting: dict):
+        """
+        Add CtaTemplate class for one instance per symbol, or
+        PortfolioTemplate class for one instance trading all symbols.
+        """
+        self.strategy_class = strategy_class
+
+        if issubclass(strategy_class, PortfolioTemplate):
+            self.strategy = strategy_class(
+                self, strategy_class.__name__, self.vt_symbols, setting
+            )
+            for vt_symbol, engine in self.engines.items():
+                engine.strategy = SymbolStrategy(self, vt_symbol)
+                engine.callback = engine.strategy.on_bar
+        else:
+            self.strategy = None
+            for vt_symbol, engine in self.engines.items():
+                engine.strategy_class = strategy_class
+                engine.strategy = strategy_class(
+                    engine, f"{strategy_class.__name__}_{vt_symbol}", vt_symbol, setting
+                )
+
+    def set_history_data(self, vt_symbol: str, data: Union[BarColumns, List[BarData], DataFrame]):
+        """
+        Set bar history of one symbol directly instead of loading from database.
+        DataFrame should have datetime index and open/high/low/close/volume columns.
+        """
+        engine = self.engines[vt_symbol]
+
+        if isinstance(data, DataFrame):
+            data = BarColumns.from_dataframe(
+                data, engine.symbol, engine.exchange, engine.interval
+            )
+        elif not isinstance(data, BarColumns):
+            data = BarColumns.from_bars(data)
+
+        engine.history_data = data
+
+    def load_data(self):
+        """"""
+        self.output("开始加载历史数据")
+
+        if not self.end:
+            self.end = datetime.now()
+
+        if self.start >= self.end:
+            self.output("起始日期必须小于结束日期")
+            return
+
+        total = 0
+        for n, (vt_symbol, engine) in enumerate(self.engines.items()):
+            engine.history_data = load_bar_columns(
+                engine.symbol,
+                engine.exchange,
+                engine.interval,
+                self.start,
+                self.end
+            ) or []
+            total += len(engine.history_data)
+
+            progress = (n + 1) / len(self.engines)
+            progress_bar = "#" * int(progress * 10)
+            self.output(f"加载进度：{progress_bar} [{progress:.0%}]")
+
+        self.output(f"历史数据加载完成，数据量：{total}")
+
+    def iter_merged_bars(self) -> Iterator[tuple]:
+        """
+        Merge bars of all symbols into (timestamp, vt_symbol, bar) ordered by time,
+        bars with the same timestamp are in the order of vt_symbols.
+        """
+        sources = []
+        for n, engine in enumerate(self.engines.values()):
+            if not len(engine.history_data):
+                continue
+
+            columns = engine.history_data
+            if not isinstance(columns, BarColumns):
+                columns = BarColumns.from_bars(columns)
+
+            sources.append(zip(
+                columns.datetime.tolist(),
+                repeat(n),
+                repeat(engine.vt_symbol),
+                columns.iter_bars()
+            ))
+
+        for timestamp, _, vt_symbol, bar in heapq.merge(*sources):
+            yield timestamp, vt_symbol, bar
+
+    def run_backtesting(self):
+        """"""
+        self.clock.reset()
+        self.bars = {}
+        self.datetime = None
+
+        if self.strategy:
+            self.strategy.on_init()
+        else:
+            for engine in self.engines.values():
+                engine.strategy.on_init()
+
+        # Use the first [days] of history data for initializing strategy,
+        # counted for the portfolio strategy or for each symbol.
+        day_count = 0
+        day_counts = {vt_symbol: 0 for vt_symbol in self.engines}
+        last_timestamp = None
+
+        self.output("开始回放历史数据")
+
+        try:
+            for timestamp, vt_symbol, bar in self.iter_merged_bars():
+                engine = self.engines[vt_symbol]
+
+                if self.strategy:
+                    strategy = self.strategy
+
+                    # Bars of last datetime are all updated
+                    if timestamp != last_timestamp:
+                        self.update_bars()
+
+                        if (
+                            not strategy.trading
+                            and self.datetime
+                            and bar.datetime.day != self.datetime.day
+                        ):
+                            day_count += 1
+                            if day_count >= self.days:
+                                self.start_strategy(strategy)
+
+                        last_timestamp = timestamp
+                        self.datetime = bar.datetime
+                else:
+                    strategy = engine.strategy
+
+                    if (
+                        not strategy.trading
+                        and engine.datetime
+                        and bar.datetime.day != engine.datetime.day
+                    ):
+                        day_counts[vt_symbol] += 1
+                        if day_counts[vt_symbol] >= engine.days:
+                            self.start_strategy(strategy)
+
+                if strategy.trading:
+                    engine.new_bar(bar)
+                else:
+                    engine.datetime = bar.datetime
+                    self.clock.update(bar.datetime)
+                    engine.callback(bar)
+
+            if self.strategy:
+                self.update_bars()
+        except Exception:
+            self.output("触发异常，回测终止")
+            self.output(traceback.format_exc())
+            return
+
+        self.output("历史数据回放结束")
+
+    def start_strategy(self, strategy):
+        """"""
+        strategy.inited = True
+        strategy.on_start()
+        strategy.trading = True
+
+    def update_bars(self):
+        """
+        Push bars of last datetime to portfolio strategy.
+        """
+        if not self.bars:
+            return
+
+        bars = self.bars
+        self.bars = {}
+        self.strategy.on_bars(bars)
+
+    def calculate_result(self):
+        """"""
+        self.output("开始计算逐日盯市盈亏")
+
+        self.symbol_daily_dfs = {}
+        dates = set()
+        for vt_symbol, engine in self.engines.items():
+            dates.update(engine.daily_results.keys())
+
+            df = engine.calculate_result()
+            if df is not None:
+                self.symbol_daily_dfs[vt_symbol] = df
+
+        if not self.symbol_daily_dfs:
+            self.output("成交记录为空，无法计算")
+            return
+
+        # Add up daily result of all symbols, days without bar of a symbol count as 0.
+        df = concat([df[PORTFOLIO_FIELDS] for df in self.symbol_daily_dfs.values()])
+        df = df.groupby(level=0).sum().reindex(sorted(dates), fill_value=0)
+        df.index.name = "date"
+        self.daily_df = df
+
+        self.output("逐日盯市盈亏计算完成")
+        return self.daily_df
+
+    def calculate_statistics(self, df: DataFrame = None, output=True):
+        """"""
+        return BacktestingEngine.calculate_statistics(self, df, output)
+
+    def show_chart(self, df: DataFrame = None):
+        """"""
+        return BacktestingEngine.show_chart(self, df)
+
+    def load_bar(self, vt_symbol: str, days: int, interval: Interval, callback, use_database: bool):
+        """"""
+        self.engines[vt_symbol].load_bar(vt_symbol, days, interval, callback, use_database)
+
+    def load_bars(self, strategy: PortfolioTemplate, days: int):
+        """"""
+        self.days = days
+
+    def send_order(
+        self,
+        strategy: PortfolioTemplate,
+        vt_symbol: str,
+        direction: Direction,
+        offset: Offset,
+        price: float,
+        volume: float,
+        stop: bool,
+        lock: bool
+    ):
+        """"""
+        engine = self.engines[vt_symbol]
+        vt_orderids = engine.send_order(engine.strategy, direction, offset, price, volume, stop, lock)
+
+        for vt_orderid in vt_orderids:
+            self.orderid_engine_map[vt_orderid] = engine
+        return vt_orderids
+
+    def cancel_order(self, strategy: PortfolioTemplate, vt_orderid: str):
+        """"""
+        engine = self.orderid_engine_map.pop(vt_orderid, None)
+        if engine:
+            engine.cancel_order(engine.strategy, vt_orderid)
+
+    def cancel_all(self, strategy: PortfolioTemplate):
+        """"""
+        for engine in self.engines.values():
+            if engine.active_limit_orders or engine.active_stop_orders:
+                engine.cancel_all(engine.strategy)
+        self.orderid_engine_map.clear()
+
+    def write_log(self, msg: str, strategy: Union[CtaTemplate, PortfolioTemplate] = None):
+        """
+        Write log message.
+        """
+        msg = f"{self.datetime}\t{msg}"
+        self.logs.append(msg)
+
+    def get_engine_type(self):
+        """
+        Return engine type.
+        """
+        return self.engine_type
+
+    def put_strategy_event(self, strategy: PortfolioTemplate):
+        """
+        Put an event to update strategy status.
+        """
+        pass
+
+    def output(self, msg):
+        """
+        Output message of backtesting engine.
+        """
+        print(f"{datetime.now()}\t{msg}")
+
+    def output_symbol(self, msg):
+        """
+        Messages of symbol engines are not shown.
+        """
+        pass
+
+    def get_all_trades(self):
+        """
+        Return all trade data of all symbols.
+        """
+        trades = []
+        for engine in self.engines.values():
+            trades.extend(engine.trades.values())
+        trades.sort(key=lambda trade: trade.datetime)
+        return trades
+
+    def get_all_orders(self):
+        """
+        Return all limit order data of all symbols.
+        """
+        orders = []
+        for engine in self.engines.values():
+            orders.extend(engine.limit_orders.values())
+        orders.sort(key=lambda order: order.datetime)
+        return orders
@@ -1,11 +1,12 @@
 """"""
 from abc import ABC
+from collections import defaultdict
 from copy import copy
-from typing import Any, Callable
+from typing import Any, Callable, Dict, List
 
 from vnpy.trader.constant import Interval, Direction, Offset
 from vnpy.trader.object import BarData, TickData, OrderData, TradeData
-from vnpy.trader.utility import virtual
+from vnpy.trader.utility import CrossSectionalArrayManager, virtual
 
 from .base import StopOrder, EngineType
 
@@ -424,3 +425,234 @@ class TargetPosTemplate(CtaTemplate):
                 else:
                     vt_orderids = self.short(short_price, abs(pos_change))
             self.active_orderids.extend(vt_orderids)
+
+
+class PortfolioTemplate(ABC):
+    """
+    Cross-sectional strategy trading a group of symbols together,
+    receives bars of all symbols with the same datetime at once.
+    """
+
+    author = ""
+    parameters = []
+    variables = []
+
+    def __init__(
+        self,
+        cta_engine: Any,
+        strategy_name: str,
+        vt_symbols: List[str],
+        setting: dict,
+    ):
+        """"""
+        self.cta_engine = cta_engine
+        self.strategy_name = strategy_name
+        self.vt_symbols = vt_symbols
+
+        self.inited = False
+        self.trading = False
+        self.pos = defaultdict(int)     # vt_symbol: pos
+
+        self.variables = copy(self.variables)
+        self.variables.insert(0, "inited")
+        self.variables.insert(1, "trading")
+        self.variables.insert(2, "pos")
+
+        self.update_setting(setting)
+
+    def update_setting(self, setting: dict):
+        """
+        Update strategy parameter wtih value in setting dict.
+        """
+        for name in self.parameters:
+            if name in setting:
+                setattr(self, name, setting[name])
+
+    @classmethod
+    def get_class_parameters(cls):
+        """
+        Get default parameters dict of strategy class.
+        """
+        class_parameters = {}
+        for name in cls.parameters:
+            class_parameters[name] = getattr(cls, name)
+        return class_parameters
+
+    def get_parameters(self):
+        """
+        Get strategy parameters dict.
+        """
+        strategy_parameters = {}
+        for name in self.parameters:
+            strategy_parameters[name] = getattr(self, name)
+        return strategy_parameters
+
+    def get_variables(self):
+        """
+        Get strategy variables dict.
+        """
+        strategy_variables = {}
+        for name in self.variables:
+            strategy_variables[name] = getattr(self, name)
+        return strategy_variables
+
+    def get_data(self):
+        """
+        Get strategy data.
+        """
+        strategy_data = {
+            "strategy_name": self.strategy_name,
+            "vt_symbols": self.vt_symbols,
+            "class_name": self.__class__.__name__,
+            "author": self.author,
+            "parameters": self.get_parameters(),
+            "variables": self.get_variables(),
+        }
+        return strategy_data
+
+    @virtual
+    def on_init(self):
+        """
+        Callback when strategy is inited.
+        """
+        pass
+
+    @virtual
+    def on_start(self):
+        """
+        Callback when strategy is started.
+        """
+        pass
+
+    @virtual
+    def on_stop(self):
+        """
+        Callback when strategy is stopped.
+        """
+        pass
+
+    @virtual
+    def on_bars(self, bars: Dict[str, BarData]):
+        """
+        Callback of new bars of all symbols with the same datetime.
+        """
+        pass
+
+    @virtual
+    def on_trade(self, trade: TradeData):
+        """
+        Callback of new trade data update.
+        """
+        pass
+
+    @virtual
+    def on_order(self, order: OrderData):
+        """
+        Callback of new order data update.
+        """
+        pass
+
+    @virtual
+    def on_stop_order(self, stop_order: StopOrder):
+        """
+        Callback of stop order update.
+        """
+        pass
+
+    def buy(self, vt_symbol: str, price: float, volume: float, stop: bool = False, lock: bool = False):
+        """
+        Send buy order to open a long position.
+        """
+        return self.send_order(vt_symbol, Direction.LONG, Offset.OPEN, price, volume, stop, lock)
+
+    def sell(self, vt_symbol: str, price: float, volume: float, stop: bool = False, lock: bool = False):
+        """
+        Send sell order to close a long position.
+        """
+        return self.send_order(vt_symbol, Direction.SHORT, Offset.CLOSE, price, volume, stop, lock)
+
+    def short(self, vt_symbol: str, price: float, volume: float, stop: bool = False, lock: bool = False):
+        """
+        Send short order to open as short position.
+        """
+        return self.send_order(vt_symbol, Direction.SHORT, Offset.OPEN, price, volume, stop, lock)
+
+    def cover(self, vt_symbol: str, price: float, volume: float, stop: bool = False, lock: bool = False):
+        """
+        Send cover order to close a short position.
+        """
+        return self.send_order(vt_symbol, Direction.LONG, Offset.CLOSE, price, volume, stop, lock)
+
+    def send_order(
+        self,
+        vt_symbol: str,
+        direction: Direction,
+        offset: Offset,
+        price: float,
+        volume: float,
+        stop: bool = False,
+        lock: bool = False
+    ):
+        """
+        Send a new order of one symbol.
+        """
+        if self.trading:
+            vt_orderids = self.cta_engine.send_order(
+                self, vt_symbol, direction, offset, price, volume, stop, lock
+            )
+            return vt_orderids
+        else:
+            return []
+
+    def cancel_order(self, vt_orderid: str):
+        """
+        Cancel an existing order.
+        """
+        if self.trading:
+            self.cta_engine.cancel_order(self, vt_orderid)
+
+    def cancel_all(self):
+        """
+        Cancel all orders sent by strategy.
+        """
+        if self.trading:
+            self.cta_engine.cancel_all(self)
+
+    def get_pos(self, vt_symbol: str):
+        """
+        Return position of one symbol.
+        """
+        return self.pos[vt_symbol]
+
+    def write_log(self, msg: str):
+        """
+        Write a log message.
+        """
+        self.cta_engine.write_log(msg, self)
+
+    def get_engine_type(self):
+        """
+        Return whether the cta_engine is backtesting or live trading.
+        """
+        return self.cta_engine.get_engine_type()
+
+    def load_bars(self, days: int):
+        """
+        Load historical bars of all symbols for initializing strategy.
+        """
+        self.cta_engine.load_bars(self, days)
+
+    def create_array_manager(self, size: int = 100) -> CrossSectionalArrayManager:
+        """
+        Create time series container of all symbols, which should be updated
+        with update_bars in on_bars. Indicators are calculated for all symbols
+        at once, and get_array_manager gives ArrayManager of one symbol.
+        """
+        return CrossSectionalArrayManager(self.vt_symbols, size)
+
+    def put_event(self):
+        """
+        Put an strategy data event for ui update.
+        """
+        if self.inited:
+            self.cta_engine.put_strategy_event(self)
@@ -1,22 +1,24 @@
 """"""
 
 import sys
+from datetime import datetime
 from threading import Thread
-from queue import Queue, Empty
-from copy import copy
+from time import perf_counter, sleep
+
+import numpy as np
 
 from vnpy.event import Event, EventEngine
 from vnpy.trader.engine import BaseEngine, MainEngine
-from vnpy.trader.constant import Exchange
+from vnpy.trader.constant import Exchange, Interval
 from vnpy.trader.object import (
     SubscribeRequest,
     TickData,
-    BarData,
     ContractData
 )
-from vnpy.trader.event import EVENT_TICK, EVENT_CONTRACT
-from vnpy.trader.utility import load_json, save_json, BarGenerator
+from vnpy.trader.event import EVENT_CONTRACT
+from vnpy.trader.utility import load_json, save_json, extract_vt_symbol
 from vnpy.trader.database import database_manager
+from vnpy.trader.columnar import MINUTE_US, BarColumns, TickRing, aggregate_ticks
 from vnpy.app.spread_trading.base import EVENT_SPREAD_DATA, SpreadData
 
 
@@ -25,6 +27,7 @@ APP_NAME = "DataRecorder"
 EVENT_RECORDER_LOG = "eRecorderLog"
 EVENT_RECORDER_UPDATE = "eRecorderUpdate"
 EVENT_RECORDER_EXCEPTION = "eRecorderException"
+EVENT_RECORDER_METRICS = "eRecorderMetrics"
 
 
 class RecorderEngine(BaseEngine):
@@ -35,13 +38,39 @@ class RecorderEngine(BaseEngine):
         """"""
         super().__init__(main_engine, event_engine, APP_NAME)
 
-        self.queue = Queue()
+        # Writer setting. Ticks are kept in OMS tick rings until written, so
+        # there is no overflow policy: rows overwritten before being read are
+        # counted in drop_count. Retry backoff is skipped once unread rows of
+        # any ring exceed lag_limit (fraction of ring size).
+        self.batch_interval: float = 0.5
+        self.max_retries: int = 3
+        self.retry_interval: float = 1
+        self.lag_limit: float = 0.5
+        self.metrics_interval: float = 5
+
         self.thread = Thread(target=self.run)
         self.active = False
 
+        self.metrics = {
+            "batch_count": 0,
+            "write_count": 0,
+            "drop_count": 0,
+            "fail_count": 0,
+            "error_count": 0,
+            "last_batch_size": 0,
+            "max_batch_size": 0,
+            "last_latency": 0.0,
+            "max_latency": 0.0,
+            "total_latency": 0.0,
+        }
+
         self.tick_recordings = {}
         self.bar_recordings = {}
-        self.bar_generators = {}
+
+        # Sequence number of OMS tick ring consumed by tick/bar recording
+        self.tick_cursors = {}
+        self.bar_cursors = {}
+        self.last_volumes = {}
 
         self.load_setting()
         self.register_event()
@@ -54,6 +83,11 @@ class RecorderEngine(BaseEngine):
         self.tick_recordings = setting.get("tick", {})
         self.bar_recordings = setting.get("bar", {})
 
+        for vt_symbol in self.tick_recordings:
+            self.tick_cursors[vt_symbol] = self.request_ring(vt_symbol)
+        for vt_symbol in self.bar_recordings:
+            self.bar_cursors[vt_symbol] = self.request_ring(vt_symbol)
+
     def save_setting(self):
         """"""
         setting = {
@@ -63,32 +97,229 @@ class RecorderEngine(BaseEngine):
         save_json(self.setting_filename, setting)
 
     def run(self):
-        """"""
+        """
+        Read OMS tick rings every batch_interval, and save ticks and bars of
+        each batch with one bulk call for ticks and one for bars.
+        """
+        last_metrics = perf_counter()
+
         while self.active:
-            try:
-                task = self.queue.get(timeout=1)
-                task_type, data = task
+            sleep(self.batch_interval)
+            tick_rows, bars = self.read_rings()
+            self.write_batch(tick_rows, bars)
+
+            now = perf_counter()
+            if now - last_metrics >= self.metrics_interval:
+                last_metrics = now
+                self.put_metrics()
+
+        # Flush data left when closing
+        tick_rows, bars = self.read_rings()
+        self.write_batch(tick_rows, bars)
+
+    def read_rings(self) -> tuple:
+        """
+        Read ticks written since last time from OMS tick rings.
+
+        Returns list of (ring, rows) for tick recording and list of
+        finished minute bars for bar recording.
+        """
+        tick_rows = []
+        for vt_symbol in list(self.tick_recordings):
+            ring = self.main_engine.get_tick_ring(vt_symbol)
+            if not ring:
+                continue
 
-                if task_type == "tick":
-                    database_manager.save_tick_data([data])
-                elif task_type == "bar":
-                    database_manager.save_bar_data([data])
+            rows, end, lost = ring.read(self.tick_cursors.get(vt_symbol, 0))
+            self.tick_cursors[vt_symbol] = end
+            self.metrics["drop_count"] += lost
+
+            if len(rows):
+                tick_rows.append((ring, rows))
+
+        bars = []
+        for vt_symbol in list(self.bar_recordings):
+            ring = self.main_engine.get_tick_ring(vt_symbol)
+            if ring:
+                bars.extend(self.generate_bars(ring))
+
+        return tick_rows, bars
+
+    def generate_bars(self, ring: TickRing) -> list:
+        """
+        Aggregate ticks of finished minutes into 1 minute bars. Ticks of the
+        latest minute are left in ring and read again next time.
+        """
+        vt_symbol = ring.vt_symbol
+        rows, end, lost = ring.read(self.bar_cursors.get(vt_symbol, 0))
+        self.metrics["drop_count"] += lost
+
+        seqs = np.arange(end - len(rows), end)
+        valid = rows["last_price"] != 0
+        rows = rows[valid]
+        seqs = seqs[valid]
+
+        if not len(rows):
+            self.bar_cursors[vt_symbol] = end
+            return []
+
+        # Same as BarGenerator, bar is finished when tick of next minute arrives
+        minutes = rows["datetime"] // MINUTE_US
+        finished = np.flatnonzero(minutes != minutes[-1])
+        if not len(finished):
+            self.bar_cursors[vt_symbol] = int(seqs[0])
+            return []
+
+        n = finished[-1] + 1
+        rows = rows[:n]
+        self.bar_cursors[vt_symbol] = int(seqs[n])
+
+        arrays = aggregate_ticks(
+            rows["datetime"],
+            rows["last_price"],
+            rows["volume"],
+            rows["open_interest"],
+            last_volume=self.last_volumes.get(vt_symbol, None)
+        )
+        self.last_volumes[vt_symbol] = rows["volume"][-1]
+
+        columns = BarColumns(
+            symbol=ring.symbol,
+            exchange=ring.exchange,
+            interval=Interval.MINUTE,
+            gateway_name=ring.gateway_name,
+            tzinfo=ring.tzinfo,
+            **arrays
+        )
+        return columns.to_bars()
+
+    def write_batch(self, tick_rows: list, bars: list):
+        """
+        Save batch with retry, data of the same datetime is coalesced.
+        """
+        ticks = {}
+        bar_map = {}
+        for bar in bars:
+            bar_map[(bar.vt_symbol, bar.interval, bar.datetime)] = bar
+        size = len(bars)
+
+        # Ticks from ring are converted here instead of on event thread,
+        # or saved as arrays directly if supported by database.
+        tick_arrays = []
+        for ring, rows in tick_rows:
+            size += len(rows)
+            if hasattr(database_manager, "save_tick_arrays"):
+                tick_arrays.append((ring, rows))
+            else:
+                for tick in ring.to_ticks(rows):
+                    ticks[(tick.vt_symbol, tick.datetime)] = tick
+
+        if not size:
+            return
 
-            except Empty:
-                continue
+        start = perf_counter()
 
+        for n in range(self.max_retries + 1):
+            try:
+                while tick_arrays:
+                    ring, rows = tick_arrays[0]
+                    arrays = {name: rows[name] for name in rows.dtype.names}
+                    database_manager.save_tick_arrays(ring.symbol, ring.exchange, arrays, ring.name)
+                    tick_arrays.pop(0)
+                if ticks:
+                    database_manager.save_tick_data(list(ticks.values()))
+                    ticks = {}
+                if bar_map:
+                    database_manager.save_bar_data(list(bar_map.values()))
+                break
             except Exception:
-                self.active = False
+                self.metrics["error_count"] += 1
+
+                if n < self.max_retries:
+                    self.wait_retry(self.retry_interval * 2 ** n)
+                else:
+                    self.metrics["fail_count"] += len(ticks) + len(bar_map)
+                    for _, rows in tick_arrays:
+                        self.metrics["fail_count"] += len(rows)
+
+                    info = sys.exc_info()
+                    event = Event(EVENT_RECORDER_EXCEPTION, info)
+                    self.event_engine.put(event)
+                    return
+
+        latency = perf_counter() - start
+
+        metrics = self.metrics
+        metrics["batch_count"] += 1
+        metrics["write_count"] += size
+        metrics["last_batch_size"] = size
+        metrics["max_batch_size"] = max(metrics["max_batch_size"], size)
+        metrics["last_latency"] = latency
+        metrics["max_latency"] = max(metrics["max_latency"], latency)
+        metrics["total_latency"] += latency
+
+    def wait_retry(self, timeout: float):
+        """
+        Wait before retry, stop waiting once rings are about to overwrite
+        unread rows or engine is closed.
+        """
+        deadline = perf_counter() + timeout
+        while self.active and not self.is_lagging():
+            remaining = deadline - perf_counter()
+            if remaining <= 0:
+                break
+            sleep(min(remaining, 0.1))
+
+    def get_ring_lags(self) -> dict:
+        """
+        Get count of ticks written into OMS tick ring but not yet consumed by
+        tick or bar recording of each symbol.
+        """
+        lags = {}
+        for cursors in [self.tick_cursors, self.bar_cursors]:
+            for vt_symbol, cursor in list(cursors.items()):
+                ring = self.main_engine.get_tick_ring(vt_symbol)
+                if ring:
+                    lags[vt_symbol] = max(lags.get(vt_symbol, 0), ring.seq - cursor)
+        return lags
+
+    def is_lagging(self) -> bool:
+        """
+        Whether unread ticks of any ring exceed lag_limit of ring size.
+        """
+        for vt_symbol, lag in self.get_ring_lags().items():
+            ring = self.main_engine.get_tick_ring(vt_symbol)
+            if ring and lag > ring.size * self.lag_limit:
+                return True
+        return False
+
+    def get_metrics(self) -> dict:
+        """
+        Get ring lag, batch size and write latency statistics of writer.
+        """
+        metrics = dict(self.metrics)
+        metrics["ring_lag"] = self.get_ring_lags()
+
+        total_latency = metrics.pop("total_latency")
+        batch_count = metrics["batch_count"]
+        if batch_count:
+            metrics["average_batch_size"] = metrics["write_count"] / batch_count
+            metrics["average_latency"] = total_latency / batch_count
+        else:
+            metrics["average_batch_size"] = 0
+            metrics["average_latency"] = 0
+        return metrics
 
-                info = sys.exc_info()
-                event = Event(EVENT_RECORDER_EXCEPTION, info)
-                self.event_engine.put(event)
+    def put_metrics(self):
+        """"""
+        event = Event(EVENT_RECORDER_METRICS, self.get_metrics())
+        self.event_engine.put(event)
 
     def close(self):
         """"""
         self.active = False
 
-        if self.thread.isAlive():
+        if self.thread.is_alive():
             self.thread.join()
 
     def start(self):
@@ -108,6 +339,9 @@ class RecorderEngine(BaseEngine):
                 self.write_log(f"找不到合约：{vt_symbol}")
                 return
 
+            self.bar_cursors[vt_symbol] = self.request_ring(vt_symbol)
+            self.last_volumes.pop(vt_symbol, None)
+
             self.bar_recordings[vt_symbol] = {
                 "symbol": contract.symbol,
                 "exchange": contract.exchange.value,
@@ -116,7 +350,10 @@ class RecorderEngine(BaseEngine):
 
             self.subscribe(contract)
         else:
-            self.tick_recordings[vt_symbol] = {}
+            self.bar_cursors[vt_symbol] = self.request_ring(vt_symbol)
+            self.last_volumes.pop(vt_symbol, None)
+
+            self.bar_recordings[vt_symbol] = {}
 
         self.save_setting()
         self.put_event()
@@ -136,6 +373,8 @@ class RecorderEngine(BaseEngine):
                 self.write_log(f"找不到合约：{vt_symbol}")
                 return
 
+            self.tick_cursors[vt_symbol] = self.request_ring(vt_symbol)
+
             self.tick_recordings[vt_symbol] = {
                 "symbol": contract.symbol,
                 "exchange": contract.exchange.value,
@@ -145,6 +384,7 @@ class RecorderEngine(BaseEngine):
             self.subscribe(contract)
         # No need to subscribe for spread data
         else:
+            self.tick_cursors[vt_symbol] = self.request_ring(vt_symbol)
             self.tick_recordings[vt_symbol] = {}
 
         self.save_setting()
@@ -159,6 +399,7 @@ class RecorderEngine(BaseEngine):
             return
 
         self.bar_recordings.pop(vt_symbol)
+        self.main_engine.release_tick_ring(vt_symbol)
         self.save_setting()
         self.put_event()
 
@@ -171,31 +412,48 @@ class RecorderEngine(BaseEngine):
             return
 
         self.tick_recordings.pop(vt_symbol)
+        self.main_engine.release_tick_ring(vt_symbol)
         self.save_setting()
         self.put_event()
 
         self.write_log(f"移除Tick记录成功：{vt_symbol}")
 
+    def backfill_bar(
+        self,
+        vt_symbol: str,
+        start: datetime,
+        end: datetime,
+        interval: Interval = Interval.MINUTE
+    ) -> int:
+        """
+        Aggregate recorded tick data in database into bars and save them,
+        for filling bars missed when bar recording was not running.
+        """
+        symbol, exchange = extract_vt_symbol(vt_symbol)
+        ticks = database_manager.load_tick_data(symbol, exchange, start, end)
+        if not ticks:
+            self.write_log(f"找不到Tick数据，无法补全K线：{vt_symbol}")
+            return 0
+
+        columns = BarColumns.from_ticks(ticks, 1, interval)
+        database_manager.save_bar_data(columns.to_bars())
+
+        self.write_log(f"补全K线成功：{vt_symbol}，Tick数量{len(ticks)}，K线数量{len(columns)}")
+        return len(columns)
+
     def register_event(self):
         """"""
-        self.event_engine.register(EVENT_TICK, self.process_tick_event)
         self.event_engine.register(EVENT_CONTRACT, self.process_contract_event)
         self.event_engine.register(
             EVENT_SPREAD_DATA, self.process_spread_event)
 
     def update_tick(self, tick: TickData):
-        """"""
-        if tick.vt_symbol in self.tick_recordings:
-            self.record_tick(tick)
-
-        if tick.vt_symbol in self.bar_recordings:
-            bg = self.get_bar_generator(tick.vt_symbol)
-            bg.update_tick(tick)
-
-    def process_tick_event(self, event: Event):
-        """"""
-        tick = event.data
-        self.update_tick(tick)
+        """
+        Write tick not pushed by EVENT_TICK (e.g. spread) into OMS tick ring,
+        gateway ticks are written by OMS itself.
+        """
+        if tick.vt_symbol in self.tick_recordings or tick.vt_symbol in self.bar_recordings:
+            self.main_engine.update_tick_ring(tick)
 
     def process_contract_event(self, event: Event):
         """"""
@@ -241,25 +499,13 @@ class RecorderEngine(BaseEngine):
         )
         self.event_engine.put(event)
 
-    def record_tick(self, tick: TickData):
-        """"""
-        task = ("tick", copy(tick))
-        self.queue.put(task)
-
-    def record_bar(self, bar: BarData):
-        """"""
-        task = ("bar", copy(bar))
-        self.queue.put(task)
-
-    def get_bar_generator(self, vt_symbol: str):
-        """"""
-        bg = self.bar_generators.get(vt_symbol, None)
-
-        if not bg:
-            bg = BarGenerator(self.record_bar)
-            self.bar_generators[vt_symbol] = bg
-
-        return bg
+    def request_ring(self, vt_symbol: str) -> int:
+        """
+        Request OMS to keep tick ring of the symbol, return sequence number of
+        next tick so that recording added later starts from new ticks.
+        """
+        ring = self.main_engine.request_tick_ring(vt_symbol)
+        return ring.seq
 
     def subscribe(self, contract: ContractData):
         """"""
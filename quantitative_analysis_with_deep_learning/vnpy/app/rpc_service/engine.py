@@ -1,13 +1,17 @@
 """"""
 
 import traceback
+from collections import deque
+from threading import Thread, Event as ThreadEvent
+from time import sleep
 from typing import Optional
 
 from vnpy.event import Event, EventEngine
-from vnpy.rpc import RpcServer
+from vnpy.rpc import RpcServer, BATCH_ALL_TOPIC, BATCH_LATEST_TOPIC
 from vnpy.trader.engine import BaseEngine, MainEngine
 from vnpy.trader.utility import load_json, save_json
 from vnpy.trader.object import LogData
+from vnpy.trader.event import EVENT_TICK
 
 APP_NAME = "RpcService"
 
@@ -24,9 +28,17 @@ class RpcEngine(BaseEngine):
 
         self.rep_address = "tcp://*:2014"
         self.pub_address = "tcp://*:4102"
+        self.worker_count = 4
+
+        # Events are published in batch every time slice (seconds)
+        self.batch_interval = 0.002
 
         self.server: Optional[RpcServer] = None
 
+        self.buffer: deque = deque()
+        self.buffer_ready: ThreadEvent = ThreadEvent()
+        self.thread: Thread = None
+
         self.init_server()
         self.load_setting()
         self.register_event()
@@ -62,11 +74,19 @@ class RpcEngine(BaseEngine):
         self.rep_address = setting.get("rep_address", self.rep_address)
         self.pub_address = setting.get("pub_address", self.pub_address)
 
+        # Requests from clients are executed by multiple worker threads
+        self.worker_count = setting.get("worker_count", self.worker_count)
+        self.server.worker_count = self.worker_count
+
+        self.batch_interval = setting.get("batch_interval", self.batch_interval)
+
     def save_setting(self):
         """"""
         setting = {
             "rep_address": self.rep_address,
-            "pub_address": self.pub_address
+            "pub_address": self.pub_address,
+            "worker_count": self.worker_count,
+            "batch_interval": self.batch_interval
         }
         save_json(self.setting_filename, setting)
 
@@ -86,6 +106,9 @@ class RpcEngine(BaseEngine):
             self.write_log(f"RPC服务启动失败：{msg}")
             return False
 
+        self.thread = Thread(target=self.run)
+        self.thread.start()
+
         self.save_setting()
         self.write_log("RPC服务启动成功")
         return True
@@ -98,6 +121,10 @@ class RpcEngine(BaseEngine):
 
         self.server.stop()
         self.server.join()
+
+        self.buffer_ready.set()
+        self.thread.join()
+
         self.write_log("RPC服务已停止")
         return True
 
@@ -112,10 +139,77 @@ class RpcEngine(BaseEngine):
     def process_event(self, event: Event):
         """"""
         if self.server.is_active():
-            self.server.publish("", event)
+            self.buffer.append(event)
+            self.buffer_ready.set()
+
+    def run(self):
+        """
+        Wait for the first event, collect events of one time slice
+        and publish them as one message.
+        """
+        while self.server.is_active():
+            self.buffer_ready.wait(1)
+            self.buffer_ready.clear()
+
+            if self.batch_interval:
+                sleep(self.batch_interval)
+
+            events = []
+            for _ in range(len(self.buffer)):
+                events.append(self.buffer.popleft())
+
+            if events:
+                self.publish_batch(events)
+
+    def publish_batch(self, events: list):
+        """
+        Publish events of one time slice grouped by event type, with topic
+        "<batch topic>.<event type>", so that clients can still filter event
+        types by topic prefix, e.g. "_batch_all.eTick.". Order of events is
+        kept within each event type.
+
+        Ticks are also published conflated if any client subscribes latest
+        value only.
+        """
+        groups = {}
+        for event in events:
+            groups.setdefault(event.type, []).append(event)
+
+        for event_type, group in groups.items():
+            self.server.publish(f"{BATCH_ALL_TOPIC}.{event_type}", group)
+
+            topic = f"{BATCH_LATEST_TOPIC}.{event_type}"
+            if self.server.is_subscribed(topic):
+                if event_type.startswith(EVENT_TICK):
+                    group = conflate_ticks(group)
+                self.server.publish(topic, group)
 
     def write_log(self, msg: str) -> None:
         """"""
         log = LogData(msg=msg, gateway_name=APP_NAME)
         event = Event(EVENT_RPC_LOG, log)
         self.event_engine.put(event)
+
+
+def conflate_ticks(events: list) -> list:
+    """
+    Keep only the last tick event of each type and symbol at its position,
+    other events are kept in order.
+
+    Only ticks within one batch_interval slice (2 ms by default) are
+    conflated, a slow client still receives every slice, so this reduces
+    messages under bursts but is not latest value semantics.
+    """
+    keys = set()
+    result = []
+
+    for event in reversed(events):
+        if event.type.startswith(EVENT_TICK):
+            key = (event.type, event.data.vt_symbol)
+            if key in keys:
+                continue
+            keys.add(key)
+        result.append(event)
+
+    result.reverse()
+    return result
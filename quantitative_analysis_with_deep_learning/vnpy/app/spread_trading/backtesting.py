@@ -1,4 +1,3 @@
-from collections import defaultdict
 from datetime import date, datetime
 from typing import Callable, Type
 
@@ -10,6 +9,8 @@ from pandas import DataFrame
 from vnpy.trader.constant import (Direction, Offset, Exchange,
                                   Interval, Status)
 from vnpy.trader.object import TradeData, BarData, TickData
+from vnpy.trader.utility import SimulationClock
+from vnpy.trader.pnl import DAILY_FIELDS, trades_to_arrays, calculate_daily_result, calculate_statistics
 
 from .template import SpreadStrategyTemplate, SpreadAlgoTemplate
 from .base import SpreadData, BacktestingMode, load_bar_data, load_tick_data
@@ -53,6 +54,8 @@ class BacktestingEngine:
         self.trade_count = 0
         self.trades = {}
 
+        self.clock = SimulationClock()
+
         self.logs = []
 
         self.daily_results = {}
@@ -80,6 +83,8 @@ class BacktestingEngine:
         self.trade_count = 0
         self.trades.clear()
 
+        self.clock.reset()
+
         self.logs.clear()
         self.daily_results.clear()
 
@@ -167,6 +172,7 @@ class BacktestingEngine:
                     break
 
             self.datetime = data.datetime
+            self.clock.update(self.datetime)
             self.callback(data)
 
         self.strategy.inited = True
@@ -196,30 +202,25 @@ class BacktestingEngine:
             daily_result = self.daily_results[d]
             daily_result.add_trade(trade)
 
-        # Calculate daily result by iteration.
-        pre_close = 0
-        start_pos = 0
-
-        for daily_result in self.daily_results.values():
-            daily_result.calculate_pnl(
-                pre_close,
-                start_pos,
-                self.size,
-                self.rate,
-                self.slippage
-            )
-
-            pre_close = daily_result.close_price
-            start_pos = daily_result.end_pos
-
-        # Generate dataframe
-        results = defaultdict(list)
+        # Calculate daily result with vectorized group-by-day operations.
+        daily_results = list(self.daily_results.values())
+        trades = list(self.trades.values())
+        df = calculate_daily_result(
+            [daily_result.date for daily_result in daily_results],
+            [daily_result.close_price for daily_result in daily_results],
+            *trades_to_arrays(trades),
+            self.size,
+            self.rate,
+            self.slippage,
+            trade_values=np.array([trade.value for trade in trades])
+        )
 
-        for daily_result in self.daily_results.values():
-            for key, value in daily_result.__dict__.items():
-                results[key].append(value)
+        # Write back into daily result objects.
+        for daily_result, values in zip(daily_results, df[DAILY_FIELDS].itertuples(index=False)):
+            daily_result.__dict__.update(zip(DAILY_FIELDS, values))
 
-        self.daily_df = DataFrame.from_dict(results).set_index("date")
+        df.insert(2, "trades", [daily_result.trades for daily_result in daily_results])
+        self.daily_df = df
 
         self.output("逐日盯市盈亏计算完成")
         return self.daily_df
@@ -232,151 +233,43 @@ class BacktestingEngine:
         if df is None:
             df = self.daily_df
 
-        # Check for init DataFrame
-        if df is None:
-            # Set all statistics to 0 if no trade.
-            start_date = ""
-            end_date = ""
-            total_days = 0
-            profit_days = 0
-            loss_days = 0
-            end_balance = 0
-            max_drawdown = 0
-            max_ddpercent = 0
-            max_drawdown_duration = 0
-            total_net_pnl = 0
-            daily_net_pnl = 0
-            total_commission = 0
-            daily_commission = 0
-            total_slippage = 0
-            daily_slippage = 0
-            total_turnover = 0
-            daily_turnover = 0
-            total_trade_count = 0
-            daily_trade_count = 0
-            total_return = 0
-            annual_return = 0
-            daily_return = 0
-            return_std = 0
-            sharpe_ratio = 0
-            return_drawdown_ratio = 0
-        else:
-            # Calculate balance related time series data
-            df["balance"] = df["net_pnl"].cumsum() + self.capital
-            df["return"] = np.log(df["balance"] / df["balance"].shift(1)).fillna(0)
-            df["highlevel"] = (
-                df["balance"].rolling(
-                    min_periods=1, window=len(df), center=False).max()
-            )
-            df["drawdown"] = df["balance"] - df["highlevel"]
-            df["ddpercent"] = df["drawdown"] / df["highlevel"] * 100
-
-            # Calculate statistics value
-            start_date = df.index[0]
-            end_date = df.index[-1]
-
-            total_days = len(df)
-            profit_days = len(df[df["net_pnl"] > 0])
-            loss_days = len(df[df["net_pnl"] < 0])
-
-            end_balance = df["balance"].iloc[-1]
-            max_drawdown = df["drawdown"].min()
-            max_ddpercent = df["ddpercent"].min()
-            max_drawdown_end = df["drawdown"].idxmin()
-            max_drawdown_start = df["balance"][:max_drawdown_end].argmax()
-            max_drawdown_duration = (max_drawdown_end - max_drawdown_start).days
-
-            total_net_pnl = df["net_pnl"].sum()
-            daily_net_pnl = total_net_pnl / total_days
-
-            total_commission = df["commission"].sum()
-            daily_commission = total_commission / total_days
-
-            total_slippage = df["slippage"].sum()
-            daily_slippage = total_slippage / total_days
-
-            total_turnover = df["turnover"].sum()
-            daily_turnover = total_turnover / total_days
-
-            total_trade_count = df["trade_count"].sum()
-            daily_trade_count = total_trade_count / total_days
-
-            total_return = (end_balance / self.capital - 1) * 100
-            annual_return = total_return / total_days * 240
-            daily_return = df["return"].mean() * 100
-            return_std = df["return"].std() * 100
-
-            if return_std:
-                sharpe_ratio = daily_return / return_std * np.sqrt(240)
-            else:
-                sharpe_ratio = 0
-
-            return_drawdown_ratio = -total_return / max_ddpercent
+        statistics = calculate_statistics(df, self.capital)
 
         # Output
         if output:
             self.output("-" * 30)
-            self.output(f"首个交易日：\t{start_date}")
-            self.output(f"最后交易日：\t{end_date}")
+            self.output(f"首个交易日：\t{statistics['start_date']}")
+            self.output(f"最后交易日：\t{statistics['end_date']}")
 
-            self.output(f"总交易日：\t{total_days}")
-            self.output(f"盈利交易日：\t{profit_days}")
-            self.output(f"亏损交易日：\t{loss_days}")
+            self.output(f"总交易日：\t{statistics['total_days']}")
+            self.output(f"盈利交易日：\t{statistics['profit_days']}")
+            self.output(f"亏损交易日：\t{statistics['loss_days']}")
 
             self.output(f"起始资金：\t{self.capital:,.2f}")
-            self.output(f"结束资金：\t{end_balance:,.2f}")
-
-            self.output(f"总收益率：\t{total_return:,.2f}%")
-            self.output(f"年化收益：\t{annual_return:,.2f}%")
-            self.output(f"最大回撤: \t{max_drawdown:,.2f}")
-            self.output(f"百分比最大回撤: {max_ddpercent:,.2f}%")
-            self.output(f"最长回撤天数: \t{max_drawdown_duration}")
-
-            self.output(f"总盈亏：\t{total_net_pnl:,.2f}")
-            self.output(f"总手续费：\t{total_commission:,.2f}")
-            self.output(f"总滑点：\t{total_slippage:,.2f}")
-            self.output(f"总成交金额：\t{total_turnover:,.2f}")
-            self.output(f"总成交笔数：\t{total_trade_count}")
-
-            self.output(f"日均盈亏：\t{daily_net_pnl:,.2f}")
-            self.output(f"日均手续费：\t{daily_commission:,.2f}")
-            self.output(f"日均滑点：\t{daily_slippage:,.2f}")
-            self.output(f"日均成交金额：\t{daily_turnover:,.2f}")
-            self.output(f"日均成交笔数：\t{daily_trade_count}")
-
-            self.output(f"日均收益率：\t{daily_return:,.2f}%")
-            self.output(f"收益标准差：\t{return_std:,.2f}%")
-            self.output(f"Sharpe Ratio：\t{sharpe_ratio:,.2f}")
-            self.output(f"收益回撤比：\t{return_drawdown_ratio:,.2f}")
-
-        statistics = {
-            "start_date": start_date,
-            "end_date": end_date,
-            "total_days": total_days,
-            "profit_days": profit_days,
-            "loss_days": loss_days,
-            "capital": self.capital,
-            "end_balance": end_balance,
-            "max_drawdown": max_drawdown,
-            "max_ddpercent": max_ddpercent,
-            "max_drawdown_duration": max_drawdown_duration,
-            "total_net_pnl": total_net_pnl,
-            "daily_net_pnl": daily_net_pnl,
-            "total_commission": total_commission,
-            "daily_commission": daily_commission,
-            "total_slippage": total_slippage,
-            "daily_slippage": daily_slippage,
-            "total_turnover": total_turnover,
-            "daily_turnover": daily_turnover,
-            "total_trade_count": total_trade_count,
-            "daily_trade_count": daily_trade_count,
-            "total_return": total_return,
-            "annual_return": annual_return,
-            "daily_return": daily_return,
-            "return_std": return_std,
-            "sharpe_ratio": sharpe_ratio,
-            "return_drawdown_ratio": return_drawdown_ratio,
-        }
+            self.output(f"结束资金：\t{statistics['end_balance']:,.2f}")
+
+            self.output(f"总收益率：\t{statistics['total_return']:,.2f}%")
+            self.output(f"年化收益：\t{statistics['annual_return']:,.2f}%")
+            self.output(f"最大回撤: \t{statistics['max_drawdown']:,.2f}")
+            self.output(f"百分比最大回撤: {statistics['max_ddpercent']:,.2f}%")
+            self.output(f"最长回撤天数: \t{statistics['max_drawdown_duration']}")
+
+            self.output(f"总盈亏：\t{statistics['total_net_pnl']:,.2f}")
+            self.output(f"总手续费：\t{statistics['total_commission']:,.2f}")
+            self.output(f"总滑点：\t{statistics['total_slippage']:,.2f}")
+            self.output(f"总成交金额：\t{statistics['total_turnover']:,.2f}")
+            self.output(f"总成交笔数：\t{statistics['total_trade_count']}")
+
+            self.output(f"日均盈亏：\t{statistics['daily_net_pnl']:,.2f}")
+            self.output(f"日均手续费：\t{statistics['daily_commission']:,.2f}")
+            self.output(f"日均滑点：\t{statistics['daily_slippage']:,.2f}")
+            self.output(f"日均成交金额：\t{statistics['daily_turnover']:,.2f}")
+            self.output(f"日均成交笔数：\t{statistics['daily_trade_count']}")
+
+            self.output(f"日均收益率：\t{statistics['daily_return']:,.2f}%")
+            self.output(f"收益标准差：\t{statistics['return_std']:,.2f}%")
+            self.output(f"Sharpe Ratio：\t{statistics['sharpe_ratio']:,.2f}")
+            self.output(f"收益回撤比：\t{statistics['return_drawdown_ratio']:,.2f}")
 
         return statistics
 
@@ -424,6 +317,7 @@ class BacktestingEngine:
         """"""
         self.bar = bar
         self.datetime = bar.datetime
+        self.clock.update(self.datetime)
         self.cross_algo()
 
         self.strategy.on_spread_bar(bar)
@@ -434,6 +328,7 @@ class BacktestingEngine:
         """"""
         self.tick = tick
         self.datetime = tick.datetime
+        self.clock.update(self.datetime)
         self.cross_algo()
 
         self.spread.bid_price = tick.bid_price_1
@@ -494,7 +389,7 @@ class BacktestingEngine:
                 symbol=self.spread.name,
                 exchange=Exchange.LOCAL,
                 orderid=algo.algoid,
-                tradeid=str(self.trade_count),
+                tradeid=str(self.clock.new_id()),
                 direction=algo.direction,
                 offset=algo.offset,
                 price=trade_price,
@@ -540,7 +435,7 @@ class BacktestingEngine:
     ) -> str:
         """"""
         self.algo_count += 1
-        algoid = str(self.algo_count)
+        algoid = str(self.clock.new_id())
 
         algo = SpreadAlgoTemplate(
             self,
@@ -2,14 +2,32 @@
 Event-driven framework of vn.py framework.
 """
 
-from collections import defaultdict
+from collections import defaultdict, deque
 from queue import Empty, Queue
-from threading import Thread
+from threading import Condition, Thread
 from time import sleep
-from typing import Any, Callable, List
+from typing import Any, Callable, Dict, List, Sequence
 
 EVENT_TIMER = "eTimer"
 
+# Priority lanes of PriorityEventEngine, smaller value is processed first
+PRIORITY_HIGH = 0
+PRIORITY_MEDIUM = 1
+PRIORITY_NORMAL = 2
+PRIORITY_LOW = 3
+
+# Priority of event type prefix, other types use PRIORITY_NORMAL.
+# Timer is above ticks so that timing is not delayed by a tick backlog.
+DEFAULT_PRIORITIES = {
+    "eTrade.": PRIORITY_HIGH,
+    "eOrder.": PRIORITY_HIGH,
+    "ePosition.": PRIORITY_MEDIUM,
+    "eAccount.": PRIORITY_MEDIUM,
+    EVENT_TIMER: PRIORITY_MEDIUM,
+    "eTick.": PRIORITY_NORMAL,
+    "eLog": PRIORITY_LOW,
+}
+
 
 class Event:
     """
@@ -141,3 +159,205 @@ class EventEngine:
         """
         if handler in self._general_handlers:
             self._general_handlers.remove(handler)
+
+
+class PriorityEventEngine(EventEngine):
+    """
+    Event engine with separate queue for each priority lane, so that
+    order and trade events are not delayed by a flood of tick events.
+
+    Lanes are served by priority, but a pending lane skipped for
+    starvation_limit events in a row is served once, so that lower lanes
+    (e.g. log) still progress under a sustained backlog of higher ones, at
+    the cost of delaying higher lane events by one event every
+    starvation_limit events.
+
+    Pending events of conflated types (e.g. "eTick.") are replaced by the
+    latest one of the same type and symbol, keeping the queue position
+    of the first one.
+
+    Heavy handlers can be pinned to their own worker threads. Events are
+    assigned to worker by vt_symbol of event data, so events of the same
+    symbol are still processed in order.
+    """
+
+    def __init__(
+        self,
+        interval: int = 1,
+        priorities: Dict[str, int] = None,
+        conflate_types: Sequence[str] = (),
+        starvation_limit: int = 100
+    ):
+        """
+        priorities: priority of event type prefix, DEFAULT_PRIORITIES if not specified.
+        conflate_types: prefix of event types to be conflated.
+        starvation_limit: count of events served before a skipped lane, 0 for strict priority.
+        """
+        super().__init__(interval)
+
+        if priorities is None:
+            priorities = DEFAULT_PRIORITIES
+        self._priorities: Dict[str, int] = priorities
+        self._conflate_types: tuple = tuple(conflate_types)
+
+        # Lane and conflation flag of each event type
+        self._type_lanes: Dict[str, tuple] = {}
+
+        lane_count = max(list(priorities.values()) + [PRIORITY_NORMAL]) + 1
+        self._lanes: List[deque] = [deque() for _ in range(lane_count)]
+        self._starvation_limit: int = starvation_limit
+        self._skips: List[int] = [0] * lane_count
+        self._condition: Condition = Condition()
+
+        # Latest pending event of conflation key
+        self._pending: Dict[tuple, Event] = {}
+
+        # Worker queues of pinned handlers
+        self._workers: Dict[HandlerType, List[Queue]] = {}
+        self._worker_threads: List[Thread] = []
+
+    def _get_lane(self, type: str) -> tuple:
+        """"""
+        lane = self._type_lanes.get(type, None)
+        if lane:
+            return lane
+
+        # Longest prefix decides priority
+        priority = PRIORITY_NORMAL
+        length = -1
+        for prefix, value in self._priorities.items():
+            if type.startswith(prefix) and len(prefix) > length:
+                priority = value
+                length = len(prefix)
+
+        conflate = type.startswith(self._conflate_types) if self._conflate_types else False
+
+        lane = (priority, conflate)
+        self._type_lanes[type] = lane
+        return lane
+
+    def _run(self) -> None:
+        """
+        Get event from lane of the highest priority and then process it.
+        """
+        while self._active:
+            event = self._get()
+            if event:
+                self._process(event)
+
+    def _get(self) -> Event:
+        """
+        Get event from the first pending lane, or from the first lane skipped
+        starvation_limit times.
+        """
+        with self._condition:
+            chosen = None
+            for n, lane in enumerate(self._lanes):
+                if not lane:
+                    continue
+
+                if chosen is None:
+                    chosen = n
+                elif self._starvation_limit:
+                    self._skips[n] += 1
+                    if self._skips[n] >= self._starvation_limit and self._skips[chosen] < self._starvation_limit:
+                        chosen = n
+
+            if chosen is None:
+                self._condition.wait(1)
+                return None
+
+            self._skips[chosen] = 0
+            item = self._lanes[chosen].popleft()
+
+            # Conflation key is queued instead of event
+            if type(item) is tuple:
+                return self._pending.pop(item)
+            return item
+
+    def _process(self, event: Event) -> None:
+        """
+        Same as EventEngine, except that pinned handlers are run by workers.
+        """
+        if event.type in self._handlers:
+            for handler in self._handlers[event.type]:
+                self._call(handler, event)
+
+        if self._general_handlers:
+            for handler in self._general_handlers:
+                self._call(handler, event)
+
+    def _call(self, handler: HandlerType, event: Event) -> None:
+        """"""
+        queues = self._workers.get(handler, None)
+        if not queues:
+            handler(event)
+            return
+
+        vt_symbol = getattr(event.data, "vt_symbol", "")
+        if len(queues) == 1 or not vt_symbol:
+            queue = queues[0]
+        else:
+            queue = queues[hash(vt_symbol) % len(queues)]
+        queue.put(event)
+
+    def _run_worker(self, handler: HandlerType, queue: Queue) -> None:
+        """"""
+        while self._active:
+            try:
+                event = queue.get(block=True, timeout=1)
+                handler(event)
+            except Empty:
+                pass
+
+    def start(self) -> None:
+        """
+        Start event engine and worker threads.
+        """
+        self._active = True
+
+        for handler, queues in self._workers.items():
+            for queue in queues:
+                thread = Thread(target=self._run_worker, args=(handler, queue))
+                thread.start()
+                self._worker_threads.append(thread)
+
+        self._thread.start()
+        self._timer.start()
+
+    def stop(self) -> None:
+        """
+        Stop event engine and worker threads.
+        """
+        super().stop()
+
+        for thread in self._worker_threads:
+            thread.join()
+
+    def put(self, event: Event) -> None:
+        """
+        Put an event object into lane of its priority.
+        """
+        priority, conflate = self._get_lane(event.type)
+        lane = self._lanes[priority]
+
+        with self._condition:
+            if conflate:
+                key = (event.type, getattr(event.data, "vt_symbol", None))
+                if key not in self._pending:
+                    lane.append(key)
+                self._pending[key] = event
+            else:
+                lane.append(event)
+
+            self._condition.notify()
+
+    def pin(self, handler: HandlerType, worker_count: int = 1) -> None:
+        """
+        Run handler in its own worker threads instead of event thread,
+        should be called before start.
+        """
+        if self._active:
+            raise RuntimeError("Handler must be pinned before event engine starts")
+
+        self._workers[handler] = [Queue() for _ in range(worker_count)]
@@ -1,10 +1,11 @@
 from vnpy.event import Event
-from vnpy.rpc import RpcClient
+from vnpy.rpc import RpcClient, BATCH_ALL_TOPIC, BATCH_LATEST_TOPIC
 from vnpy.trader.gateway import BaseGateway
 from vnpy.trader.object import (
     SubscribeRequest,
     CancelRequest,
-    OrderRequest
+    OrderRequest,
+    HistoryRequest
 )
 from vnpy.trader.constant import Exchange
 
@@ -16,7 +17,8 @@ class RpcGateway(BaseGateway):
 
     default_setting = {
         "主动请求地址": "tcp://127.0.0.1:2014",
-        "推送订阅地址": "tcp://127.0.0.1:4102"
+        "推送订阅地址": "tcp://127.0.0.1:4102",
+        "行情推送": ["全部", "最新"]
     }
 
     exchanges = list(Exchange)
@@ -27,6 +29,9 @@ class RpcGateway(BaseGateway):
 
         self.symbol_gateway_map = {}
 
+        # Seconds to wait for history data, longer than other requests
+        self.history_timeout = 300
+
         self.client = RpcClient()
         self.client.callback = self.client_callback
 
@@ -35,7 +40,12 @@ class RpcGateway(BaseGateway):
         req_address = setting["主动请求地址"]
         pub_address = setting["推送订阅地址"]
 
-        self.client.subscribe_topic("")
+        # Only the latest tick of each symbol in one batch is received if
+        # strategies do not need every tick
+        if setting.get("行情推送", "全部") == "最新":
+            self.client.subscribe_topic(BATCH_LATEST_TOPIC)
+        else:
+            self.client.subscribe_topic(BATCH_ALL_TOPIC)
         self.client.start(req_address, pub_address)
 
         self.write_log("服务器连接成功，开始初始化查询")
@@ -57,6 +67,11 @@ class RpcGateway(BaseGateway):
         gateway_name = self.symbol_gateway_map.get(req.vt_symbol, "")
         self.client.cancel_order(req, gateway_name)
 
+    def query_history(self, req: HistoryRequest):
+        """"""
+        gateway_name = self.symbol_gateway_map.get(req.vt_symbol, "")
+        return self.client.call("query_history", (req, gateway_name), timeout=self.history_timeout)
+
     def query_account(self):
         """"""
         pass
@@ -67,32 +82,41 @@ class RpcGateway(BaseGateway):
 
     def query_all(self):
         """"""
-        contracts = self.client.get_all_contracts()
+        # Send all queries together, then wait for each reply
+        futures = [
+            self.client.send_request(name) for name in [
+                "get_all_contracts",
+                "get_all_accounts",
+                "get_all_positions",
+                "get_all_orders",
+                "get_all_trades"
+            ]
+        ]
+        contracts, accounts, positions, orders, trades = [
+            self.client.get_result(future) for future in futures
+        ]
+
         for contract in contracts:
             self.symbol_gateway_map[contract.vt_symbol] = contract.gateway_name
             contract.gateway_name = self.gateway_name
             self.on_contract(contract)
         self.write_log("合约信息查询成功")
 
-        accounts = self.client.get_all_accounts()
         for account in accounts:
             account.gateway_name = self.gateway_name
             self.on_account(account)
         self.write_log("资金信息查询成功")
 
-        positions = self.client.get_all_positions()
         for position in positions:
             position.gateway_name = self.gateway_name
             self.on_position(position)
         self.write_log("持仓信息查询成功")
 
-        orders = self.client.get_all_orders()
         for order in orders:
             order.gateway_name = self.gateway_name
             self.on_order(order)
         self.write_log("委托信息查询成功")
 
-        trades = self.client.get_all_trades()
         for trade in trades:
             trade.gateway_name = self.gateway_name
             self.on_trade(trade)
@@ -103,15 +127,14 @@ class RpcGateway(BaseGateway):
         self.client.stop()
         self.client.join()
 
-    def client_callback(self, topic: str, event: Event):
-        """"""
-        if event is None:
-            print("none event", topic, event)
-            return
-
-        data = event.data
+    def client_callback(self, topic: str, events: list):
+        """
+        Unpack event batch published by RpcServiceEngine.
+        """
+        for event in events:
+            data = event.data
 
-        if hasattr(data, "gateway_name"):
-            data.gateway_name = self.gateway_name
+            if hasattr(data, "gateway_name"):
+                data.gateway_name = self.gateway_name
 
-        self.event_engine.put(event)
+            self.event_engine.put(event)
@@ -1,13 +1,18 @@
-from zmq.backend.cython.constants import NOBLOCK
+import asyncio
 import signal
+import struct
 import threading
 import traceback
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from datetime import datetime, timedelta
 from functools import lru_cache
+from itertools import count
 from typing import Any, Callable, Dict
 
 import zmq
 
+from .codec import CODECS, TAG_CODECS, PICKLE_CODEC, choose_codec, encode, decode
+
 
 def _(x): return x
 
@@ -20,6 +25,15 @@ KEEP_ALIVE_TOPIC: str = "_keep_alive"
 KEEP_ALIVE_INTERVAL: timedelta = timedelta(seconds=1)
 KEEP_ALIVE_TOLERANCE: timedelta = timedelta(seconds=3)
 
+GET_CODECS_FUNCTION: str = "_get_codecs"
+
+REQUEST_ID_STRUCT: struct.Struct = struct.Struct("<Q")
+
+# Topic prefixes of event batches published by RpcServiceEngine, followed by
+# "." and event type, e.g. "_batch_all.eTick."
+BATCH_ALL_TOPIC: str = "_batch_all"         # all events
+BATCH_LATEST_TOPIC: str = "_batch_latest"   # ticks conflated to the latest of each symbol in batch
+
 
 class RemoteException(Exception):
     """
@@ -40,9 +54,13 @@ class RemoteException(Exception):
 
 
 class RpcServer:
-    """"""
+    """
+    Requests are received by ROUTER socket and executed by a pool of
+    worker threads, so one slow function does not block other callers.
+    Replies are passed back to ROUTER through inproc PUSH/PULL sockets.
+    """
 
-    def __init__(self):
+    def __init__(self, worker_count: int = 4):
         """
         Constructor
         """
@@ -52,17 +70,32 @@ class RpcServer:
         # Zmq port related
         self.__context: zmq.Context = zmq.Context()
 
-        # Reply socket (Request–reply pattern)
-        self.__socket_rep: zmq.Socket = self.__context.socket(zmq.REP)
+        # Router socket (Request–reply pattern with concurrent requests)
+        self.__socket_router: zmq.Socket = self.__context.socket(zmq.ROUTER)
+
+        # Publish socket (Publish–subscribe pattern), XPUB receives subscriptions
+        self.__socket_pub: zmq.Socket = self.__context.socket(zmq.XPUB)
+        self.__subscriptions: set = set()
 
-        # Publish socket (Publish–subscribe pattern)
-        self.__socket_pub: zmq.Socket = self.__context.socket(zmq.PUB)
+        # Pull socket receiving replies from worker threads
+        self.__socket_reply: zmq.Socket = self.__context.socket(zmq.PULL)
+        self.__reply_address: str = f"inproc://rpc_server_reply_{id(self)}"
+        self.__local: threading.local = threading.local()
+        self.__local_sockets: list = []
 
         # Worker thread related
         self.__active: bool = False                     # RpcServer status
         self.__thread: threading.Thread = None          # RpcServer thread
+        self.__lock: threading.Lock = threading.Lock()  # Publish socket is used by multiple threads
+
+        self.worker_count: int = worker_count
+        self.__executor: ThreadPoolExecutor = None
+
+        # Codec used for published data, the best available one by default
+        self.__codec = next(iter(CODECS.values()))
 
         self._register(KEEP_ALIVE_TOPIC, lambda n: n)
+        self._register(GET_CODECS_FUNCTION, self.get_codecs)
 
     def is_active(self) -> bool:
         """"""
@@ -76,8 +109,12 @@ class RpcServer:
             return
 
         # Bind socket address
-        self.__socket_rep.bind(rep_address)
+        self.__socket_router.bind(rep_address)
         self.__socket_pub.bind(pub_address)
+        self.__socket_reply.bind(self.__reply_address)
+
+        # Start worker threads
+        self.__executor = ThreadPoolExecutor(self.worker_count, "RpcServerWorker")
 
         # Start RpcServer status
         self.__active = True
@@ -106,6 +143,10 @@ class RpcServer:
         """
         Run RpcServer functions
         """
+        poller = zmq.Poller()
+        poller.register(self.__socket_router, zmq.POLLIN)
+        poller.register(self.__socket_reply, zmq.POLLIN)
+
         start = datetime.utcnow()
 
         while self.__active:
@@ -114,37 +155,121 @@ class RpcServer:
             delta = cur - start
 
             if delta >= KEEP_ALIVE_INTERVAL:
+                start = cur
                 self.publish(KEEP_ALIVE_TOPIC, cur)
 
-            if not self.__socket_rep.poll(1000):
-                continue
+            self.process_subscriptions()
 
-            # Receive request data from Reply socket
-            req = self.__socket_rep.recv_pyobj()
+            events = dict(poller.poll(1000))
 
-            # Get function name and parameters
-            name, args, kwargs = req
+            # Send replies of finished requests back to clients
+            if self.__socket_reply in events:
+                while True:
+                    try:
+                        msg = self.__socket_reply.recv_multipart(flags=zmq.NOBLOCK)
+                    except zmq.Again:
+                        break
+                    self.__socket_router.send_multipart(msg)
 
-            # Try to get and execute callable function object; capture exception information if it fails
-            try:
-                func = self.__functions[name]
-                r = func(*args, **kwargs)
-                rep = [True, r]
-            except Exception as e:  # noqa
-                rep = [False, traceback.format_exc()]
+            # Receive requests: client identity, request id and request data
+            if self.__socket_router in events:
+                while True:
+                    try:
+                        msg = self.__socket_router.recv_multipart(flags=zmq.NOBLOCK)
+                    except zmq.Again:
+                        break
+                    self.__executor.submit(self.process_request, *msg)
 
-            # send callable response by Reply socket
-            self.__socket_rep.send_pyobj(rep)
+        # Wait for running requests
+        self.__executor.shutdown()
+
+        # Close sockets of worker threads, otherwise context can not be terminated
+        for socket in self.__local_sockets:
+            socket.close()
+        self.__local_sockets.clear()
 
         # Unbind socket address
         self.__socket_pub.unbind(self.__socket_pub.LAST_ENDPOINT)
-        self.__socket_rep.unbind(self.__socket_rep.LAST_ENDPOINT)
+        self.__socket_router.unbind(self.__socket_router.LAST_ENDPOINT)
+        self.__socket_reply.unbind(self.__reply_address)
+
+    def process_request(self, identity: bytes, request_id: bytes, data: bytes) -> None:
+        """
+        Execute request in worker thread, reply with the same codec
+        """
+        codec = TAG_CODECS.get(data[:1], PICKLE_CODEC)
+
+        # Try to get and execute callable function object; capture exception information if it fails
+        try:
+            # Get function name and parameters
+            name, args, kwargs = decode(data)
+
+            func = self.__functions[name]
+            r = func(*args, **kwargs)
+            rep = [True, r]
+        except Exception as e:  # noqa
+            rep = [False, traceback.format_exc()]
+
+        # Each worker thread sends reply with its own push socket
+        socket = getattr(self.__local, "socket", None)
+        if not socket:
+            socket = self.__context.socket(zmq.PUSH)
+            socket.setsockopt(zmq.LINGER, 0)
+            socket.connect(self.__reply_address)
+            self.__local.socket = socket
+            self.__local_sockets.append(socket)
+
+        socket.send_multipart([identity, request_id, encode(rep, codec)])
 
     def publish(self, topic: str, data: Any) -> None:
         """
-        Publish data
+        Publish data, topic is sent as a separate frame for subscription filtering
+        """
+        msg = [topic.encode("utf-8"), encode(data, self.__codec)]
+
+        with self.__lock:
+            self.__socket_pub.send_multipart(msg)
+
+    def process_subscriptions(self) -> None:
+        """
+        Receive topics subscribed by the first subscriber or unsubscribed by the last one
+        """
+        with self.__lock:
+            while True:
+                try:
+                    msg = self.__socket_pub.recv(flags=zmq.NOBLOCK)
+                except zmq.Again:
+                    break
+
+                if msg[:1] == b"\x01":
+                    self.__subscriptions.add(msg[1:])
+                elif msg[:1] == b"\x00":
+                    self.__subscriptions.discard(msg[1:])
+
+    def is_subscribed(self, topic: str) -> bool:
+        """
+        Check whether any client subscribes topic, updated every poll of server thread
         """
-        self.__socket_pub.send_pyobj([topic, data])
+        topic = topic.encode("utf-8")
+        for prefix in list(self.__subscriptions):
+            if topic.startswith(prefix):
+                return True
+        return False
+
+    def get_codecs(self) -> dict:
+        """
+        Get codecs supported for request and the one used for publishing
+        """
+        return {
+            "codecs": list(CODECS.keys()),
+            "publish_codec": self.__codec.name
+        }
+
+    def set_publish_codec(self, name: str) -> None:
+        """
+        Set codec used for publishing, for subscribers without the default one
+        """
+        self.__codec = CODECS[name]
 
     def register(self, func: Callable) -> None:
         """
@@ -160,23 +285,45 @@ class RpcServer:
 
 
 class RpcClient:
-    """"""
+    """
+    Requests are sent by DEALER socket with request id, so calls from
+    multiple threads or coroutines are pipelined instead of waiting
+    for each other. Each call waits for its own reply until timeout.
+    """
 
     def __init__(self):
         """Constructor"""
         # zmq port related
         self.__context: zmq.Context = zmq.Context()
 
-        # Request socket (Request–reply pattern)
-        self.__socket_req: zmq.Socket = self.__context.socket(zmq.REQ)
+        # Dealer socket (Request–reply pattern with concurrent requests)
+        self.__socket_dealer: zmq.Socket = self.__context.socket(zmq.DEALER)
 
         # Subscribe socket (Publish–subscribe pattern)
         self.__socket_sub: zmq.Socket = self.__context.socket(zmq.SUB)
 
+        # Pull socket receiving requests from caller threads
+        self.__socket_request: zmq.Socket = self.__context.socket(zmq.PULL)
+        self.__request_address: str = f"inproc://rpc_client_request_{id(self)}"
+        self.__local: threading.local = threading.local()
+        self.__local_sockets: list = []
+
         # Worker thread relate, used to process data pushed from server
         self.__active: bool = False                 # RpcClient status
         self.__thread: threading.Thread = None      # RpcClient thread
-        self.__lock: threading.Lock = threading.Lock()
+
+        # Request thread, used to send requests and receive replies
+        self.__request_thread: threading.Thread = None
+
+        # Requests waiting for reply: key is request id, value is future
+        self.__futures: Dict[int, Future] = {}
+        self.__request_count = count()
+
+        # Default seconds to wait for reply
+        self.timeout: float = 30
+
+        # Codec of request, negotiated with server when started
+        self.__codec = PICKLE_CODEC
 
         self._last_received_ping: datetime = datetime.utcnow()
 
@@ -188,21 +335,76 @@ class RpcClient:
 
         # Perform remote call task
         def dorpc(*args, **kwargs):
-            # Generate request
-            req = [name, args, kwargs]
+            return self.call(name, args, kwargs)
 
-            # Send request and wait for response
-            with self.__lock:
-                self.__socket_req.send_pyobj(req)
-                rep = self.__socket_req.recv_pyobj()
+        return dorpc
 
-            # Return response if successed; Trigger exception if failed
-            if rep[0]:
-                return rep[1]
-            else:
-                raise RemoteException(rep[1])
+    def send_request(self, name: str, args: tuple = (), kwargs: dict = None) -> Future:
+        """
+        Send request without waiting, return future of the reply
+        """
+        request_id = next(self.__request_count)
+        future = Future()
+        self.__futures[request_id] = future
+
+        # Generate request
+        req = [name, args, kwargs or {}]
+
+        # Each caller thread sends request with its own push socket
+        socket = getattr(self.__local, "socket", None)
+        if not socket:
+            socket = self.__context.socket(zmq.PUSH)
+            socket.setsockopt(zmq.LINGER, 0)
+            socket.connect(self.__request_address)
+            self.__local.socket = socket
+            self.__local_sockets.append(socket)
+
+        socket.send_multipart([REQUEST_ID_STRUCT.pack(request_id), encode(req, self.__codec)])
+        future.request_id = request_id
+        return future
+
+    def get_result(self, future: Future, timeout: float = None) -> Any:
+        """
+        Wait for reply, raise TimeoutError if not received in time
+        """
+        if timeout is None:
+            timeout = self.timeout
+
+        try:
+            rep = future.result(timeout)
+        except FutureTimeoutError:
+            self.__futures.pop(future.request_id, None)
+            raise TimeoutError(_("RpcServer has no reply over {timeout} seconds".format(timeout=timeout)))
+
+        # Return response if successed; Trigger exception if failed
+        if rep[0]:
+            return rep[1]
+        else:
+            raise RemoteException(rep[1])
+
+    def call(self, name: str, args: tuple = (), kwargs: dict = None, timeout: float = None) -> Any:
+        """
+        Call remote function and wait for result
+        """
+        future = self.send_request(name, args, kwargs)
+        return self.get_result(future, timeout)
 
-        return dorpc
+    async def call_async(self, name: str, args: tuple = (), kwargs: dict = None, timeout: float = None) -> Any:
+        """
+        Call remote function in asyncio event loop
+        """
+        if timeout is None:
+            timeout = self.timeout
+
+        future = self.send_request(name, args, kwargs)
+        try:
+            # Shield future from cancel on timeout, since it is set by request thread
+            await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+        except asyncio.TimeoutError:
+            self.__futures.pop(future.request_id, None)
+            raise TimeoutError(_("RpcServer has no reply over {timeout} seconds".format(timeout=timeout)))
+
+        return self.get_result(future)
 
     def start(self, req_address: str, sub_address: str) -> None:
         """
@@ -212,8 +414,12 @@ class RpcClient:
             return
 
         # Connect zmq port
-        self.__socket_req.connect(req_address)
+        self.__socket_dealer.connect(req_address)
         self.__socket_sub.connect(sub_address)
+        self.__socket_request.bind(self.__request_address)
+
+        # Keep alive message is always received whatever topic subscribed
+        self.subscribe_topic(KEEP_ALIVE_TOPIC)
 
         # Start RpcClient status
         self.__active = True
@@ -222,8 +428,14 @@ class RpcClient:
         self.__thread = threading.Thread(target=self.run)
         self.__thread.start()
 
+        self.__request_thread = threading.Thread(target=self.run_request)
+        self.__request_thread.start()
+
         self._last_received_ping = datetime.utcnow()
 
+        # Negotiate codec without waiting, requests use pickle until reply
+        self.negotiate_codec()
+
     def stop(self) -> None:
         """
         Stop RpcClient
@@ -240,6 +452,10 @@ class RpcClient:
             self.__thread.join()
         self.__thread = None
 
+        if self.__request_thread and self.__request_thread.is_alive():
+            self.__request_thread.join()
+        self.__request_thread = None
+
     def run(self) -> None:
         """
         Run RpcClient function
@@ -251,8 +467,15 @@ class RpcClient:
                 self._on_unexpected_disconnected()
                 continue
 
-            # Receive data from subscribe socket
-            topic, data = self.__socket_sub.recv_pyobj(flags=NOBLOCK)
+            # Receive topic frame and data frame from subscribe socket
+            topic, data = self.__socket_sub.recv_multipart(flags=zmq.NOBLOCK)
+            topic = topic.decode("utf-8")
+
+            # Skip data of codec not supported
+            try:
+                data = decode(data)
+            except ValueError:
+                continue
 
             if topic == KEEP_ALIVE_TOPIC:
                 self._last_received_ping = data
@@ -261,9 +484,71 @@ class RpcClient:
                 self.callback(topic, data)
 
         # Close socket
-        self.__socket_req.close()
         self.__socket_sub.close()
 
+    def run_request(self) -> None:
+        """
+        Forward requests to server and set replies into futures
+        """
+        poller = zmq.Poller()
+        poller.register(self.__socket_dealer, zmq.POLLIN)
+        poller.register(self.__socket_request, zmq.POLLIN)
+
+        while self.__active:
+            events = dict(poller.poll(1000))
+
+            if self.__socket_request in events:
+                while True:
+                    try:
+                        msg = self.__socket_request.recv_multipart(flags=zmq.NOBLOCK)
+                    except zmq.Again:
+                        break
+                    self.__socket_dealer.send_multipart(msg)
+
+            if self.__socket_dealer in events:
+                while True:
+                    try:
+                        request_id, data = self.__socket_dealer.recv_multipart(flags=zmq.NOBLOCK)
+                    except zmq.Again:
+                        break
+
+                    # Reply of request timed out is discarded
+                    future = self.__futures.pop(REQUEST_ID_STRUCT.unpack(request_id)[0], None)
+                    if future:
+                        future.set_result(decode(data))
+
+        # Close socket
+        self.__socket_dealer.close()
+        self.__socket_request.close()
+
+        for socket in self.__local_sockets:
+            socket.close()
+        self.__local_sockets.clear()
+
+    def negotiate_codec(self) -> None:
+        """
+        Request codecs of server, the reply is processed in request thread
+        whenever server is available, so start does not block
+        """
+        future = self.send_request(GET_CODECS_FUNCTION)
+        future.add_done_callback(self.process_codecs)
+
+    def process_codecs(self, future: Future) -> None:
+        """
+        Use the best codec supported by both client and server for request
+        """
+        rep = future.result()
+        if not rep[0]:
+            return
+
+        setting = rep[1]
+        self.__codec = choose_codec(setting["codecs"])
+
+        publish_codec = setting["publish_codec"]
+        if publish_codec not in CODECS:
+            print(_("Codec {codec} of RpcServer publishing is not supported."
+                    .format(codec=publish_codec)))
+
     @staticmethod
     def _on_unexpected_disconnected():
         print(_("RpcServer has no response over {tolerance} seconds, please check you connection."
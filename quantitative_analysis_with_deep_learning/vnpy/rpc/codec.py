@@ -0,0 +1,346 @@
+"""
+Serialization of RPC messages.
+
+Every encoded message starts with one byte identifying the codec, so that
+the receiver can decode it without knowing the sender setting. Objects not
+supported by the binary codec are sent with pickle instead.
+"""
+
+import pickle
+import struct
+import threading
+import zlib
+from dataclasses import fields, is_dataclass
+from datetime import datetime, timedelta
+from enum import Enum
+from itertools import islice
+from operator import attrgetter
+from typing import Any, Dict, List
+
+from vnpy.event import Event
+from vnpy.trader import constant, object as trader_object
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+TAG_PICKLE = b"\x00"
+TAG_MSGPACK = b"\x01"
+
+EXT_DATETIME = 1
+EXT_ENUM = 2
+EXT_OBJECT = 3
+EXT_TUPLE = 4
+
+# Changed when wire format changes, part of codec name
+FORMAT_VERSION = 2
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = datetime.resolution
+DATETIME_STRUCT = struct.Struct("<q")
+
+
+def get_classes() -> list:
+    """
+    Get classes encoded by schema: Event and dataclasses of vnpy.trader.object.
+    """
+    classes = [Event]
+    for value in vars(trader_object).values():
+        if (
+            isinstance(value, type)
+            and is_dataclass(value)
+            and value.__module__ == trader_object.__name__
+        ):
+            classes.append(value)
+    return classes
+
+
+def get_enums() -> list:
+    """"""
+    enums = []
+    for value in vars(constant).values():
+        if (
+            isinstance(value, type)
+            and issubclass(value, Enum)
+            and value.__module__ == constant.__name__
+        ):
+            enums.append(value)
+    return enums
+
+
+class PickleCodec:
+    """"""
+
+    name = "pickle"
+    tag = TAG_PICKLE
+
+    def encode(self, obj: Any) -> bytes:
+        """"""
+        return pickle.dumps(obj, pickle.HIGHEST_PROTOCOL)
+
+    def decode(self, data: bytes) -> Any:
+        """"""
+        return pickle.loads(data)
+
+
+class ObjectSchema:
+    """
+    Field layout of one class for packing objects as list of values.
+
+    Fields annotated as float are packed together with struct, enum and
+    datetime fields are converted into value and integer microseconds.
+    Attributes set outside __init__ fields (e.g. vt_symbol set in
+    __post_init__) are sent with their names.
+    """
+
+    def __init__(self, cls: type):
+        """"""
+        self.cls: type = cls
+
+        if is_dataclass(cls):
+            types = {field.name: field.type for field in fields(cls)}
+        else:
+            types = {"type": str, "data": Any}
+        self.names: tuple = tuple(types)
+        self.size: int = len(self.names)
+
+        self.float_names: List[str] = [name for name, tp in types.items() if tp is float]
+        self.other_names: List[str] = [name for name, tp in types.items() if tp is not float]
+        self.float_struct: struct.Struct = struct.Struct(f"<{len(self.float_names)}d")
+
+        self.get_floats = attrgetter(*self.float_names) if self.float_names else None
+        self.get_others = attrgetter(*self.other_names) if self.other_names else None
+
+        self.enums: List[tuple] = []
+        self.datetimes: List[int] = []
+        for n, name in enumerate(self.other_names):
+            tp = types[name]
+            if tp is datetime:
+                self.datetimes.append(n)
+            elif isinstance(tp, type) and issubclass(tp, Enum):
+                self.enums.append((n, tp))
+
+    def signature(self) -> tuple:
+        """"""
+        return (self.cls.__name__, tuple(self.float_names), tuple(self.other_names))
+
+    def pack(self, obj: Any) -> list:
+        """"""
+        if len(self.float_names) == 1:
+            floats = self.float_struct.pack(self.get_floats(obj))
+        elif self.float_names:
+            floats = self.float_struct.pack(*self.get_floats(obj))
+        else:
+            floats = b""
+
+        if len(self.other_names) == 1:
+            others = [self.get_others(obj)]
+        else:
+            others = list(self.get_others(obj))
+
+        for n, _ in self.enums:
+            value = others[n]
+            if value is not None:
+                others[n] = value.value
+
+        for n in self.datetimes:
+            value = others[n]
+            if value is not None:
+                if value.tzinfo:
+                    raise TypeError("Timezone aware datetime is not supported")
+                others[n] = (value - EPOCH) // MICROSECOND
+
+        data = [floats, others]
+
+        d = obj.__dict__
+        if len(d) > self.size:
+            data.append(dict(islice(d.items(), self.size, None)))
+
+        return data
+
+    def unpack(self, data: list) -> Any:
+        """
+        Restore attributes directly, without __init__ and __post_init__.
+        """
+        floats, others, *extra = data
+
+        for n, enum in self.enums:
+            value = others[n]
+            if value is not None:
+                others[n] = enum._value2member_map_[value]
+
+        for n in self.datetimes:
+            value = others[n]
+            if value is not None:
+                others[n] = EPOCH + timedelta(microseconds=value)
+
+        obj = self.cls.__new__(self.cls)
+        d = obj.__dict__
+        d.update(zip(self.float_names, self.float_struct.unpack(floats)))
+        d.update(zip(self.other_names, others))
+        if extra:
+            d.update(extra[0])
+        return obj
+
+
+class MsgpackCodec:
+    """
+    Msgpack with extension types for Event and data objects of
+    vnpy.trader.object, datetime and enums of vnpy.trader.constant.
+
+    Objects are packed as values in order of class schema without names.
+    Name of codec contains checksum of all schemas, so only processes with
+    the same data structure definition negotiate it. Integer value of float
+    field is restored as float.
+
+    Types are checked exactly, tuples are restored as tuples and subclasses
+    of builtin types (e.g. namedtuple, OrderedDict) are not supported, so
+    that they are sent with pickle instead of changing type.
+    """
+
+    tag = TAG_MSGPACK
+
+    def __init__(self):
+        """"""
+        self.schemas: List[ObjectSchema] = [ObjectSchema(cls) for cls in get_classes()]
+        self.class_ids: Dict[type, int] = {schema.cls: n for n, schema in enumerate(self.schemas)}
+
+        self.enums: List[type] = get_enums()
+        self.enum_ids: Dict[type, int] = {cls: n for n, cls in enumerate(self.enums)}
+
+        signature = repr([
+            FORMAT_VERSION,
+            [schema.signature() for schema in self.schemas],
+            [(cls.__name__, [e.value for e in cls]) for cls in self.enums]
+        ])
+        self.name: str = f"msgpack:{zlib.crc32(signature.encode()):08x}"
+
+        self.local: threading.local = threading.local()
+
+    def encode(self, obj: Any) -> bytes:
+        """
+        Pack with packer of current thread, nested objects packed in default
+        use packer of the next depth, since creating packer is expensive.
+        """
+        local = self.local
+        depth = local.__dict__.setdefault("depth", 0)
+        packers = local.__dict__.setdefault("packers", [])
+
+        if depth == len(packers):
+            packers.append(msgpack.Packer(default=self.default, use_bin_type=True, strict_types=True))
+
+        local.depth = depth + 1
+        try:
+            return packers[depth].pack(obj)
+        finally:
+            local.depth = depth
+
+    def decode(self, data: bytes) -> Any:
+        """"""
+        return msgpack.unpackb(
+            data,
+            ext_hook=self.ext_hook,
+            raw=False,
+            strict_map_key=False
+        )
+
+    def default(self, obj: Any) -> Any:
+        """
+        Pack object not supported by msgpack, raise TypeError if unknown.
+        """
+        cls = type(obj)
+
+        class_id = self.class_ids.get(cls, None)
+        if class_id is not None:
+            data = self.schemas[class_id].pack(obj)
+            data.append(class_id)
+            return msgpack.ExtType(EXT_OBJECT, self.encode(data))
+
+        if cls is tuple:
+            return msgpack.ExtType(EXT_TUPLE, self.encode(list(obj)))
+
+        if cls is datetime and obj.tzinfo is None:
+            us = (obj - EPOCH) // MICROSECOND
+            return msgpack.ExtType(EXT_DATETIME, DATETIME_STRUCT.pack(us))
+
+        enum_id = self.enum_ids.get(cls, None)
+        if enum_id is not None:
+            return msgpack.ExtType(EXT_ENUM, self.encode([enum_id, obj.value]))
+
+        raise TypeError(f"Unsupported type: {cls}")
+
+    def ext_hook(self, code: int, data: bytes) -> Any:
+        """"""
+        if code == EXT_OBJECT:
+            data = self.decode(data)
+            class_id = data.pop()
+            return self.schemas[class_id].unpack(data)
+
+        if code == EXT_TUPLE:
+            return tuple(self.decode(data))
+
+        if code == EXT_DATETIME:
+            us = DATETIME_STRUCT.unpack(data)[0]
+            return EPOCH + timedelta(microseconds=us)
+
+        if code == EXT_ENUM:
+            enum_id, value = self.decode(data)
+            return self.enums[enum_id](value)
+
+        return msgpack.ExtType(code, data)
+
+
+def get_codecs() -> Dict[str, Any]:
+    """
+    Get available codecs by name, in order of preference.
+    """
+    codecs = {}
+
+    if msgpack:
+        codec = MsgpackCodec()
+        codecs[codec.name] = codec
+
+    codec = PickleCodec()
+    codecs[codec.name] = codec
+
+    return codecs
+
+
+CODECS: Dict[str, Any] = get_codecs()
+TAG_CODECS: Dict[bytes, Any] = {codec.tag: codec for codec in CODECS.values()}
+PICKLE_CODEC: PickleCodec = CODECS[PickleCodec.name]
+
+
+def choose_codec(names: List[str]) -> Any:
+    """
+    Choose the first local codec also supported by remote.
+    """
+    for name, codec in CODECS.items():
+        if name in names:
+            return codec
+    return PICKLE_CODEC
+
+
+def encode(obj: Any, codec: Any = PICKLE_CODEC) -> bytes:
+    """
+    Encode object with codec tag, fall back to pickle if codec fails.
+    """
+    if codec is not PICKLE_CODEC:
+        try:
+            return codec.tag + codec.encode(obj)
+        except (TypeError, ValueError, OverflowError, AttributeError, struct.error):
+            pass
+
+    return TAG_PICKLE + PICKLE_CODEC.encode(obj)
+
+
+def decode(data: bytes) -> Any:
+    """
+    Decode message by its codec tag.
+    """
+    codec = TAG_CODECS.get(data[:1], None)
+    if not codec:
+        raise ValueError(f"Unsupported codec tag: {data[:1]}")
+    return codec.decode(data[1:])
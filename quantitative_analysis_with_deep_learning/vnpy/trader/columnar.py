@@ -0,0 +1,751 @@
+"""
+Columnar storage of bar history, one numpy array per field.
+"""
+
+from datetime import date, datetime, timedelta
+from multiprocessing import shared_memory
+from operator import attrgetter
+from typing import Iterator, List, Sequence, Tuple
+
+import numpy as np
+from pandas import DataFrame
+
+from .constant import Exchange, Interval
+from .object import BarData, TickData
+
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+MINUTE_US = 60_000_000
+HOUR_US = 60 * MINUTE_US
+DAY_US = 24 * HOUR_US
+
+# Epoch day 0 is Thursday, shift so that weeks start on Monday
+WEEK_SHIFT = 3
+
+BAR_FIELDS = [
+    "volume",
+    "open_interest",
+    "open_price",
+    "high_price",
+    "low_price",
+    "close_price",
+]
+
+TICK_FIELDS = [
+    "volume",
+    "open_interest",
+    "last_price",
+    "last_volume",
+    "limit_up",
+    "limit_down",
+    "open_price",
+    "high_price",
+    "low_price",
+    "pre_close",
+    "bid_price_1",
+    "bid_price_2",
+    "bid_price_3",
+    "bid_price_4",
+    "bid_price_5",
+    "ask_price_1",
+    "ask_price_2",
+    "ask_price_3",
+    "ask_price_4",
+    "ask_price_5",
+    "bid_volume_1",
+    "bid_volume_2",
+    "bid_volume_3",
+    "bid_volume_4",
+    "bid_volume_5",
+    "ask_volume_1",
+    "ask_volume_2",
+    "ask_volume_3",
+    "ask_volume_4",
+    "ask_volume_5",
+]
+
+# Row of tick ring buffer
+TICK_DTYPE = np.dtype([("datetime", np.int64)] + [(name, np.float64) for name in TICK_FIELDS])
+
+
+class BarView:
+    """
+    Lightweight bar object with the same attributes as BarData,
+    reused by BarColumns.iter_bars for every row.
+    """
+
+    __slots__ = [
+        "gateway_name",
+        "symbol",
+        "exchange",
+        "datetime",
+        "interval",
+        "volume",
+        "open_interest",
+        "open_price",
+        "high_price",
+        "low_price",
+        "close_price",
+        "vt_symbol",
+    ]
+
+    def __init__(self, symbol: str, exchange: Exchange, interval: Interval, gateway_name: str):
+        """"""
+        self.symbol = symbol
+        self.exchange = exchange
+        self.interval = interval
+        self.gateway_name = gateway_name
+        self.vt_symbol = f"{symbol}.{exchange.value}"
+
+        self.datetime = None
+        self.volume = 0
+        self.open_interest = 0
+        self.open_price = 0
+        self.high_price = 0
+        self.low_price = 0
+        self.close_price = 0
+
+    def __repr__(self):
+        """"""
+        return f"BarView({self.vt_symbol}, {self.datetime}, close_price={self.close_price})"
+
+
+class BarColumns:
+    """
+    Bar history of one symbol stored as numpy arrays.
+
+    Datetime is saved as int64 microseconds of the naive local time,
+    timezone (if any) is kept separately and restored on conversion.
+    The arrays can be published into a shared memory block and attached
+    from other processes without copying.
+    """
+
+    fields = BAR_FIELDS
+
+    def __init__(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        interval: Interval,
+        datetime: np.ndarray,
+        gateway_name: str = "DB",
+        tzinfo=None,
+        **columns: np.ndarray
+    ):
+        """"""
+        self.symbol = symbol
+        self.exchange = exchange
+        self.interval = interval
+        self.gateway_name = gateway_name
+        self.tzinfo = tzinfo
+
+        self.datetime = datetime
+        for name in self.fields:
+            setattr(self, name, columns[name])
+
+        self.shm = None
+
+    def __len__(self):
+        """"""
+        return len(self.datetime)
+
+    def __iter__(self) -> Iterator[BarData]:
+        """"""
+        return self.iter_bars()
+
+    def __getitem__(self, key):
+        """
+        Integer index returns BarData, slice returns columns sharing the same arrays.
+        """
+        if isinstance(key, slice):
+            return BarColumns(
+                symbol=self.symbol,
+                exchange=self.exchange,
+                interval=self.interval,
+                datetime=self.datetime[key],
+                gateway_name=self.gateway_name,
+                tzinfo=self.tzinfo,
+                **{name: getattr(self, name)[key] for name in self.fields}
+            )
+
+        index = range(len(self))[key]
+        return next(self[index:index + 1].iter_bars())
+
+    def iter_bars(self, reuse: bool = False, chunk_size: int = 4096) -> Iterator[BarData]:
+        """
+        Iterate rows as bar objects, converting arrays chunk by chunk.
+
+        reuse: yield one BarView updated in place for every row, which avoids
+               allocation but the object must not be kept after next row.
+        """
+        view = None
+        if reuse:
+            view = BarView(self.symbol, self.exchange, self.interval, self.gateway_name)
+
+        for start in range(0, len(self), chunk_size):
+            end = start + chunk_size
+            rows = zip(
+                self.get_datetimes(start, end),
+                *[getattr(self, name)[start:end].tolist() for name in self.fields]
+            )
+
+            if reuse:
+                for (
+                    view.datetime,
+                    view.volume,
+                    view.open_interest,
+                    view.open_price,
+                    view.high_price,
+                    view.low_price,
+                    view.close_price
+                ) in rows:
+                    yield view
+            else:
+                for dt, volume, open_interest, open_price, high_price, low_price, close_price in rows:
+                    yield BarData(
+                        symbol=self.symbol,
+                        exchange=self.exchange,
+                        datetime=dt,
+                        interval=self.interval,
+                        volume=volume,
+                        open_interest=open_interest,
+                        open_price=open_price,
+                        high_price=high_price,
+                        low_price=low_price,
+                        close_price=close_price,
+                        gateway_name=self.gateway_name
+                    )
+
+    @classmethod
+    def from_bars(cls, bars: Sequence[BarData]):
+        """
+        Convert list of BarData into columns.
+        """
+        if not bars:
+            raise ValueError("bar list is empty")
+
+        first = bars[0]
+        tzinfo = first.datetime.tzinfo
+        dts = [bar.datetime.replace(tzinfo=None) for bar in bars] if tzinfo else [bar.datetime for bar in bars]
+
+        columns = {
+            name: np.fromiter((getattr(bar, name) for bar in bars), dtype=np.float64, count=len(bars))
+            for name in cls.fields
+        }
+
+        return cls(
+            symbol=first.symbol,
+            exchange=first.exchange,
+            interval=first.interval,
+            datetime=np.array(dts, dtype="datetime64[us]").view(np.int64),
+            gateway_name=first.gateway_name,
+            tzinfo=tzinfo,
+            **columns
+        )
+
+    @classmethod
+    def from_dataframe(
+        cls,
+        df: DataFrame,
+        symbol: str,
+        exchange: Exchange,
+        interval: Interval,
+        gateway_name: str = "DB",
+        column_map: dict = None
+    ):
+        """
+        Convert DataFrame with datetime index (e.g. from feature store) into columns.
+
+        column_map: map from field name to DataFrame column name, short names
+                    like open/high/low/close are detected automatically.
+        """
+        short_names = {
+            "volume": "vol",
+            "open_interest": "oi",
+            "open_price": "open",
+            "high_price": "high",
+            "low_price": "low",
+            "close_price": "close",
+        }
+        column_map = column_map or {}
+
+        columns = {}
+        for name in cls.fields:
+            col = column_map.get(name, name if name in df.columns else short_names[name])
+            if col in df.columns:
+                columns[name] = df[col].to_numpy(dtype=np.float64)
+            else:
+                columns[name] = np.zeros(len(df))
+
+        index = df.index
+        tzinfo = getattr(index, "tz", None)
+        if tzinfo:
+            index = index.tz_localize(None)
+
+        return cls(
+            symbol=symbol,
+            exchange=exchange,
+            interval=interval,
+            datetime=index.to_numpy(dtype="datetime64[us]").view(np.int64),
+            gateway_name=gateway_name,
+            tzinfo=tzinfo,
+            **columns
+        )
+
+    @classmethod
+    def concat(cls, columns_list: Sequence["BarColumns"]):
+        """
+        Concatenate columns of the same symbol loaded in several chunks.
+        """
+        first = columns_list[0]
+        return cls(
+            symbol=first.symbol,
+            exchange=first.exchange,
+            interval=first.interval,
+            datetime=np.concatenate([c.datetime for c in columns_list]),
+            gateway_name=first.gateway_name,
+            tzinfo=first.tzinfo,
+            **{name: np.concatenate([getattr(c, name) for c in columns_list]) for name in cls.fields}
+        )
+
+    @classmethod
+    def from_ticks(
+        cls,
+        ticks: Sequence[TickData],
+        window: int = 1,
+        interval: Interval = Interval.MINUTE
+    ):
+        """
+        Aggregate list of TickData into bar columns of window * interval.
+        """
+        if not ticks:
+            raise ValueError("tick list is empty")
+
+        first = ticks[0]
+        tzinfo = first.datetime.tzinfo
+        dts = [tick.datetime.replace(tzinfo=None) for tick in ticks] if tzinfo else [tick.datetime for tick in ticks]
+        count = len(ticks)
+
+        arrays = aggregate_ticks(
+            np.array(dts, dtype="datetime64[us]").view(np.int64),
+            np.fromiter((tick.last_price for tick in ticks), dtype=np.float64, count=count),
+            np.fromiter((tick.volume for tick in ticks), dtype=np.float64, count=count),
+            np.fromiter((tick.open_interest for tick in ticks), dtype=np.float64, count=count),
+            window,
+            interval
+        )
+
+        return cls(
+            symbol=first.symbol,
+            exchange=first.exchange,
+            interval=interval,
+            gateway_name=first.gateway_name,
+            tzinfo=tzinfo,
+            **arrays
+        )
+
+    def resample(self, window: int = 1, interval: Interval = None):
+        """
+        Aggregate bars into bars of window * interval (e.g. 1 minute into 15 minute).
+        """
+        interval = Interval(interval) if interval else self.interval
+        arrays = aggregate_bars(
+            self.datetime,
+            self.open_price,
+            self.high_price,
+            self.low_price,
+            self.close_price,
+            self.volume,
+            self.open_interest,
+            window,
+            interval
+        )
+
+        return BarColumns(
+            symbol=self.symbol,
+            exchange=self.exchange,
+            interval=interval,
+            gateway_name=self.gateway_name,
+            tzinfo=self.tzinfo,
+            **arrays
+        )
+
+    def to_timestamp(self, dt: datetime) -> int:
+        """
+        Convert datetime into int64 timestamp used by datetime column.
+        """
+        if dt.tzinfo and self.tzinfo:
+            dt = dt.astimezone(self.tzinfo)
+        return int(np.datetime64(dt.replace(tzinfo=None), "us").astype(np.int64))
+
+    def between(self, start: datetime = None, end: datetime = None):
+        """
+        Slice of rows with datetime between start and end (inclusive),
+        sharing the same arrays.
+        """
+        begin = 0
+        stop = len(self)
+
+        if start:
+            begin = int(np.searchsorted(self.datetime, self.to_timestamp(start), "left"))
+        if end:
+            stop = int(np.searchsorted(self.datetime, self.to_timestamp(end), "right"))
+
+        return self[begin:stop]
+
+    def get_dates(self) -> List[date]:
+        """
+        Get sorted unique dates of rows.
+        """
+        days = np.unique(self.datetime // 86_400_000_000)
+        return [date.fromordinal(EPOCH_ORDINAL + int(day)) for day in days]
+
+    def get_datetimes(self, start: int = 0, end: int = None) -> List[datetime]:
+        """
+        Convert int64 timestamps back to datetime objects.
+        """
+        dts = self.datetime[start:end].view("datetime64[us]").astype(object)
+        if self.tzinfo:
+            return [dt.replace(tzinfo=self.tzinfo) for dt in dts]
+        return list(dts)
+
+    def to_bars(self) -> List[BarData]:
+        """
+        Convert columns back into list of BarData.
+        """
+        columns = [getattr(self, name).tolist() for name in self.fields]
+
+        bars = []
+        for dt, volume, open_interest, open_price, high_price, low_price, close_price in zip(
+            self.get_datetimes(), *columns
+        ):
+            bar = BarData(
+                symbol=self.symbol,
+                exchange=self.exchange,
+                datetime=dt,
+                interval=self.interval,
+                volume=volume,
+                open_interest=open_interest,
+                open_price=open_price,
+                high_price=high_price,
+                low_price=low_price,
+                close_price=close_price,
+                gateway_name=self.gateway_name
+            )
+            bars.append(bar)
+        return bars
+
+    def to_shared(self):
+        """
+        Copy columns into a new shared memory block.
+
+        Returns columns backed by the block, whose spec can be sent to
+        worker processes. Creator should call close and unlink when finished.
+        """
+        size = len(self)
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 1) * 8 * (len(self.fields) + 1))
+
+        columns = BarColumns._from_buffer(self.spec, shm, size)
+        columns.datetime[:] = self.datetime
+        for name in self.fields:
+            getattr(columns, name)[:] = getattr(self, name)
+        return columns
+
+    @property
+    def spec(self) -> dict:
+        """
+        Picklable description for attaching shared columns in other process.
+        """
+        return {
+            "name": self.shm.name if self.shm else None,
+            "size": len(self),
+            "symbol": self.symbol,
+            "exchange": self.exchange,
+            "interval": self.interval,
+            "gateway_name": self.gateway_name,
+            "tzinfo": self.tzinfo,
+        }
+
+    @classmethod
+    def attach(cls, spec: dict):
+        """
+        Attach to shared columns created by to_shared.
+        """
+        shm = shared_memory.SharedMemory(name=spec["name"])
+        columns = cls._from_buffer(spec, shm, spec["size"])
+        return columns
+
+    @staticmethod
+    def _from_buffer(meta: dict, shm: shared_memory.SharedMemory, size: int):
+        """
+        Create columns described by meta on top of shared memory.
+        """
+        arrays = {}
+        offset = 0
+        for name in ["datetime"] + BarColumns.fields:
+            dtype = np.int64 if name == "datetime" else np.float64
+            arrays[name] = np.ndarray((size,), dtype=dtype, buffer=shm.buf, offset=offset)
+            offset += size * 8
+
+        columns = BarColumns(
+            symbol=meta["symbol"],
+            exchange=meta["exchange"],
+            interval=meta["interval"],
+            gateway_name=meta["gateway_name"],
+            tzinfo=meta["tzinfo"],
+            **arrays
+        )
+        columns.shm = shm
+        return columns
+
+    def close(self):
+        """
+        Release arrays and detach from shared memory.
+        """
+        if not self.shm:
+            return
+
+        self.datetime = None
+        for name in self.fields:
+            setattr(self, name, None)
+
+        self.shm.close()
+
+    def unlink(self):
+        """
+        Destroy the shared memory block, only called by creator.
+        """
+        if self.shm:
+            self.shm.unlink()
+
+
+def get_bucket_starts(datetime: np.ndarray, window: int, interval: Interval) -> np.ndarray:
+    """
+    Get first row index of every bucket of sorted timestamps.
+
+    Same as BarGenerator, x minute buckets are aligned to the clock
+    (x must be able to divide 60), while x hour/day/week buckets count
+    every x distinct periods with data from the beginning.
+    """
+    if not len(datetime):
+        return np.zeros(0, dtype=np.int64)
+
+    interval = Interval(interval)
+    if interval == Interval.MINUTE:
+        keys = datetime // (MINUTE_US * window)
+    else:
+        if interval == Interval.HOUR:
+            keys = datetime // HOUR_US
+        elif interval == Interval.DAILY:
+            keys = datetime // DAY_US
+        else:
+            keys = (datetime // DAY_US + WEEK_SHIFT) // 7
+
+        if window > 1:
+            changed = np.empty(len(keys), dtype=np.int64)
+            changed[0] = 0
+            changed[1:] = keys[1:] != keys[:-1]
+            keys = np.cumsum(changed) // window
+
+    new_bucket = np.empty(len(keys), dtype=bool)
+    new_bucket[0] = True
+    new_bucket[1:] = keys[1:] != keys[:-1]
+    return np.flatnonzero(new_bucket)
+
+
+def floor_timestamp(datetime: np.ndarray, interval: Interval) -> np.ndarray:
+    """
+    Floor timestamps to the start of minute/hour/day/week.
+    """
+    interval = Interval(interval)
+    if interval == Interval.MINUTE:
+        return datetime - datetime % MINUTE_US
+    elif interval == Interval.HOUR:
+        return datetime - datetime % HOUR_US
+    elif interval == Interval.DAILY:
+        return datetime - datetime % DAY_US
+
+    days = datetime // DAY_US
+    return (days - (days + WEEK_SHIFT) % 7) * DAY_US
+
+
+def aggregate_bars(
+    datetime: np.ndarray,
+    open_price: np.ndarray,
+    high_price: np.ndarray,
+    low_price: np.ndarray,
+    close_price: np.ndarray,
+    volume: np.ndarray,
+    open_interest: np.ndarray,
+    window: int = 1,
+    interval: Interval = Interval.MINUTE
+) -> dict:
+    """
+    Group sorted bar arrays into bars of window * interval with numpy reduceat.
+
+    Returns dict of datetime and field arrays, the last bucket is kept even if
+    not completed. Datetime of each bar is the start of its first row period.
+    """
+    starts = get_bucket_starts(datetime, window, interval)
+    if not len(starts):
+        empty = np.zeros(0)
+        return dict(datetime=np.zeros(0, dtype=np.int64), **{name: empty for name in BarColumns.fields})
+
+    ends = np.empty(len(starts), dtype=np.int64)
+    ends[:-1] = starts[1:] - 1
+    ends[-1] = len(datetime) - 1
+
+    return {
+        "datetime": floor_timestamp(datetime[starts], interval),
+        "volume": np.add.reduceat(np.asarray(volume, dtype=np.float64), starts),
+        "open_interest": open_interest[ends],
+        "open_price": open_price[starts],
+        "high_price": np.maximum.reduceat(high_price, starts),
+        "low_price": np.minimum.reduceat(low_price, starts),
+        "close_price": close_price[ends],
+    }
+
+
+def aggregate_ticks(
+    datetime: np.ndarray,
+    last_price: np.ndarray,
+    volume: np.ndarray,
+    open_interest: np.ndarray,
+    window: int = 1,
+    interval: Interval = Interval.MINUTE,
+    last_volume: float = None
+) -> dict:
+    """
+    Group sorted tick arrays into bars of window * interval.
+
+    Same as BarGenerator.update_tick, ticks with 0 last price are filtered
+    and bar volume is the sum of positive change of tick accumulated volume.
+
+    last_volume: accumulated volume of the tick before the first one, when
+                 ticks are aggregated batch by batch.
+    """
+    valid = last_price != 0
+    if not valid.all():
+        datetime = datetime[valid]
+        last_price = last_price[valid]
+        volume = volume[valid]
+        open_interest = open_interest[valid]
+
+    volume_change = np.zeros(len(volume))
+    volume_change[1:] = np.maximum(np.diff(volume), 0)
+    if last_volume is not None and len(volume):
+        volume_change[0] = max(volume[0] - last_volume, 0)
+
+    return aggregate_bars(
+        datetime,
+        last_price,
+        last_price,
+        last_price,
+        last_price,
+        volume_change,
+        open_interest,
+        window,
+        interval
+    )
+
+
+class TickRing:
+    """
+    Preallocated ring buffer of ticks of one symbol, stored as structured array.
+
+    Ticks are written by one thread (event engine) with one copy per tick and
+    no object kept. Readers in other threads read rows after the sequence
+    number they have consumed, rows overwritten before read are reported lost.
+    """
+
+    get_values = attrgetter(*TICK_FIELDS)
+
+    def __init__(self, symbol: str, exchange: Exchange, size: int = 65536):
+        """"""
+        self.symbol: str = symbol
+        self.exchange: Exchange = exchange
+        self.vt_symbol: str = f"{symbol}.{exchange.value}"
+        self.size: int = size
+
+        self.buffer: np.ndarray = np.zeros(size, dtype=TICK_DTYPE)
+        self.seq: int = 0       # Sequence number of next tick
+
+        self.name: str = ""
+        self.gateway_name: str = ""
+        self.tzinfo = None
+
+    def update_tick(self, tick: TickData) -> int:
+        """
+        Write tick into buffer, return its sequence number.
+        """
+        dt = tick.datetime
+        if dt.tzinfo:
+            self.tzinfo = dt.tzinfo
+            dt = dt.replace(tzinfo=None)
+
+        seq = self.seq
+        self.buffer[seq % self.size] = ((dt - EPOCH) // MICROSECOND, *self.get_values(tick))
+
+        if seq == 0:
+            self.name = tick.name
+            self.gateway_name = tick.gateway_name
+
+        # Publish row after it is written
+        self.seq = seq + 1
+        return seq
+
+    def read(self, start: int, end: int = None) -> Tuple[np.ndarray, int, int]:
+        """
+        Copy rows of sequence number in [start, end).
+
+        Returns rows, sequence number after the last row and count of lost rows.
+        """
+        seq = self.seq
+        if end is None or end > seq:
+            end = seq
+
+        first = max(start, end - self.size)
+        count = end - first
+        if count <= 0:
+            return self.buffer[:0].copy(), max(start, end), max(first - start, 0)
+
+        ix = first % self.size
+        if ix + count <= self.size:
+            rows = self.buffer[ix:ix + count].copy()
+        else:
+            rows = np.concatenate([self.buffer[ix:], self.buffer[:ix + count - self.size]])
+
+        # Rows overwritten by writer during copy are dropped, including the
+        # row being written but not yet published by seq
+        overwritten = min(self.seq + 1 - self.size - first, count)
+        if overwritten > 0:
+            rows = rows[overwritten:]
+            first += overwritten
+
+        return rows, end, first - start
+
+    def to_ticks(self, rows: np.ndarray) -> List[TickData]:
+        """
+        Convert rows into TickData.
+        """
+        dts = rows["datetime"].view("datetime64[us]").astype(object)
+        columns = [rows[name].tolist() for name in TICK_FIELDS]
+
+        ticks = []
+        for dt, *values in zip(dts, *columns):
+            if self.tzinfo:
+                dt = dt.replace(tzinfo=self.tzinfo)
+
+            tick = TickData(
+                symbol=self.symbol,
+                exchange=self.exchange,
+                datetime=dt,
+                name=self.name,
+                gateway_name=self.gateway_name,
+                **dict(zip(TICK_FIELDS, values))
+            )
+            ticks.append(tick)
+        return ticks
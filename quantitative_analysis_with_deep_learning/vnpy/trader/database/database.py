@@ -3,9 +3,12 @@ from datetime import datetime
 from enum import Enum
 from typing import Optional, Sequence, TYPE_CHECKING
 
+from vnpy.trader.columnar import BAR_FIELDS, TICK_FIELDS  # noqa
+
 if TYPE_CHECKING:
     from vnpy.trader.constant import Interval, Exchange  # noqa
     from vnpy.trader.object import BarData, TickData  # noqa
+    from vnpy.trader.columnar import BarColumns  # noqa
 
 
 class Driver(Enum):
@@ -13,6 +16,7 @@ class Driver(Enum):
     MYSQL = "mysql"
     POSTGRESQL = "postgresql"
     MONGODB = "mongodb"
+    COLUMNAR = "columnar"
 
 
 class BaseDatabaseManager(ABC):
@@ -28,6 +32,25 @@ class BaseDatabaseManager(ABC):
     ) -> Sequence["BarData"]:
         pass
 
+    def load_bar_columns(
+        self,
+        symbol: str,
+        exchange: "Exchange",
+        interval: "Interval",
+        start: datetime,
+        end: datetime
+    ) -> Optional["BarColumns"]:
+        """
+        Load bar data into numpy columns, return None if no data found.
+        Drivers can override this to read arrays without creating BarData.
+        """
+        from vnpy.trader.columnar import BarColumns
+
+        bars = self.load_bar_data(symbol, exchange, interval, start, end)
+        if not bars:
+            return None
+        return BarColumns.from_bars(bars)
+
     @abstractmethod
     def load_tick_data(
         self,
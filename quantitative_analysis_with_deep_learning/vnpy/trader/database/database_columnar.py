@@ -0,0 +1,511 @@
+"""
+Local columnar database storing bar and tick data in memory-mapped numpy files.
+
+Layout of database folder:
+
+    bar/<vt_symbol>/<interval>/<YYYYMM>.npy
+    tick/<vt_symbol>/<YYYYMM>.npy
+    tick/<vt_symbol>/meta.json
+
+Every monthly partition file is a 2D float64 array, first row is the sorted
+int64 timestamp (microseconds of naive local time) stored by bit pattern,
+the other rows are data fields in order, so that each field is a contiguous
+column. Files are written into a temp file and then replaced atomically.
+
+Data later than the partition end is appended row by row into <YYYYMM>.log
+next to the partition file, which is merged into the columns once it grows
+larger than the partition, so that small appends (e.g. from data recorder)
+do not rewrite the whole month.
+"""
+
+import json
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+from threading import Lock
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.object import BarData, TickData
+from vnpy.trader.utility import get_folder_path
+from .database import BAR_FIELDS, TICK_FIELDS, BaseDatabaseManager, Driver
+
+
+def init(_: Driver, settings: dict):
+    path = get_folder_path(settings["database"])
+    return ColumnarManager(path)
+
+
+def to_timestamp(dt: datetime) -> int:
+    """
+    Convert datetime into int64 microseconds of naive local time.
+    """
+    return int(np.datetime64(dt.replace(tzinfo=None), "us").astype(np.int64))
+
+
+def to_timestamps(dts: Sequence[datetime]) -> np.ndarray:
+    """"""
+    dts = [dt.replace(tzinfo=None) for dt in dts]
+    return np.array(dts, dtype="datetime64[us]").view(np.int64)
+
+
+def get_partition_size(path: Path) -> int:
+    """
+    Get number of rows in partition file by reading its header only.
+    """
+    if not path.exists():
+        return 0
+
+    with open(path, "rb") as f:
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, _, _ = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, _, _ = np.lib.format.read_array_header_2_0(f)
+    return shape[1]
+
+
+def get_months(timestamps: np.ndarray) -> np.ndarray:
+    """
+    Get month number (months since 1970-01) of every timestamp.
+    """
+    return timestamps.view("datetime64[us]").astype("datetime64[M]").astype(np.int64)
+
+
+def get_partition_name(month: int) -> str:
+    """"""
+    return "%04d%02d" % (1970 + month // 12, month % 12 + 1)
+
+
+def get_partition_month(name: str) -> int:
+    """"""
+    return (int(name[:4]) - 1970) * 12 + int(name[4:6]) - 1
+
+
+def drop_duplicates(data: np.ndarray) -> np.ndarray:
+    """
+    Keep the last row (newly saved one) of duplicated datetime in sorted data.
+    """
+    timestamps = data[0].view(np.int64)
+    keep = np.ones(len(timestamps), dtype=bool)
+    keep[:-1] = timestamps[1:] != timestamps[:-1]
+
+    if keep.all():
+        return data
+    return data[:, keep]
+
+
+class ColumnarManager(BaseDatabaseManager):
+    """
+    Database manager of memory-mapped columnar files.
+    """
+
+    def __init__(self, path: Path):
+        """"""
+        self.path: Path = Path(path)
+        self.lock: Lock = Lock()
+
+        # Rows kept in append log before merged into partition columns
+        self.min_compact_size: int = 4096
+
+    def get_bar_folder(self, symbol: str, exchange: Exchange, interval: Interval) -> Path:
+        """"""
+        return self.path.joinpath("bar", f"{symbol}.{exchange.value}", interval.value)
+
+    def get_tick_folder(self, symbol: str, exchange: Exchange) -> Path:
+        """"""
+        return self.path.joinpath("tick", f"{symbol}.{exchange.value}")
+
+    def get_partitions(self, folder: Path, start: datetime = None, end: datetime = None) -> List[int]:
+        """
+        Get sorted months of partitions in folder overlapping with start and end.
+        """
+        if not folder.exists():
+            return []
+
+        start_month = get_months(np.array([to_timestamp(start)]))[0] if start else None
+        end_month = get_months(np.array([to_timestamp(end)]))[0] if end else None
+
+        months = set()
+        for name in os.listdir(folder):
+            if not name.endswith((".npy", ".log")):
+                continue
+
+            month = get_partition_month(name)
+            if start_month is not None and month < start_month:
+                continue
+            if end_month is not None and month > end_month:
+                continue
+
+            months.add(month)
+        return sorted(months)
+
+    def read_partition(
+        self,
+        folder: Path,
+        month: int,
+        width: int,
+        mmap: bool = True
+    ) -> np.ndarray:
+        """
+        Read partition columns with appended log rows.
+
+        Columns are memory-mapped unless mmap is False, which is required
+        before replacing the file, since a mapped file cannot be replaced
+        on Windows.
+        """
+        name = get_partition_name(month)
+        path = folder.joinpath(name + ".npy")
+        log_path = folder.joinpath(name + ".log")
+
+        if path.exists():
+            data = np.load(path, mmap_mode="r" if mmap else None)
+        else:
+            data = np.zeros((width, 0))
+
+        if not log_path.exists():
+            return data
+
+        rows = np.fromfile(log_path, dtype=np.float64)
+        rows = rows[:len(rows) // width * width].reshape(-1, width).T
+
+        # Skip log rows already merged if compaction was interrupted
+        if data.shape[1] and rows.shape[1]:
+            last = data[0, -1:].view(np.int64)[0]
+            rows = rows[:, rows[0].view(np.int64) > last]
+
+        if not rows.shape[1]:
+            return data
+        return np.concatenate([data, rows], axis=1)
+
+    def load_arrays(
+        self,
+        folder: Path,
+        fields: List[str],
+        start: datetime,
+        end: datetime
+    ) -> Dict[str, np.ndarray]:
+        """
+        Load rows with datetime between start and end (inclusive) into arrays.
+        """
+        begin = to_timestamp(start)
+        stop = to_timestamp(end)
+        width = len(fields) + 1
+
+        chunks = []
+        for month in self.get_partitions(folder, start, end):
+            data = self.read_partition(folder, month, width)
+            timestamps = data[0].view(np.int64)
+
+            left = np.searchsorted(timestamps, begin, "left")
+            right = np.searchsorted(timestamps, stop, "right")
+            if right > left:
+                chunks.append(np.array(data[:, left:right]))
+
+        if chunks:
+            data = np.concatenate(chunks, axis=1)
+        else:
+            data = np.zeros((width, 0))
+
+        arrays = {"datetime": data[0].view(np.int64)}
+        for i, name in enumerate(fields):
+            arrays[name] = data[i + 1]
+        return arrays
+
+    def save_arrays(self, folder: Path, timestamps: np.ndarray, columns: np.ndarray):
+        """
+        Merge rows into monthly partitions, rows of existing datetime are replaced.
+
+        columns: 2D array of data fields, one row per field.
+        """
+        if not len(timestamps):
+            return
+        folder.mkdir(parents=True, exist_ok=True)
+
+        order = np.argsort(timestamps, kind="stable")
+        data = np.empty((len(columns) + 1, len(timestamps)))
+        data[0] = timestamps[order].view(np.float64)
+        data[1:] = columns[:, order]
+        data = drop_duplicates(data)
+
+        months = get_months(data[0].view(np.int64))
+        bounds = np.flatnonzero(np.diff(months)) + 1
+        starts = np.concatenate([[0], bounds])
+        ends = np.concatenate([bounds, [len(months)]])
+
+        for start, end in zip(starts, ends):
+            self.write_partition(folder, int(months[start]), data[:, start:end])
+
+    def write_partition(self, folder: Path, month: int, new: np.ndarray):
+        """"""
+        name = get_partition_name(month)
+        path = folder.joinpath(name + ".npy")
+        log_path = folder.joinpath(name + ".log")
+
+        old = self.read_partition(folder, month, len(new), mmap=False)
+        size = old.shape[1]
+
+        if size and new[0, :1].view(np.int64)[0] > old[0, -1:].view(np.int64)[0]:
+            base_size = get_partition_size(path)
+            log_size = size - base_size + new.shape[1]
+
+            # Appending later data into log unless it grows larger than columns
+            if log_size <= max(base_size, self.min_compact_size):
+                with open(log_path, "ab") as f:
+                    f.write(np.ascontiguousarray(new.T).tobytes())
+                return
+
+            data = np.concatenate([old, new], axis=1)
+        elif size:
+            data = np.concatenate([old, new], axis=1)
+            order = np.argsort(data[0].view(np.int64), kind="stable")
+            data = drop_duplicates(data[:, order])
+        else:
+            data = new
+
+        temp_path = folder.joinpath(name + ".tmp")
+        with open(temp_path, "wb") as f:
+            np.save(f, np.ascontiguousarray(data))
+        os.replace(temp_path, path)
+
+        if log_path.exists():
+            log_path.unlink()
+
+    def load_bar_arrays(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        interval: Interval,
+        start: datetime,
+        end: datetime
+    ) -> Dict[str, np.ndarray]:
+        """
+        Load bar data as dict of datetime (int64 microseconds) and field arrays.
+        """
+        folder = self.get_bar_folder(symbol, exchange, interval)
+        return self.load_arrays(folder, BAR_FIELDS, start, end)
+
+    def load_tick_arrays(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        start: datetime,
+        end: datetime
+    ) -> Dict[str, np.ndarray]:
+        """
+        Load tick data as dict of datetime (int64 microseconds) and field arrays.
+        """
+        folder = self.get_tick_folder(symbol, exchange)
+        return self.load_arrays(folder, TICK_FIELDS, start, end)
+
+    def load_bar_columns(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        interval: Interval,
+        start: datetime,
+        end: datetime
+    ):
+        """"""
+        from vnpy.trader.columnar import BarColumns
+
+        arrays = self.load_bar_arrays(symbol, exchange, interval, start, end)
+        if not len(arrays["datetime"]):
+            return None
+
+        return BarColumns(
+            symbol=symbol,
+            exchange=exchange,
+            interval=interval,
+            gateway_name="DB",
+            **arrays
+        )
+
+    def load_bar_data(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        interval: Interval,
+        start: datetime,
+        end: datetime
+    ) -> Sequence[BarData]:
+        columns = self.load_bar_columns(symbol, exchange, interval, start, end)
+        if not columns:
+            return []
+        return columns.to_bars()
+
+    def load_tick_data(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        start: datetime,
+        end: datetime
+    ) -> Sequence[TickData]:
+        arrays = self.load_tick_arrays(symbol, exchange, start, end)
+        return self.to_ticks(symbol, exchange, arrays)
+
+    def to_ticks(self, symbol: str, exchange: Exchange, arrays: Dict[str, np.ndarray]) -> List[TickData]:
+        """"""
+        name = self.load_meta(symbol, exchange).get("name", "")
+        dts = arrays["datetime"].view("datetime64[us]").astype(object)
+        columns = [arrays[field].tolist() for field in TICK_FIELDS]
+
+        ticks = []
+        for dt, *values in zip(dts, *columns):
+            tick = TickData(
+                symbol=symbol,
+                exchange=exchange,
+                datetime=dt,
+                name=name,
+                gateway_name="DB",
+                **dict(zip(TICK_FIELDS, values))
+            )
+            ticks.append(tick)
+        return ticks
+
+    def load_meta(self, symbol: str, exchange: Exchange) -> dict:
+        """"""
+        path = self.get_tick_folder(symbol, exchange).joinpath("meta.json")
+        if not path.exists():
+            return {}
+
+        with open(path, mode="r", encoding="UTF-8") as f:
+            return json.load(f)
+
+    def save_bar_data(self, datas: Sequence[BarData]):
+        groups = {}
+        for bar in datas:
+            key = (bar.symbol, bar.exchange, bar.interval)
+            groups.setdefault(key, []).append(bar)
+
+        with self.lock:
+            for (symbol, exchange, interval), bars in groups.items():
+                columns = np.array(
+                    [[getattr(bar, name) for name in BAR_FIELDS] for bar in bars],
+                    dtype=np.float64
+                ).T
+                self.save_arrays(
+                    self.get_bar_folder(symbol, exchange, interval),
+                    to_timestamps([bar.datetime for bar in bars]),
+                    columns
+                )
+
+    def save_tick_data(self, datas: Sequence[TickData]):
+        groups = {}
+        for tick in datas:
+            key = (tick.symbol, tick.exchange)
+            groups.setdefault(key, []).append(tick)
+
+        with self.lock:
+            for (symbol, exchange), ticks in groups.items():
+                folder = self.get_tick_folder(symbol, exchange)
+                columns = np.array(
+                    [[getattr(tick, name) for name in TICK_FIELDS] for tick in ticks],
+                    dtype=np.float64
+                ).T
+                self.save_arrays(folder, to_timestamps([tick.datetime for tick in ticks]), columns)
+                self.save_meta(symbol, exchange, ticks[-1].name)
+
+    def save_meta(self, symbol: str, exchange: Exchange, name: str):
+        """"""
+        meta = {"name": name}
+        if meta != self.load_meta(symbol, exchange):
+            folder = self.get_tick_folder(symbol, exchange)
+            with open(folder.joinpath("meta.json"), mode="w+", encoding="UTF-8") as f:
+                json.dump(meta, f, ensure_ascii=False)
+
+    def save_bar_arrays(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        interval: Interval,
+        arrays: Dict[str, np.ndarray]
+    ):
+        """
+        Save bar arrays in the same format as load_bar_arrays without creating BarData.
+        """
+        columns = np.array([arrays[name] for name in BAR_FIELDS], dtype=np.float64)
+        with self.lock:
+            self.save_arrays(
+                self.get_bar_folder(symbol, exchange, interval),
+                np.asarray(arrays["datetime"], dtype=np.int64),
+                columns
+            )
+
+    def save_tick_arrays(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        arrays: Dict[str, np.ndarray],
+        name: str = None
+    ):
+        """
+        Save tick arrays in the same format as load_tick_arrays without creating TickData.
+        """
+        columns = np.array([arrays[field] for field in TICK_FIELDS], dtype=np.float64)
+        with self.lock:
+            self.save_arrays(
+                self.get_tick_folder(symbol, exchange),
+                np.asarray(arrays["datetime"], dtype=np.int64),
+                columns
+            )
+            if name is not None and len(columns[0]):
+                self.save_meta(symbol, exchange, name)
+
+    def get_newest_data(self, folder: Path, width: int) -> Optional[np.ndarray]:
+        """"""
+        months = self.get_partitions(folder)
+        if not months:
+            return None
+
+        data = self.read_partition(folder, months[-1], width)
+        if not data.shape[1]:
+            return None
+        return np.array(data[:, -1])
+
+    def get_newest_bar_data(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        interval: Interval
+    ) -> Optional[BarData]:
+        row = self.get_newest_data(self.get_bar_folder(symbol, exchange, interval), len(BAR_FIELDS) + 1)
+        if row is None:
+            return None
+
+        return BarData(
+            symbol=symbol,
+            exchange=exchange,
+            datetime=row[:1].view(np.int64).view("datetime64[us]").astype(object)[0],
+            interval=interval,
+            gateway_name="DB",
+            **dict(zip(BAR_FIELDS, row[1:].tolist()))
+        )
+
+    def get_newest_tick_data(
+        self,
+        symbol: str,
+        exchange: Exchange
+    ) -> Optional[TickData]:
+        row = self.get_newest_data(self.get_tick_folder(symbol, exchange), len(TICK_FIELDS) + 1)
+        if row is None:
+            return None
+
+        arrays = {"datetime": row[:1].view(np.int64)}
+        for i, name in enumerate(TICK_FIELDS):
+            arrays[name] = row[i + 1:i + 2]
+        return self.to_ticks(symbol, exchange, arrays)[0]
+
+    def clean(self, symbol: str):
+        with self.lock:
+            for kind in ["bar", "tick"]:
+                folder = self.path.joinpath(kind)
+                if not folder.exists():
+                    continue
+
+                for name in os.listdir(folder):
+                    if name.rsplit(".", 1)[0] == symbol:
+                        shutil.rmtree(folder.joinpath(name))
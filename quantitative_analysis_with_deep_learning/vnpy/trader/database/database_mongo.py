@@ -3,6 +3,7 @@ from enum import Enum
 from typing import Optional, Sequence
 
 from mongoengine import DateTimeField, Document, FloatField, StringField, connect
+from pymongo import UpdateOne
 
 from vnpy.trader.constant import Exchange, Interval
 from vnpy.trader.object import BarData, TickData
@@ -262,6 +263,11 @@ class DbTickData(Document):
 
 class MongoManager(BaseDatabaseManager):
 
+    def __init__(self):
+        """"""
+        # Records written by one bulk_write request when saving data
+        self.batch_size = 1000
+
     def load_bar_data(
         self,
         symbol: str,
@@ -293,33 +299,47 @@ class MongoManager(BaseDatabaseManager):
         return data
 
     @staticmethod
-    def to_update_param(d):
-        return {
-            "set__" + k: v.value if isinstance(v, Enum) else v
+    def to_document(d) -> dict:
+        """
+        Convert data object into raw document fields for pymongo.
+        """
+        document = {
+            k: v.value if isinstance(v, Enum) else v
             for k, v in d.__dict__.items()
         }
+        document.pop("gateway_name")
+        document.pop("vt_symbol")
+        return document
 
-    def save_bar_data(self, datas: Sequence[BarData]):
+    def bulk_upsert(self, document_class: type, datas: Sequence, keys: Sequence[str]):
+        """
+        Upsert records with unordered bulk_write of UpdateOne in batches.
+        """
+        collection = document_class._get_collection()
+
+        # Keep the last record of the same key, unordered writes may be applied in any order
+        documents = {}
         for d in datas:
-            updates = self.to_update_param(d)
-            updates.pop("set__gateway_name")
-            updates.pop("set__vt_symbol")
-            (
-                DbBarData.objects(
-                    symbol=d.symbol, interval=d.interval.value, datetime=d.datetime
-                ).update_one(upsert=True, **updates)
-            )
+            document = self.to_document(d)
+            documents[tuple(document[k] for k in keys)] = document
+
+        requests = []
+        for document in documents.values():
+            key = {k: document[k] for k in keys}
+            requests.append(UpdateOne(key, {"$set": document}, upsert=True))
+
+            if len(requests) >= self.batch_size:
+                collection.bulk_write(requests, ordered=False)
+                requests = []
+
+        if requests:
+            collection.bulk_write(requests, ordered=False)
+
+    def save_bar_data(self, datas: Sequence[BarData]):
+        self.bulk_upsert(DbBarData, datas, ("symbol", "exchange", "interval", "datetime"))
 
     def save_tick_data(self, datas: Sequence[TickData]):
-        for d in datas:
-            updates = self.to_update_param(d)
-            updates.pop("set__gateway_name")
-            updates.pop("set__vt_symbol")
-            (
-                DbTickData.objects(
-                    symbol=d.symbol, exchange=d.exchange.value, datetime=d.datetime
-                ).update_one(upsert=True, **updates)
-            )
+        self.bulk_upsert(DbTickData, datas, ("symbol", "exchange", "datetime"))
 
     def get_newest_bar_data(
         self, symbol: str, exchange: "Exchange", interval: "Interval"
@@ -1,7 +1,8 @@
 """"""
 from datetime import datetime
-from typing import List, Optional, Sequence, Type
+from typing import Dict, List, Optional, Sequence, Type
 
+import numpy as np
 from peewee import (
     AutoField,
     CharField,
@@ -18,7 +19,7 @@ from peewee import (
 from vnpy.trader.constant import Exchange, Interval
 from vnpy.trader.object import BarData, TickData
 from vnpy.trader.utility import get_file_path
-from .database import BaseDatabaseManager, Driver
+from .database import BAR_FIELDS, TICK_FIELDS, BaseDatabaseManager, Driver
 
 
 def init(driver: Driver, settings: dict):
@@ -55,12 +56,73 @@ def init_postgresql(settings: dict):
     return db
 
 
+def has_offset(dt: str) -> bool:
+    """
+    Check whether ISO datetime string has timezone offset.
+    """
+    tail = dt[19:]
+    return "+" in tail or "-" in tail or tail.endswith("Z")
+
+
+def to_timestamps(dts: Sequence) -> np.ndarray:
+    """
+    Convert raw datetime values from cursor (datetime objects, or ISO
+    strings for sqlite) into int64 microseconds of naive local time.
+    """
+    if isinstance(dts[0], str):
+        # Offset ("+08:00", "-05:00" or "Z") follows "YYYY-MM-DD HH:MM:SS",
+        # numpy would convert it into UTC, so it is dropped by fromisoformat
+        if not any(has_offset(dt) for dt in dts):
+            return np.array(dts, dtype="datetime64[us]").view(np.int64)
+        dts = [datetime.fromisoformat(dt.replace("Z", "+00:00")) for dt in dts]
+
+    dts = [dt.replace(tzinfo=None) for dt in dts]
+    return np.array(dts, dtype="datetime64[us]").view(np.int64)
+
+
 class ModelBase(Model):
 
     def to_dict(self):
         return self.__data__
 
 
+def upsert_all(
+    db: Database,
+    driver: Driver,
+    model: Type[Model],
+    dicts: List[dict],
+    conflict_target: tuple,
+    batch_size: int,
+):
+    """
+    Insert rows with multi-row statements of batch_size rows in one transaction,
+    rows with existing unique key are updated.
+    """
+    with db.atomic():
+        if driver is Driver.POSTGRESQL:
+            # One statement cannot update the same row twice, keep the last one
+            keys = [field.name for field in conflict_target]
+            dicts = list({tuple(d[k] for k in keys): d for d in dicts}.values())
+
+            # INSERT ... ON CONFLICT (...) DO UPDATE SET field = EXCLUDED.field
+            preserve = [
+                field for field in model._meta.sorted_fields
+                if field.name != "id" and field.name not in keys
+            ]
+            for c in chunked(dicts, batch_size):
+                model.insert_many(c).on_conflict(
+                    conflict_target=conflict_target,
+                    preserve=preserve,
+                ).execute()
+        elif driver is Driver.SQLITE:
+            # Small statements for variable number limit of old sqlite versions
+            for c in chunked(dicts, 50):
+                model.insert_many(c).on_conflict_replace().execute()
+        else:
+            for c in chunked(dicts, batch_size):
+                model.insert_many(c).on_conflict_replace().execute()
+
+
 def init_models(db: Database, driver: Driver):
     class DbBarData(ModelBase):
         """
@@ -126,27 +188,18 @@ def init_models(db: Database, driver: Driver):
             return bar
 
         @staticmethod
-        def save_all(objs: List["DbBarData"]):
+        def save_all(objs: List["DbBarData"], batch_size: int = 500):
             """
             save a list of objects, update if exists.
             """
             dicts = [i.to_dict() for i in objs]
-            with db.atomic():
-                if driver is Driver.POSTGRESQL:
-                    for bar in dicts:
-                        DbBarData.insert(bar).on_conflict(
-                            update=bar,
-                            conflict_target=(
-                                DbBarData.symbol,
-                                DbBarData.exchange,
-                                DbBarData.interval,
-                                DbBarData.datetime,
-                            ),
-                        ).execute()
-                else:
-                    for c in chunked(dicts, 50):
-                        DbBarData.insert_many(
-                            c).on_conflict_replace().execute()
+            conflict_target = (
+                DbBarData.symbol,
+                DbBarData.exchange,
+                DbBarData.interval,
+                DbBarData.datetime,
+            )
+            upsert_all(db, driver, DbBarData, dicts, conflict_target, batch_size)
 
     class DbTickData(ModelBase):
         """
@@ -302,22 +355,14 @@ def init_models(db: Database, driver: Driver):
             return tick
 
         @staticmethod
-        def save_all(objs: List["DbTickData"]):
+        def save_all(objs: List["DbTickData"], batch_size: int = 500):
             dicts = [i.to_dict() for i in objs]
-            with db.atomic():
-                if driver is Driver.POSTGRESQL:
-                    for tick in dicts:
-                        DbTickData.insert(tick).on_conflict(
-                            update=tick,
-                            conflict_target=(
-                                DbTickData.symbol,
-                                DbTickData.exchange,
-                                DbTickData.datetime,
-                            ),
-                        ).execute()
-                else:
-                    for c in chunked(dicts, 50):
-                        DbTickData.insert_many(c).on_conflict_replace().execute()
+            conflict_target = (
+                DbTickData.symbol,
+                DbTickData.exchange,
+                DbTickData.datetime,
+            )
+            upsert_all(db, driver, DbTickData, dicts, conflict_target, batch_size)
 
     db.connect()
     db.create_tables([DbBarData, DbTickData])
@@ -330,16 +375,25 @@ class SqlManager(BaseDatabaseManager):
         self.class_bar = class_bar
         self.class_tick = class_tick
 
-    def load_bar_data(
+        # Rows fetched from cursor each time when loading data
+        self.chunk_size = 100_000
+        # Rows written by one multi-row statement when saving data
+        self.batch_size = 500
+
+    def select_bar(
         self,
+        fields: List[str],
         symbol: str,
         exchange: Exchange,
         interval: Interval,
         start: datetime,
         end: datetime,
-    ) -> Sequence[BarData]:
-        s = (
-            self.class_bar.select()
+    ):
+        """
+        Query of bar columns ordered by datetime, covered by the composite index.
+        """
+        return (
+            self.class_bar.select(*[getattr(self.class_bar, name) for name in fields])
                 .where(
                 (self.class_bar.symbol == symbol)
                 & (self.class_bar.exchange == exchange.value)
@@ -349,14 +403,18 @@ class SqlManager(BaseDatabaseManager):
             )
             .order_by(self.class_bar.datetime)
         )
-        data = [db_bar.to_bar() for db_bar in s]
-        return data
 
-    def load_tick_data(
-        self, symbol: str, exchange: Exchange, start: datetime, end: datetime
-    ) -> Sequence[TickData]:
-        s = (
-            self.class_tick.select()
+    def select_tick(
+        self,
+        fields: List[str],
+        symbol: str,
+        exchange: Exchange,
+        start: datetime,
+        end: datetime,
+    ):
+        """"""
+        return (
+            self.class_tick.select(*[getattr(self.class_tick, name) for name in fields])
                 .where(
                 (self.class_tick.symbol == symbol)
                 & (self.class_tick.exchange == exchange.value)
@@ -366,16 +424,128 @@ class SqlManager(BaseDatabaseManager):
             .order_by(self.class_tick.datetime)
         )
 
-        data = [db_tick.to_tick() for db_tick in s]
+    def fetch_arrays(self, query, fields: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Fetch raw rows of (datetime, *fields) from DB-API cursor chunk by chunk
+        and convert them into numpy arrays without creating model objects.
+        """
+        cursor = query.model._meta.database.execute(query)
+
+        timestamps = []
+        chunks = []
+        while True:
+            rows = cursor.fetchmany(self.chunk_size)
+            if not rows:
+                break
+
+            dts, *values = zip(*rows)
+            timestamps.append(to_timestamps(dts))
+            chunks.append(np.array(values, dtype=np.float64))
+        cursor.close()
+
+        if not chunks:
+            arrays = {"datetime": np.zeros(0, dtype=np.int64)}
+            arrays.update({name: np.zeros(0) for name in fields})
+            return arrays
+
+        data = np.concatenate(chunks, axis=1)
+        arrays = {"datetime": np.concatenate(timestamps)}
+        for i, name in enumerate(fields):
+            arrays[name] = data[i]
+
+        # Nullable columns (e.g. tick depth) are loaded as 0
+        data[np.isnan(data)] = 0
+        return arrays
+
+    def load_bar_arrays(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        interval: Interval,
+        start: datetime,
+        end: datetime,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Load bar data as dict of datetime (int64 microseconds) and field arrays.
+        """
+        query = self.select_bar(["datetime"] + BAR_FIELDS, symbol, exchange, interval, start, end)
+        return self.fetch_arrays(query, BAR_FIELDS)
+
+    def load_tick_arrays(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        start: datetime,
+        end: datetime,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Load tick data as dict of datetime (int64 microseconds) and field arrays.
+        """
+        query = self.select_tick(["datetime"] + TICK_FIELDS, symbol, exchange, start, end)
+        return self.fetch_arrays(query, TICK_FIELDS)
+
+    def load_bar_columns(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        interval: Interval,
+        start: datetime,
+        end: datetime,
+    ):
+        """"""
+        from vnpy.trader.columnar import BarColumns
+
+        arrays = self.load_bar_arrays(symbol, exchange, interval, start, end)
+        if not len(arrays["datetime"]):
+            return None
+
+        return BarColumns(
+            symbol=symbol,
+            exchange=exchange,
+            interval=interval,
+            gateway_name="DB",
+            **arrays
+        )
+
+    def load_bar_data(
+        self,
+        symbol: str,
+        exchange: Exchange,
+        interval: Interval,
+        start: datetime,
+        end: datetime,
+    ) -> Sequence[BarData]:
+        columns = self.load_bar_columns(symbol, exchange, interval, start, end)
+        if not columns:
+            return []
+        return columns.to_bars()
+
+    def load_tick_data(
+        self, symbol: str, exchange: Exchange, start: datetime, end: datetime
+    ) -> Sequence[TickData]:
+        fields = ["datetime", "name"] + TICK_FIELDS
+        query = self.select_tick(fields, symbol, exchange, start, end).tuples()
+
+        data = []
+        for row in query.iterator():
+            # Nullable depth columns are kept as default 0
+            values = {k: v for k, v in zip(fields, row) if v is not None}
+            tick = TickData(
+                symbol=symbol,
+                exchange=exchange,
+                gateway_name="DB",
+                **values
+            )
+            data.append(tick)
         return data
 
     def save_bar_data(self, datas: Sequence[BarData]):
         ds = [self.class_bar.from_bar(i) for i in datas]
-        self.class_bar.save_all(ds)
+        self.class_bar.save_all(ds, self.batch_size)
 
     def save_tick_data(self, datas: Sequence[TickData]):
         ds = [self.class_tick.from_tick(i) for i in datas]
-        self.class_tick.save_all(ds)
+        self.class_tick.save_all(ds, self.batch_size)
 
     def get_newest_bar_data(
         self, symbol: str, exchange: "Exchange", interval: "Interval"
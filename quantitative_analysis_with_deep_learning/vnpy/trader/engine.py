@@ -40,7 +40,8 @@ from .object import (
     Exchange
 )
 from .setting import SETTINGS
-from .utility import get_folder_path, TRADER_DIR
+from .utility import get_folder_path, extract_vt_symbol, TRADER_DIR
+from .columnar import TickRing
 
 
 class MainEngine:
@@ -346,12 +347,22 @@ class OmsEngine(BaseEngine):
 
         self.active_orders: Dict[str, OrderData] = {}
 
+        # Tick history shared with consumers like data recorder, only kept
+        # for symbols requested by at least one reader
+        self.tick_rings: Dict[str, TickRing] = {}
+        self.tick_ring_readers: Dict[str, int] = {}
+        self.tick_ring_size: int = 65536
+
         self.add_function()
         self.register_event()
 
     def add_function(self) -> None:
         """Add query function to main engine."""
         self.main_engine.get_tick = self.get_tick
+        self.main_engine.get_tick_ring = self.get_tick_ring
+        self.main_engine.request_tick_ring = self.request_tick_ring
+        self.main_engine.release_tick_ring = self.release_tick_ring
+        self.main_engine.update_tick_ring = self.update_tick_ring
         self.main_engine.get_order = self.get_order
         self.main_engine.get_trade = self.get_trade
         self.main_engine.get_position = self.get_position
@@ -378,6 +389,41 @@ class OmsEngine(BaseEngine):
         """"""
         tick = event.data
         self.ticks[tick.vt_symbol] = tick
+        self.update_tick_ring(tick)
+
+    def update_tick_ring(self, tick: TickData) -> Optional[int]:
+        """
+        Write tick into ring buffer of its symbol if requested by any reader,
+        return sequence number.
+        """
+        ring = self.tick_rings.get(tick.vt_symbol, None)
+        if not ring:
+            return None
+        return ring.update_tick(tick)
+
+    def request_tick_ring(self, vt_symbol: str) -> TickRing:
+        """
+        Register a reader of tick ring, create the ring if not exists.
+        """
+        ring = self.tick_rings.get(vt_symbol, None)
+        if not ring:
+            symbol, exchange = extract_vt_symbol(vt_symbol)
+            ring = TickRing(symbol, exchange, self.tick_ring_size)
+            self.tick_rings[vt_symbol] = ring
+
+        self.tick_ring_readers[vt_symbol] = self.tick_ring_readers.get(vt_symbol, 0) + 1
+        return ring
+
+    def release_tick_ring(self, vt_symbol: str) -> None:
+        """
+        Unregister a reader of tick ring, remove the ring after the last one.
+        """
+        count = self.tick_ring_readers.get(vt_symbol, 0) - 1
+        if count > 0:
+            self.tick_ring_readers[vt_symbol] = count
+        else:
+            self.tick_ring_readers.pop(vt_symbol, None)
+            self.tick_rings.pop(vt_symbol, None)
 
     def process_order_event(self, event: Event) -> None:
         """"""
@@ -417,6 +463,12 @@ class OmsEngine(BaseEngine):
         """
         return self.ticks.get(vt_symbol, None)
 
+    def get_tick_ring(self, vt_symbol: str) -> Optional[TickRing]:
+        """
+        Get tick ring buffer by vt_symbol.
+        """
+        return self.tick_rings.get(vt_symbol, None)
+
     def get_order(self, vt_orderid: str) -> Optional[OrderData]:
         """
         Get latest order data by vt_orderid.
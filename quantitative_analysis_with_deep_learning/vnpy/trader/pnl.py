@@ -0,0 +1,249 @@
+"""
+Vectorized daily mark-to-market pnl and statistics of backtesting results.
+"""
+
+from datetime import date
+from typing import Iterable, List
+
+import numpy as np
+from pandas import DataFrame
+
+from .constant import Direction
+from .object import TradeData
+
+
+DAILY_FIELDS = [
+    "close_price",
+    "pre_close",
+    "trade_count",
+    "start_pos",
+    "end_pos",
+    "turnover",
+    "commission",
+    "slippage",
+    "trading_pnl",
+    "holding_pnl",
+    "total_pnl",
+    "net_pnl",
+]
+
+
+def trades_to_arrays(trades: Iterable[TradeData]):
+    """
+    Convert trades into arrays of date ordinal, price, volume and position change.
+    """
+    trades = list(trades)
+    count = len(trades)
+
+    ordinals = np.fromiter((t.datetime.toordinal() for t in trades), dtype=np.int64, count=count)
+    prices = np.fromiter((t.price for t in trades), dtype=np.float64, count=count)
+    volumes = np.fromiter((t.volume for t in trades), dtype=np.float64, count=count)
+    signs = np.fromiter(
+        (1 if t.direction == Direction.LONG else -1 for t in trades), dtype=np.float64, count=count
+    )
+    return ordinals, prices, volumes, volumes * signs
+
+
+def calculate_daily_result(
+    dates: List[date],
+    close_prices: np.ndarray,
+    trade_ordinals: np.ndarray,
+    trade_prices: np.ndarray,
+    trade_volumes: np.ndarray,
+    pos_changes: np.ndarray,
+    size: float,
+    rate: float,
+    slippage: float,
+    inverse: bool = False,
+    trade_values: np.ndarray = None
+) -> DataFrame:
+    """
+    Calculate daily pnl with numpy group-by-day operations.
+
+    Same result as calculating DailyResult.calculate_pnl day by day,
+    trades must happen on one of the dates.
+
+    trade_values: value per unit used for turnover (e.g. spread value),
+                  trade price is used if not provided.
+    """
+    if trade_values is None:
+        trade_values = trade_prices
+
+    close_prices = np.asarray(close_prices, dtype=np.float64)
+    days = len(dates)
+
+    # Map each trade to its day index
+    day_ordinals = np.array([d.toordinal() for d in dates], dtype=np.int64)
+    ix = np.searchsorted(day_ordinals, trade_ordinals)
+    trade_close = close_prices[ix]
+
+    # If no pre_close provided on the first day,
+    # use value 1 to avoid zero division error
+    pre_close = np.empty(days)
+    pre_close[0] = 0
+    pre_close[1:] = close_prices[:-1]
+    pre_close[pre_close == 0] = 1
+
+    day_pos_change = np.bincount(ix, weights=pos_changes, minlength=days)
+    end_pos = np.cumsum(day_pos_change)
+    start_pos = end_pos - day_pos_change
+
+    if not inverse:     # For normal contract
+        holding_pnl = start_pos * (close_prices - pre_close) * size
+        turnover = trade_volumes * size * trade_values
+        trading_pnl = pos_changes * (trade_close - trade_prices) * size
+        trade_slippage = trade_volumes * size * slippage
+    else:               # For crypto currency inverse contract
+        holding_pnl = start_pos * (1 / pre_close - 1 / close_prices) * size
+        turnover = trade_volumes * size / trade_values
+        trading_pnl = pos_changes * (1 / trade_prices - 1 / trade_close) * size
+        trade_slippage = trade_volumes * size * slippage / (trade_prices ** 2)
+
+    daily_turnover = np.bincount(ix, weights=turnover, minlength=days)
+    daily_trading_pnl = np.bincount(ix, weights=trading_pnl, minlength=days)
+    daily_slippage = np.bincount(ix, weights=trade_slippage, minlength=days)
+    daily_commission = daily_turnover * rate
+
+    # Net pnl takes account of commission and slippage cost
+    total_pnl = daily_trading_pnl + holding_pnl
+    net_pnl = total_pnl - daily_commission - daily_slippage
+
+    df = DataFrame({
+        "date": dates,
+        "close_price": close_prices,
+        "pre_close": pre_close,
+        "trade_count": np.bincount(ix, minlength=days),
+        "start_pos": start_pos,
+        "end_pos": end_pos,
+        "turnover": daily_turnover,
+        "commission": daily_commission,
+        "slippage": daily_slippage,
+        "trading_pnl": daily_trading_pnl,
+        "holding_pnl": holding_pnl,
+        "total_pnl": total_pnl,
+        "net_pnl": net_pnl,
+    })
+    return df.set_index("date")
+
+
+def calculate_statistics(df: DataFrame, capital: float, annual_days: int = 240) -> dict:
+    """
+    Calculate balance, drawdown columns of daily result and statistics value.
+    Statistics are all 0 if df is None.
+    """
+    if df is None:
+        # Set all statistics to 0 if no trade.
+        statistics = {
+            "start_date": "",
+            "end_date": "",
+            "total_days": 0,
+            "profit_days": 0,
+            "loss_days": 0,
+            "capital": capital,
+            "end_balance": 0,
+            "max_drawdown": 0,
+            "max_ddpercent": 0,
+            "max_drawdown_duration": 0,
+            "total_net_pnl": 0,
+            "daily_net_pnl": 0,
+            "total_commission": 0,
+            "daily_commission": 0,
+            "total_slippage": 0,
+            "daily_slippage": 0,
+            "total_turnover": 0,
+            "daily_turnover": 0,
+            "total_trade_count": 0,
+            "daily_trade_count": 0,
+            "total_return": 0,
+            "annual_return": 0,
+            "daily_return": 0,
+            "return_std": 0,
+            "sharpe_ratio": 0,
+            "return_drawdown_ratio": 0,
+        }
+        return statistics
+
+    net_pnl = df["net_pnl"].to_numpy(dtype=np.float64)
+
+    # Calculate balance related time series data
+    balance = np.cumsum(net_pnl) + capital
+    returns = np.zeros(len(balance))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns[1:] = np.log(balance[1:] / balance[:-1])
+    returns[np.isnan(returns)] = 0
+    highlevel = np.maximum.accumulate(balance)
+    drawdown = balance - highlevel
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ddpercent = drawdown / highlevel * 100
+
+    df["balance"] = balance
+    df["return"] = returns
+    df["highlevel"] = highlevel
+    df["drawdown"] = drawdown
+    df["ddpercent"] = ddpercent
+
+    # Calculate statistics value
+    total_days = len(df)
+    end_balance = balance[-1]
+    max_drawdown_end = int(np.argmin(drawdown))
+    max_drawdown_start = int(np.argmax(balance[:max_drawdown_end + 1]))
+
+    end_date = df.index[max_drawdown_end]
+    if isinstance(end_date, date):
+        max_drawdown_duration = (end_date - df.index[max_drawdown_start]).days
+    else:
+        max_drawdown_duration = 0
+
+    total_net_pnl = net_pnl.sum()
+    total_commission = df["commission"].sum()
+    total_slippage = df["slippage"].sum()
+    total_turnover = df["turnover"].sum()
+    total_trade_count = df["trade_count"].sum()
+
+    total_return = (end_balance / capital - 1) * 100
+    daily_return = returns.mean() * 100
+    return_std = returns.std(ddof=1) * 100 if total_days > 1 else np.nan
+
+    if return_std:
+        sharpe_ratio = daily_return / return_std * np.sqrt(annual_days)
+    else:
+        sharpe_ratio = 0
+
+    max_ddpercent = ddpercent.min()
+
+    statistics = {
+        "start_date": df.index[0],
+        "end_date": df.index[-1],
+        "total_days": total_days,
+        "profit_days": int((net_pnl > 0).sum()),
+        "loss_days": int((net_pnl < 0).sum()),
+        "capital": capital,
+        "end_balance": end_balance,
+        "max_drawdown": drawdown.min(),
+        "max_ddpercent": max_ddpercent,
+        "max_drawdown_duration": max_drawdown_duration,
+        "total_net_pnl": total_net_pnl,
+        "daily_net_pnl": total_net_pnl / total_days,
+        "total_commission": total_commission,
+        "daily_commission": total_commission / total_days,
+        "total_slippage": total_slippage,
+        "daily_slippage": total_slippage / total_days,
+        "total_turnover": total_turnover,
+        "daily_turnover": total_turnover / total_days,
+        "total_trade_count": total_trade_count,
+        "daily_trade_count": total_trade_count / total_days,
+        "total_return": total_return,
+        "annual_return": total_return / total_days * annual_days,
+        "daily_return": daily_return,
+        "return_std": return_std,
+        "sharpe_ratio": sharpe_ratio,
+        "return_drawdown_ratio": -total_return / max_ddpercent if max_ddpercent else np.inf,
+    }
+
+    # Filter potential error infinite value
+    for key, value in statistics.items():
+        if value in (np.inf, -np.inf):
+            value = 0
+        statistics[key] = np.nan_to_num(value)
+
+    return statistics
@@ -27,7 +27,7 @@ SETTINGS: Dict[str, Any] = {
     "rqdata.password": "",
 
     "database.driver": "sqlite",  # see database.Driver
-    "database.database": "database.db",  # for sqlite, use this as filepath
+    "database.database": "database.db",  # for sqlite, use this as filepath, for columnar as folder name
     "database.host": "localhost",
     "database.port": 3306,
     "database.user": "root",
@@ -4,9 +4,11 @@ General utility functions.
 
 import json
 import logging
+import random
 import sys
+from datetime import date, datetime
 from pathlib import Path
-from typing import Callable, Dict, Tuple, Union
+from typing import Callable, Dict, List, Tuple, Union
 from decimal import Decimal
 from math import floor, ceil
 
@@ -147,6 +149,74 @@ def ceil_to(value: float, target: float) -> float:
     return result
 
 
+class SimulationClock:
+    """
+    For:
+    1. tracking simulated trading date in backtesting engines and gym envs
+    2. generating deterministic and monotonic integer id for simulated orders/trades
+    3. providing a seeded random generator, so that simulation can be replayed
+
+    Notice:
+    1. id is composed as YYYYMMDD * 10^10 + seed * 10^8 + sequence of the day
+    2. seed must be in range [0, 100)
+    3. reset the clock before replaying simulated time from an earlier date
+    """
+
+    DATE_BASE: int = 10 ** 10
+    SEED_BASE: int = 10 ** 8
+
+    def __init__(self, seed: int = 0):
+        """Constructor"""
+        self.seed: int = 0
+        self.random: random.Random = random.Random()
+
+        self.datetime: Union[date, datetime] = None
+        self.date_key: int = 0
+        self.count: int = 0
+        self.base: int = 0
+
+        self.reset(seed=seed)
+
+    def reset(self, dt: Union[date, datetime] = None, seed: int = None) -> None:
+        """
+        Restart id sequence and random generator, optionally from a new date.
+        """
+        if seed is not None:
+            if not 0 <= seed < self.DATE_BASE // self.SEED_BASE:
+                raise ValueError(f"seed must be in range [0, 100), got {seed}")
+            self.seed = seed
+
+        self.random.seed(self.seed)
+
+        self.datetime = None
+        self.date_key = 0
+        self.count = 0
+        self.base = self.seed * self.SEED_BASE
+
+        if dt:
+            self.update(dt)
+
+    def update(self, dt: Union[date, datetime]) -> None:
+        """
+        Move simulated time forward to dt.
+        """
+        date_key = dt.year * 10000 + dt.month * 100 + dt.day
+
+        if date_key != self.date_key:
+            self.date_key = date_key
+            self.count = 0
+            self.base = date_key * self.DATE_BASE + self.seed * self.SEED_BASE
+
+        self.datetime = dt
+
+    def new_id(self) -> int:
+        """
+        Generate a new id of current simulated date.
+        """
+        self.count += 1
+        return self.base + self.count
+
+
 class BarGenerator:
     """
     For:
@@ -156,6 +226,8 @@ class BarGenerator:
     Notice:
     1. for x minute bar, x must be able to divide 60: 2, 3, 5, 6, 10, 15, 20, 30
     2. for x hour bar, x can be any number
+    3. for converting history data in batch, use BarColumns.from_ticks
+       and BarColumns.resample instead
     """
 
     def __init__(
@@ -301,6 +373,13 @@ class ArrayManager(object):
     For:
     1. time series container of bar data
     2. calculating technical indicator value
+
+    Notice:
+    1. bar data is saved in a ring buffer of double size, every value is
+       written twice so that the latest [size] values are always a contiguous
+       view, no data is shifted when updating new bar
+    2. indicator results are cached until next bar update, result array
+       should not be modified
     """
 
     def __init__(self, size: int = 100):
@@ -309,12 +388,11 @@ class ArrayManager(object):
         self.size: int = size
         self.inited: bool = False
 
-        self.open_array: np.ndarray = np.zeros(size)
-        self.high_array: np.ndarray = np.zeros(size)
-        self.low_array: np.ndarray = np.zeros(size)
-        self.close_array: np.ndarray = np.zeros(size)
-        self.volume_array: np.ndarray = np.zeros(size)
-        self.open_interest_array: np.ndarray = np.zeros(size)
+        # Rows of open, high, low, close, volume, open_interest
+        self.buffer: np.ndarray = np.zeros((6, size * 2))
+        self.start: int = size
+
+        self.cache: dict = {}
 
     def update_bar(self, bar: BarData) -> None:
         """
@@ -324,19 +402,50 @@ class ArrayManager(object):
         if not self.inited and self.count >= self.size:
             self.inited = True
 
-        self.open_array[:-1] = self.open_array[1:]
-        self.high_array[:-1] = self.high_array[1:]
-        self.low_array[:-1] = self.low_array[1:]
-        self.close_array[:-1] = self.close_array[1:]
-        self.volume_array[:-1] = self.volume_array[1:]
-        self.open_interest_array[:-1] = self.open_interest_array[1:]
+        ix = (self.count - 1) % self.size
+        values = (
+            bar.open_price,
+            bar.high_price,
+            bar.low_price,
+            bar.close_price,
+            bar.volume,
+            bar.open_interest
+        )
+        self.buffer[:, ix] = values
+        self.buffer[:, ix + self.size] = values
+
+        self.start = ix + 1
+        self.cache.clear()
+
+    @property
+    def open_array(self) -> np.ndarray:
+        """"""
+        return self.buffer[0, self.start:self.start + self.size]
+
+    @property
+    def high_array(self) -> np.ndarray:
+        """"""
+        return self.buffer[1, self.start:self.start + self.size]
+
+    @property
+    def low_array(self) -> np.ndarray:
+        """"""
+        return self.buffer[2, self.start:self.start + self.size]
+
+    @property
+    def close_array(self) -> np.ndarray:
+        """"""
+        return self.buffer[3, self.start:self.start + self.size]
+
+    @property
+    def volume_array(self) -> np.ndarray:
+        """"""
+        return self.buffer[4, self.start:self.start + self.size]
 
-        self.open_array[-1] = bar.open_price
-        self.high_array[-1] = bar.high_price
-        self.low_array[-1] = bar.low_price
-        self.close_array[-1] = bar.close_price
-        self.volume_array[-1] = bar.volume
-        self.open_interest_array[-1] = bar.open_interest
+    @property
+    def open_interest_array(self) -> np.ndarray:
+        """"""
+        return self.buffer[5, self.start:self.start + self.size]
 
     @property
     def open(self) -> np.ndarray:
@@ -380,11 +489,24 @@ class ArrayManager(object):
         """
         return self.open_interest_array
 
+    def compute(self, func: Callable, names: Tuple[str, ...], *args):
+        """
+        Call talib function with time series of names, result is cached
+        until next bar update.
+        """
+        key = (func, names, args)
+
+        result = self.cache.get(key, None)
+        if result is None:
+            result = func(*[getattr(self, name) for name in names], *args)
+            self.cache[key] = result
+        return result
+
     def sma(self, n: int, array: bool = False) -> Union[float, np.ndarray]:
         """
         Simple moving average.
         """
-        result = talib.SMA(self.close, n)
+        result = self.compute(talib.SMA, ("close",), n)
         if array:
             return result
         return result[-1]
@@ -393,7 +515,7 @@ class ArrayManager(object):
         """
         Exponential moving average.
         """
-        result = talib.EMA(self.close, n)
+        result = self.compute(talib.EMA, ("close",), n)
         if array:
             return result
         return result[-1]
@@ -402,7 +524,7 @@ class ArrayManager(object):
         """
         KAMA.
         """
-        result = talib.KAMA(self.close, n)
+        result = self.compute(talib.KAMA, ("close",), n)
         if array:
             return result
         return result[-1]
@@ -411,7 +533,7 @@ class ArrayManager(object):
         """
         WMA.
         """
-        result = talib.WMA(self.close, n)
+        result = self.compute(talib.WMA, ("close",), n)
         if array:
             return result
         return result[-1]
@@ -420,7 +542,7 @@ class ArrayManager(object):
         """
         APO.
         """
-        result = talib.APO(self.close, n)
+        result = self.compute(talib.APO, ("close",), n)
         if array:
             return result
         return result[-1]
@@ -429,7 +551,7 @@ class ArrayManager(object):
         """
         CMO.
         """
-        result = talib.CMO(self.close, n)
+        result = self.compute(talib.CMO, ("close",), n)
         if array:
             return result
         return result[-1]
@@ -438,7 +560,7 @@ class ArrayManager(object):
         """
         MOM.
         """
-        result = talib.MOM(self.close, n)
+        result = self.compute(talib.MOM, ("close",), n)
         if array:
             return result
         return result[-1]
@@ -447,7 +569,7 @@ class ArrayManager(object):
         """
         PPO.
         """
-        result = talib.PPO(self.close, n)
+        result = self.compute(talib.PPO, ("close",), n)
         if array:
             return result
         return result[-1]
@@ -456,7 +578,7 @@ class ArrayManager(object):
         """
         ROC.
         """
-        result = talib.ROC(self.close, n)
+        result = self.compute(talib.ROC, ("close",), n)
         if array:
             return result
         return result[-1]
@@ -465,7 +587,7 @@ class ArrayManager(object):
         """
         ROCR.
         """
-        result = talib.ROCR(self.close, n)
+        result = self.compute(talib.ROCR, ("close",), n)
         if array:
             return result
         return result[-1]
@@ -474,7 +596,7 @@ class ArrayManager(object):
         """
         ROCP.
         """
-        result = talib.ROCP(self.close, n)
+        result = self.compute(talib.ROCP, ("close",), n)
         if array:
             return result
         return result[-1]
@@ -483,7 +605,7 @@ class ArrayManager(object):
         """
         ROCR100.
         """
-        result = talib.ROCR100(self.close, n)
+        result = self.compute(talib.ROCR100, ("close",), n)
         if array:
             return result
         return result[-1]
@@ -492,7 +614,7 @@ class ArrayManager(object):
         """
         TRIX.
         """
-        result = talib.TRIX(self.close, n)
+        result = self.compute(talib.TRIX, ("close",), n)
         if array:
             return result
         return result[-1]
@@ -501,7 +623,7 @@ class ArrayManager(object):
         """
         Standard deviation.
         """
-        result = talib.STDDEV(self.close, n)
+        result = self.compute(talib.STDDEV, ("close",), n)
         if array:
             return result
         return result[-1]
@@ -510,7 +632,7 @@ class ArrayManager(object):
         """
         OBV.
         """
-        result = talib.OBV(self.close, self.volume)
+        result = self.compute(talib.OBV, ("close", "volume"))
         if array:
             return result
         return result[-1]
@@ -519,7 +641,7 @@ class ArrayManager(object):
         """
         Commodity Channel Index (CCI).
         """
-        result = talib.CCI(self.high, self.low, self.close, n)
+        result = self.compute(talib.CCI, ("high", "low", "close"), n)
         if array:
             return result
         return result[-1]
@@ -528,7 +650,7 @@ class ArrayManager(object):
         """
         Average True Range (ATR).
         """
-        result = talib.ATR(self.high, self.low, self.close, n)
+        result = self.compute(talib.ATR, ("high", "low", "close"), n)
         if array:
             return result
         return result[-1]
@@ -537,7 +659,7 @@ class ArrayManager(object):
         """
         NATR.
         """
-        result = talib.NATR(self.high, self.low, self.close, n)
+        result = self.compute(talib.NATR, ("high", "low", "close"), n)
         if array:
             return result
         return result[-1]
@@ -546,7 +668,7 @@ class ArrayManager(object):
         """
         Relative Strenght Index (RSI).
         """
-        result = talib.RSI(self.close, n)
+        result = self.compute(talib.RSI, ("close",), n)
         if array:
             return result
         return result[-1]
@@ -564,8 +686,8 @@ class ArrayManager(object):
         """
         MACD.
         """
-        macd, signal, hist = talib.MACD(
-            self.close, fast_period, slow_period, signal_period
+        macd, signal, hist = self.compute(
+            talib.MACD, ("close",), fast_period, slow_period, signal_period
         )
         if array:
             return macd, signal, hist
@@ -575,7 +697,7 @@ class ArrayManager(object):
         """
         ADX.
         """
-        result = talib.ADX(self.high, self.low, self.close, n)
+        result = self.compute(talib.ADX, ("high", "low", "close"), n)
         if array:
             return result
         return result[-1]
@@ -584,7 +706,7 @@ class ArrayManager(object):
         """
         ADXR.
         """
-        result = talib.ADXR(self.high, self.low, self.close, n)
+        result = self.compute(talib.ADXR, ("high", "low", "close"), n)
         if array:
             return result
         return result[-1]
@@ -593,7 +715,7 @@ class ArrayManager(object):
         """
         DX.
         """
-        result = talib.DX(self.high, self.low, self.close, n)
+        result = self.compute(talib.DX, ("high", "low", "close"), n)
         if array:
             return result
         return result[-1]
@@ -602,7 +724,7 @@ class ArrayManager(object):
         """
         MINUS_DI.
         """
-        result = talib.MINUS_DI(self.high, self.low, self.close, n)
+        result = self.compute(talib.MINUS_DI, ("high", "low", "close"), n)
         if array:
             return result
         return result[-1]
@@ -611,7 +733,7 @@ class ArrayManager(object):
         """
         PLUS_DI.
         """
-        result = talib.PLUS_DI(self.high, self.low, self.close, n)
+        result = self.compute(talib.PLUS_DI, ("high", "low", "close"), n)
         if array:
             return result
         return result[-1]
@@ -620,7 +742,7 @@ class ArrayManager(object):
         """
         WILLR.
         """
-        result = talib.WILLR(self.high, self.low, self.close, n)
+        result = self.compute(talib.WILLR, ("high", "low", "close"), n)
         if array:
             return result
         return result[-1]
@@ -629,7 +751,7 @@ class ArrayManager(object):
         """
         Ultimate Oscillator.
         """
-        result = talib.ULTOSC(self.high, self.low, self.close)
+        result = self.compute(talib.ULTOSC, ("high", "low", "close"))
         if array:
             return result
         return result[-1]
@@ -638,7 +760,7 @@ class ArrayManager(object):
         """
         TRANGE.
         """
-        result = talib.TRANGE(self.high, self.low, self.close)
+        result = self.compute(talib.TRANGE, ("high", "low", "close"))
         if array:
             return result
         return result[-1]
@@ -692,8 +814,8 @@ class ArrayManager(object):
         """
         Donchian Channel.
         """
-        up = talib.MAX(self.high, n)
-        down = talib.MIN(self.low, n)
+        up = self.compute(talib.MAX, ("high",), n)
+        down = self.compute(talib.MIN, ("low",), n)
 
         if array:
             return up, down
@@ -711,7 +833,7 @@ class ArrayManager(object):
         """
         Aroon indicator.
         """
-        aroon_up, aroon_down = talib.AROON(self.high, self.low, n)
+        aroon_up, aroon_down = self.compute(talib.AROON, ("high", "low"), n)
 
         if array:
             return aroon_up, aroon_down
@@ -721,7 +843,7 @@ class ArrayManager(object):
         """
         Aroon Oscillator.
         """
-        result = talib.AROONOSC(self.high, self.low, n)
+        result = self.compute(talib.AROONOSC, ("high", "low"), n)
 
         if array:
             return result
@@ -731,7 +853,7 @@ class ArrayManager(object):
         """
         MINUS_DM.
         """
-        result = talib.MINUS_DM(self.high, self.low, n)
+        result = self.compute(talib.MINUS_DM, ("high", "low"), n)
 
         if array:
             return result
@@ -741,7 +863,7 @@ class ArrayManager(object):
         """
         PLUS_DM.
         """
-        result = talib.PLUS_DM(self.high, self.low, n)
+        result = self.compute(talib.PLUS_DM, ("high", "low"), n)
 
         if array:
             return result
@@ -751,7 +873,7 @@ class ArrayManager(object):
         """
         Money Flow Index.
         """
-        result = talib.MFI(self.high, self.low, self.close, self.volume, n)
+        result = self.compute(talib.MFI, ("high", "low", "close", "volume"), n)
         if array:
             return result
         return result[-1]
@@ -760,7 +882,7 @@ class ArrayManager(object):
         """
         AD.
         """
-        result = talib.AD(self.high, self.low, self.close, self.volume, n)
+        result = self.compute(talib.AD, ("high", "low", "close", "volume"), n)
         if array:
             return result
         return result[-1]
@@ -769,7 +891,7 @@ class ArrayManager(object):
         """
         ADOSC.
         """
-        result = talib.ADOSC(self.high, self.low, self.close, self.volume, n)
+        result = self.compute(talib.ADOSC, ("high", "low", "close", "volume"), n)
         if array:
             return result
         return result[-1]
@@ -778,13 +900,485 @@ class ArrayManager(object):
         """
         BOP.
         """
-        result = talib.BOP(self.open, self.high, self.low, self.close)
+        result = self.compute(talib.BOP, ("open", "high", "low", "close"))
 
         if array:
             return result
         return result[-1]
 
 
+class CrossSectionalArrayManager(object):
+    """
+    For:
+    1. time series container of bar data of many symbols, saved as
+       matrices of symbol x time
+    2. calculating technical indicator of all symbols in one vectorized pass
+    3. providing ArrayManager handle of each symbol for strategies
+
+    Notice:
+    1. call update_bars with bars of all symbols on every bar event, symbol
+       without new bar repeats last prices with zero volume
+    2. indicator results are cached until next update, matrices returned
+       should not be modified
+    3. sma/ema/std/atr/rsi/mom/roc/donchian (and boll/keltner based on them)
+       are vectorized, other indicators of handles fall back to talib
+    """
+
+    def __init__(self, vt_symbols: List[str], size: int = 100):
+        """Constructor"""
+        self.vt_symbols: List[str] = list(vt_symbols)
+        self.rows: Dict[str, int] = {
+            vt_symbol: row for row, vt_symbol in enumerate(self.vt_symbols)
+        }
+        self.size: int = size
+        self.count: int = 0
+        self.datetime: datetime = None
+
+        # Bar count and last bar datetime of each symbol
+        self.counts: np.ndarray = np.zeros(len(self.vt_symbols), dtype=int)
+        self.datetimes: List[datetime] = [None] * len(self.vt_symbols)
+
+        # Fields of open, high, low, close, volume, open_interest
+        self.buffer: np.ndarray = np.zeros((6, len(self.vt_symbols), size * 2))
+        self.start: int = size
+
+        self.cache: dict = {}
+        self.handles: Dict[str, "SymbolArrayManager"] = {}
+
+    def new_step(self, dt: datetime = None) -> None:
+        """
+        Move forward one bar for all symbols, last values are copied.
+        """
+        last = self.start + self.size - 1
+
+        self.count += 1
+        self.datetime = dt
+        ix = (self.count - 1) % self.size
+
+        values = self.buffer[:, :, last].copy()
+        values[4] = 0
+        self.buffer[:, :, ix] = values
+        self.buffer[:, :, ix + self.size] = values
+
+        self.start = ix + 1
+        self.cache.clear()
+
+        for handle in self.handles.values():
+            handle.start = self.start
+
+    def write_bar(self, bar: BarData) -> None:
+        """
+        Write bar into current step.
+        """
+        row = self.rows[bar.vt_symbol]
+        ix = self.start - 1
+
+        values = (
+            bar.open_price,
+            bar.high_price,
+            bar.low_price,
+            bar.close_price,
+            bar.volume,
+            bar.open_interest
+        )
+        self.buffer[:, row, ix] = values
+        self.buffer[:, row, ix + self.size] = values
+
+        self.counts[row] += 1
+        self.datetimes[row] = bar.datetime
+        self.cache.clear()
+
+        handle = self.handles.get(bar.vt_symbol, None)
+        if handle:
+            handle.count += 1
+            handle.inited = handle.count >= handle.size
+
+    def update_bars(self, bars: Dict[str, BarData]) -> None:
+        """
+        Update new bars of all symbols with the same datetime.
+        """
+        if not bars:
+            return
+
+        dt = next(iter(bars.values())).datetime
+        self.new_step(dt)
+
+        for bar in bars.values():
+            self.write_bar(bar)
+
+    def update_bar(self, bar: BarData) -> None:
+        """
+        Update new bar of one symbol, a new step is started by bar with new datetime.
+        Bar already updated by update_bars is skipped.
+        """
+        row = self.rows[bar.vt_symbol]
+        if self.datetimes[row] == bar.datetime:
+            return
+
+        if bar.datetime != self.datetime:
+            self.new_step(bar.datetime)
+        self.write_bar(bar)
+
+    def get_array_manager(self, vt_symbol: str) -> "SymbolArrayManager":
+        """
+        Get ArrayManager handle reading time series of one symbol.
+        """
+        handle = self.handles.get(vt_symbol, None)
+        if not handle:
+            handle = SymbolArrayManager(self, vt_symbol)
+            self.handles[vt_symbol] = handle
+        return handle
+
+    def get_matrix(self, field: int) -> np.ndarray:
+        """"""
+        return self.buffer[field, :, self.start:self.start + self.size]
+
+    @property
+    def open(self) -> np.ndarray:
+        """
+        Get open price matrix.
+        """
+        return self.get_matrix(0)
+
+    @property
+    def high(self) -> np.ndarray:
+        """
+        Get high price matrix.
+        """
+        return self.get_matrix(1)
+
+    @property
+    def low(self) -> np.ndarray:
+        """
+        Get low price matrix.
+        """
+        return self.get_matrix(2)
+
+    @property
+    def close(self) -> np.ndarray:
+        """
+        Get close price matrix.
+        """
+        return self.get_matrix(3)
+
+    @property
+    def volume(self) -> np.ndarray:
+        """
+        Get trading volume matrix.
+        """
+        return self.get_matrix(4)
+
+    @property
+    def open_interest(self) -> np.ndarray:
+        """
+        Get open interest matrix.
+        """
+        return self.get_matrix(5)
+
+    def compute(self, func: Callable, *args) -> np.ndarray:
+        """
+        Call vectorized indicator function, result is cached until next update.
+        """
+        key = (func, args)
+
+        result = self.cache.get(key, None)
+        if result is None:
+            result = func(self, *args)
+            self.cache[key] = result
+        return result
+
+    def sma(self, n: int) -> np.ndarray:
+        """
+        Simple moving average, same as talib.SMA.
+        """
+        return self.compute(CrossSectionalArrayManager._sma, n)
+
+    def ema(self, n: int) -> np.ndarray:
+        """
+        Exponential moving average, same as talib.EMA.
+        """
+        return self.compute(CrossSectionalArrayManager._ema, n)
+
+    def std(self, n: int) -> np.ndarray:
+        """
+        Standard deviation, same as talib.STDDEV.
+        """
+        return self.compute(CrossSectionalArrayManager._std, n)
+
+    def atr(self, n: int) -> np.ndarray:
+        """
+        Average True Range, same as talib.ATR.
+        """
+        return self.compute(CrossSectionalArrayManager._atr, n)
+
+    def rsi(self, n: int) -> np.ndarray:
+        """
+        Relative Strenght Index, same as talib.RSI.
+        """
+        return self.compute(CrossSectionalArrayManager._rsi, n)
+
+    def mom(self, n: int) -> np.ndarray:
+        """
+        Momentum, same as talib.MOM.
+        """
+        return self.compute(CrossSectionalArrayManager._mom, n)
+
+    def roc(self, n: int) -> np.ndarray:
+        """
+        Rate of change, same as talib.ROC.
+        """
+        return self.compute(CrossSectionalArrayManager._roc, n)
+
+    def donchian(self, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Donchian Channel, same as talib.MAX and talib.MIN.
+        """
+        return self.compute(CrossSectionalArrayManager._donchian, n)
+
+    def _sma(self, n: int) -> np.ndarray:
+        """"""
+        close = self.close
+        result = np.full(close.shape, np.nan)
+
+        cumsum = np.zeros((close.shape[0], close.shape[1] + 1))
+        np.cumsum(close, axis=1, out=cumsum[:, 1:])
+        result[:, n - 1:] = (cumsum[:, n:] - cumsum[:, :-n]) / n
+        return result
+
+    def _ema(self, n: int) -> np.ndarray:
+        """"""
+        close = self.close
+        result = np.full(close.shape, np.nan)
+        if close.shape[1] < n:
+            return result
+
+        k = 2 / (n + 1)
+        value = close[:, :n].mean(axis=1)
+        result[:, n - 1] = value
+
+        for i in range(n, close.shape[1]):
+            value = close[:, i] * k + value * (1 - k)
+            result[:, i] = value
+        return result
+
+    def _std(self, n: int) -> np.ndarray:
+        """"""
+        close = self.close
+        result = np.full(close.shape, np.nan)
+        if close.shape[1] < n:
+            return result
+
+        windows = np.lib.stride_tricks.sliding_window_view(close, n, axis=1)
+        result[:, n - 1:] = windows.std(axis=2)
+        return result
+
+    def _trange(self) -> np.ndarray:
+        """"""
+        high, low, close = self.high, self.low, self.close
+        result = np.full(close.shape, np.nan)
+
+        pre_close = close[:, :-1]
+        result[:, 1:] = np.maximum.reduce([
+            high[:, 1:] - low[:, 1:],
+            np.abs(high[:, 1:] - pre_close),
+            np.abs(low[:, 1:] - pre_close)
+        ])
+        return result
+
+    def _atr(self, n: int) -> np.ndarray:
+        """"""
+        trange = self._trange()
+        if n == 1:
+            return trange
+
+        result = np.full(trange.shape, np.nan)
+        if trange.shape[1] <= n:
+            return result
+
+        value = trange[:, 1:n + 1].mean(axis=1)
+        result[:, n] = value
+
+        for i in range(n + 1, trange.shape[1]):
+            value = (value * (n - 1) + trange[:, i]) / n
+            result[:, i] = value
+        return result
+
+    def _rsi(self, n: int) -> np.ndarray:
+        """"""
+        close = self.close
+        result = np.full(close.shape, np.nan)
+        if close.shape[1] <= n:
+            return result
+
+        diff = np.diff(close, axis=1)
+        gain = np.where(diff > 0, diff, 0)
+        loss = np.where(diff < 0, -diff, 0)
+
+        def calculate_rsi(avg_gain, avg_loss):
+            total = avg_gain + avg_loss
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return np.where(total != 0, 100 * avg_gain / total, 0)
+
+        avg_gain = gain[:, :n].mean(axis=1)
+        avg_loss = loss[:, :n].mean(axis=1)
+        result[:, n] = calculate_rsi(avg_gain, avg_loss)
+
+        for i in range(n, diff.shape[1]):
+            avg_gain = (avg_gain * (n - 1) + gain[:, i]) / n
+            avg_loss = (avg_loss * (n - 1) + loss[:, i]) / n
+            result[:, i + 1] = calculate_rsi(avg_gain, avg_loss)
+        return result
+
+    def _mom(self, n: int) -> np.ndarray:
+        """"""
+        close = self.close
+        result = np.full(close.shape, np.nan)
+        result[:, n:] = close[:, n:] - close[:, :-n]
+        return result
+
+    def _roc(self, n: int) -> np.ndarray:
+        """"""
+        close = self.close
+        result = np.full(close.shape, np.nan)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            roc = (close[:, n:] / close[:, :-n] - 1) * 100
+        roc[close[:, :-n] == 0] = 0
+        result[:, n:] = roc
+        return result
+
+    def _donchian(self, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        """"""
+        up = np.full(self.high.shape, np.nan)
+        down = np.full(self.low.shape, np.nan)
+        if self.high.shape[1] < n:
+            return up, down
+
+        up[:, n - 1:] = np.lib.stride_tricks.sliding_window_view(self.high, n, axis=1).max(axis=2)
+        down[:, n - 1:] = np.lib.stride_tricks.sliding_window_view(self.low, n, axis=1).min(axis=2)
+        return up, down
+
+
+class SymbolArrayManager(ArrayManager):
+    """
+    ArrayManager of one symbol in CrossSectionalArrayManager, with the same
+    interface so that it can be used by existing strategies. Vectorized
+    indicators are read from results of all symbols.
+    """
+
+    def __init__(self, group: CrossSectionalArrayManager, vt_symbol: str):
+        """Constructor"""
+        super().__init__(group.size)
+
+        self.group: CrossSectionalArrayManager = group
+        self.vt_symbol: str = vt_symbol
+        self.row: int = group.rows[vt_symbol]
+
+        # Time series are views of group buffer, start and count are
+        # updated by group
+        self.buffer = group.buffer[:, self.row, :]
+        self.start = group.start
+        self.count = int(group.counts[self.row])
+        self.inited = self.count >= self.size
+
+    def update_bar(self, bar: BarData) -> None:
+        """
+        Update new bar into group, skipped if already updated by update_bars.
+        """
+        self.group.update_bar(bar)
+
+    def compute(self, func: Callable, names: Tuple[str, ...], *args):
+        """
+        Talib result of this symbol, cached in group until next update.
+        """
+        key = (func, names, args, self.row)
+
+        result = self.group.cache.get(key, None)
+        if result is None:
+            result = func(*[getattr(self, name) for name in names], *args)
+            self.group.cache[key] = result
+        return result
+
+    def sma(self, n: int, array: bool = False) -> Union[float, np.ndarray]:
+        """
+        Simple moving average.
+        """
+        result = self.group.sma(n)[self.row]
+        if array:
+            return result
+        return result[-1]
+
+    def ema(self, n: int, array: bool = False) -> Union[float, np.ndarray]:
+        """
+        Exponential moving average.
+        """
+        result = self.group.ema(n)[self.row]
+        if array:
+            return result
+        return result[-1]
+
+    def std(self, n: int, array: bool = False) -> Union[float, np.ndarray]:
+        """
+        Standard deviation.
+        """
+        result = self.group.std(n)[self.row]
+        if array:
+            return result
+        return result[-1]
+
+    def atr(self, n: int, array: bool = False) -> Union[float, np.ndarray]:
+        """
+        Average True Range (ATR).
+        """
+        result = self.group.atr(n)[self.row]
+        if array:
+            return result
+        return result[-1]
+
+    def rsi(self, n: int, array: bool = False) -> Union[float, np.ndarray]:
+        """
+        Relative Strenght Index (RSI).
+        """
+        result = self.group.rsi(n)[self.row]
+        if array:
+            return result
+        return result[-1]
+
+    def mom(self, n: int, array: bool = False) -> Union[float, np.ndarray]:
+        """
+        MOM.
+        """
+        result = self.group.mom(n)[self.row]
+        if array:
+            return result
+        return result[-1]
+
+    def roc(self, n: int, array: bool = False) -> Union[float, np.ndarray]:
+        """
+        ROC.
+        """
+        result = self.group.roc(n)[self.row]
+        if array:
+            return result
+        return result[-1]
+
+    def donchian(
+        self, n: int, array: bool = False
+    ) -> Union[
+        Tuple[np.ndarray, np.ndarray],
+        Tuple[float, float]
+    ]:
+        """
+        Donchian Channel.
+        """
+        up, down = self.group.donchian(n)
+        up, down = up[self.row], down[self.row]
+
+        if array:
+            return up, down
+        return up[-1], down[-1]
+
+
 def virtual(func: Callable) -> Callable:
     """
     mark a function as "virtual", which means that this function can be override.
@@ -0,0 +1,132 @@
+import os,sys
+sys.path.insert(0,'D:\\GitHub\\Quantitative-analysis-with-Deep-Learning\\quantitative_analysis_with_deep_learning')
+from datetime import datetime
+from time import time
+
+import numpy as np
+import pandas as pd
+
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.object import TickData
+from vnpy.trader.utility import BarGenerator
+from vnpy.trader.columnar import BarColumns, aggregate_ticks
+
+
+def make_tick_arrays(days=250, interval=0.5, seed=0):
+    """
+    生成一年的A股逐笔tick数组，每天9:30-11:30和13:00-15:00，约每0.5秒一笔
+    """
+    rng = np.random.RandomState(seed)
+    sessions = [(9 * 3600 + 30 * 60, 11 * 3600 + 30 * 60), (13 * 3600, 15 * 3600)]
+    seconds = np.concatenate([np.arange(start, end, interval) for start, end in sessions])
+    us = (seconds * 1_000_000).astype(np.int64)
+
+    index = pd.bdate_range('2019-01-02', periods=days)
+    day_us = index.values.astype("datetime64[us]").view(np.int64)
+    dts = (day_us[:, None] + us[None, :]).ravel()
+    count = len(dts)
+
+    prices = 10 * np.exp(np.cumsum(rng.normal(0, 0.0002, count)))
+    prices = np.round(prices, 2)
+    # 少量无效tick
+    prices[rng.rand(count) < 0.001] = 0
+
+    # 累计成交量每天清零
+    volumes = rng.randint(0, 50, count).astype(np.float64) * 100
+    volumes = volumes.reshape(days, -1).cumsum(axis=1).ravel()
+
+    open_interest = np.zeros(count)
+    return dts, prices, volumes, open_interest
+
+
+def to_ticks(dts, prices, volumes, open_interest):
+    """"""
+    ticks = []
+    for dt, price, volume, oi in zip(dts.view("datetime64[us]").astype(object), prices, volumes, open_interest):
+        tick = TickData(
+            symbol='600000',
+            exchange=Exchange.SSE,
+            datetime=dt,
+            gateway_name='DB',
+            last_price=price,
+            volume=volume,
+            open_interest=oi
+        )
+        ticks.append(tick)
+    return ticks
+
+
+def run_bar_generator(ticks, window):
+    """
+    原有的逐tick生成1分钟K线，再合成x分钟K线
+    """
+    bars = []
+    window_bars = []
+
+    def on_bar(bar):
+        bars.append(bar)
+        if window:
+            bg.update_bar(bar)
+
+    bg = BarGenerator(on_bar, window, window_bars.append)
+    for tick in ticks:
+        bg.update_tick(tick)
+    bg.generate()
+
+    return bars, window_bars
+
+
+def check_parity(bars, columns):
+    """"""
+    assert len(columns) >= len(bars)
+    for bar, result in zip(bars, columns.to_bars()):
+        assert bar.datetime == result.datetime, (bar.datetime, result.datetime)
+        assert bar.open_price == result.open_price
+        assert bar.high_price == result.high_price
+        assert bar.low_price == result.low_price
+        assert bar.close_price == result.close_price
+        assert bar.volume == result.volume
+        assert bar.open_interest == result.open_interest
+
+
+def main():
+    """"""
+    dts, prices, volumes, open_interest = make_tick_arrays()
+    print('Tick数量：%d' % len(dts))
+
+    # 取前10天用BarGenerator校验结果并估算耗时
+    sample = np.searchsorted(dts, dts[0] + 10 * 86_400_000_000)
+    ticks = to_ticks(dts[:sample], prices[:sample], volumes[:sample], open_interest[:sample])
+
+    for window in [1, 5, 15, 30]:
+        start = time()
+        bars, window_bars = run_bar_generator(ticks, window if window > 1 else 0)
+        cost = time() - start
+
+        minute_columns = BarColumns.from_ticks(ticks)
+        check_parity(bars, minute_columns)
+        if window > 1:
+            check_parity(window_bars, minute_columns.resample(window, Interval.MINUTE))
+            check_parity(window_bars, BarColumns.from_ticks(ticks, window, Interval.MINUTE))
+
+        print('%d分钟K线与BarGenerator一致，BarGenerator估算全年耗时%.2f秒' % (window, cost * len(dts) / sample))
+
+    for window, interval in [(1, Interval.MINUTE), (5, Interval.MINUTE), (1, Interval.HOUR), (1, Interval.DAILY)]:
+        start = time()
+        arrays = aggregate_ticks(dts, prices, volumes, open_interest, window, interval)
+        cost = time() - start
+        print('全年Tick合成%d*%s K线：%d根，耗时%.3f秒' % (window, interval.value, len(arrays['datetime']), cost))
+
+    minute_columns = BarColumns(
+        symbol='600000', exchange=Exchange.SSE, interval=Interval.MINUTE,
+        **aggregate_ticks(dts, prices, volumes, open_interest)
+    )
+    start = time()
+    daily_columns = minute_columns.resample(1, Interval.DAILY)
+    cost = time() - start
+    print('全年1分钟K线合成日线：%d根，耗时%.4f秒' % (len(daily_columns), cost))
+    print(daily_columns.to_bars()[0])
+
+
+if __name__ == '__main__':
+    main()
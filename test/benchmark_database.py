@@ -0,0 +1,85 @@
+import os,sys
+sys.path.insert(0,'D:\\GitHub\\Quantitative-analysis-with-Deep-Learning\\quantitative_analysis_with_deep_learning')
+os.environ['VNPY_TESTING'] = '1'
+import shutil
+import tempfile
+from datetime import datetime
+from time import time
+
+import numpy as np
+import pandas as pd
+
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.columnar import BarColumns
+from vnpy.trader.database.database import Driver
+from vnpy.trader.database.database_sql import init as init_sql
+from vnpy.trader.database.database_columnar import ColumnarManager
+
+
+def make_bars(years=2, seed=0):
+    """
+    生成多年的A股1分钟K线，每天240根
+    """
+    rng = np.random.RandomState(seed)
+    days = pd.bdate_range('2017-01-03', periods=250 * years)
+    minutes = np.concatenate([np.arange(570, 690), np.arange(780, 900)])
+    index = pd.DatetimeIndex((days.values[:, None] + minutes[None, :].astype('timedelta64[m]')).ravel())
+
+    close = 10 * np.exp(np.cumsum(rng.normal(0, 0.001, len(index))))
+    df = pd.DataFrame({'open': close, 'high': close * 1.001, 'low': close * 0.999,
+                       'close': close, 'vol': rng.randint(1, 100, len(index)) * 100.0}, index=index)
+    return BarColumns.from_dataframe(df, '600000', Exchange.SSE, Interval.MINUTE).to_bars()
+
+
+def run(name, manager, bars):
+    """
+    先按天追加写入，再测试整段和一个月的区间读取
+    """
+    start = time()
+    for i in range(0, len(bars), 240):
+        manager.save_bar_data(bars[i:i + 240])
+    append_cost = time() - start
+
+    start = time()
+    data = manager.load_bar_data('600000', Exchange.SSE, Interval.MINUTE, datetime(2000, 1, 1), datetime(2100, 1, 1))
+    load_cost = time() - start
+    assert len(data) == len(bars)
+
+    start = time()
+    month = manager.load_bar_data('600000', Exchange.SSE, Interval.MINUTE, datetime(2018, 3, 1), datetime(2018, 3, 31, 23))
+    month_cost = time() - start
+
+    print('%s：按天追加%.2f秒，读取全部%d根%.2f秒（%.0f根/秒），读取一个月%d根%.4f秒' % (
+        name, append_cost, len(data), load_cost, len(data) / load_cost, len(month), month_cost))
+
+    if isinstance(manager, ColumnarManager):
+        start = time()
+        arrays = manager.load_bar_arrays('600000', Exchange.SSE, Interval.MINUTE, datetime(2000, 1, 1), datetime(2100, 1, 1))
+        cost = time() - start
+        print('%s：读取全部数组%d根%.4f秒' % (name, len(arrays['datetime']), cost))
+    return data
+
+
+def main():
+    """"""
+    bars = make_bars()
+    print('K线数量：%d' % len(bars))
+
+    folder = tempfile.mkdtemp()
+    try:
+        sql_manager = init_sql(Driver.SQLITE, {'database': os.path.join(folder, 'database.db')})
+        columnar_manager = ColumnarManager(os.path.join(folder, 'columnar'))
+
+        expected = run('SQLite', sql_manager, bars)
+        result = run('Columnar', columnar_manager, bars)
+        assert [(b.datetime, b.close_price, b.volume) for b in expected] == \
+            [(b.datetime, b.close_price, b.volume) for b in result]
+        print('两种数据库读取结果一致')
+
+        sql_manager.class_bar._meta.database.close()
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+import os,sys
+sys.path.insert(0,'D:\\GitHub\\Quantitative-analysis-with-Deep-Learning\\quantitative_analysis_with_deep_learning')
+from datetime import datetime
+from threading import Thread
+from time import perf_counter, sleep
+
+import numpy as np
+
+from vnpy.event import Event, EventEngine, PriorityEventEngine
+from vnpy.trader.constant import Exchange, Direction
+from vnpy.trader.event import EVENT_TICK, EVENT_ORDER
+from vnpy.trader.object import TickData, OrderData
+
+
+SYMBOL_COUNT = 50
+TICK_RATE = 20_000          # 每秒推送tick数量
+ORDER_INTERVAL = 0.01       # 每10毫秒推送一笔委托
+TICK_COST = 0.0001          # tick处理函数耗时（秒）
+DURATION = 3
+
+
+class Handlers:
+    """
+    模拟较慢的tick处理函数（如策略、记录）和需要及时处理的委托处理函数
+    """
+
+    def __init__(self):
+        """"""
+        self.tick_count = 0
+        self.last_volumes = {}
+        self.out_of_order = 0
+        self.latencies = []
+
+    def process_tick_event(self, event):
+        """"""
+        tick = event.data
+        self.tick_count += 1
+
+        # 检查同一合约的tick是否按顺序处理
+        if tick.volume < self.last_volumes.get(tick.vt_symbol, -1):
+            self.out_of_order += 1
+        self.last_volumes[tick.vt_symbol] = tick.volume
+
+        end = perf_counter() + TICK_COST
+        while perf_counter() < end:
+            pass
+
+    def process_order_event(self, event):
+        """"""
+        self.latencies.append(perf_counter() - event.data.price)
+
+
+def produce(event_engine):
+    """
+    按固定速率推送tick，同时定时推送委托，委托价格字段记录推送时间
+    """
+    count = 0
+    start = perf_counter()
+    next_order = start
+
+    while perf_counter() - start < DURATION:
+        target = int((perf_counter() - start) * TICK_RATE)
+        while count < target:
+            tick = TickData(
+                symbol='IF%d' % (count % SYMBOL_COUNT),
+                exchange=Exchange.CFFEX,
+                datetime=datetime.now(),
+                gateway_name='CTP',
+                volume=count
+            )
+            event_engine.put(Event(EVENT_TICK, tick))
+            count += 1
+
+        now = perf_counter()
+        if now >= next_order:
+            next_order = now + ORDER_INTERVAL
+            order = OrderData(
+                symbol='IF0',
+                exchange=Exchange.CFFEX,
+                orderid=str(count),
+                direction=Direction.LONG,
+                price=perf_counter(),
+                gateway_name='CTP'
+            )
+            event_engine.put(Event(EVENT_ORDER, order))
+
+        sleep(0.0005)
+    return count
+
+
+def run(name, event_engine, pin=0):
+    """"""
+    handlers = Handlers()
+    event_engine.register(EVENT_TICK, handlers.process_tick_event)
+    event_engine.register(EVENT_ORDER, handlers.process_order_event)
+    if pin:
+        event_engine.pin(handlers.process_tick_event, pin)
+
+    event_engine.start()
+    tick_count = produce(event_engine)
+    event_engine.stop()
+
+    latencies = np.array(handlers.latencies) * 1000
+    print('%s：推送tick %d条，处理%d条，乱序%d条，委托%d笔，延迟中位数%.2f毫秒，99%%分位%.2f毫秒，最大%.2f毫秒' % (
+        name,
+        tick_count,
+        handlers.tick_count,
+        handlers.out_of_order,
+        len(latencies),
+        np.median(latencies),
+        np.percentile(latencies, 99),
+        latencies.max()
+    ))
+
+
+def main():
+    """"""
+    print('tick处理耗时%.1f毫秒，推送%d条/秒，合约%d个' % (TICK_COST * 1000, TICK_RATE, SYMBOL_COUNT))
+
+    run('EventEngine', EventEngine())
+    run('优先级', PriorityEventEngine())
+    run('优先级+tick合并', PriorityEventEngine(conflate_types=[EVENT_TICK]))
+    run('优先级+tick处理线程', PriorityEventEngine(), pin=1)
+    run('优先级+tick合并+tick处理线程', PriorityEventEngine(conflate_types=[EVENT_TICK]), pin=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+import os,sys
+sys.path.insert(0,'D:\\GitHub\\Quantitative-analysis-with-Deep-Learning\\quantitative_analysis_with_deep_learning')
+import multiprocessing
+from datetime import datetime, timedelta
+from time import time
+
+import numpy as np
+
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.object import BarData
+from vnpy.app.cta_strategy import CtaTemplate
+from vnpy.app.cta_strategy.backtesting import BacktestingEngine, OptimizationSetting
+
+
+class BenchmarkMaStrategy(CtaTemplate):
+    """
+    双均线策略，只用于测试优化速度，不依赖talib
+    """
+    fast_window = 10
+    slow_window = 40
+
+    parameters = ['fast_window', 'slow_window']
+    variables = []
+
+    def on_init(self):
+        self.closes = []
+        self.load_bar(1)
+
+    def on_start(self):
+        """"""
+
+    def on_stop(self):
+        """"""
+
+    def on_bar(self, bar: BarData):
+        self.cancel_all()
+        self.closes.append(bar.close_price)
+        if len(self.closes) < self.slow_window:
+            return
+        fast = sum(self.closes[-self.fast_window:]) / self.fast_window
+        slow = sum(self.closes[-self.slow_window:]) / self.slow_window
+        if fast > slow and self.pos <= 0:
+            if self.pos < 0:
+                self.cover(bar.close_price + 5, 1)
+            self.buy(bar.close_price + 5, 1)
+        elif fast < slow and self.pos >= 0:
+            if self.pos > 0:
+                self.sell(bar.close_price - 5, 1)
+            self.short(bar.close_price - 5, 1)
+
+
+def make_bars(years=3, seed=0):
+    """
+    生成多年的1分钟随机游走K线，每个交易日240根
+    """
+    rng = np.random.RandomState(seed)
+    n_days = 250 * years
+    n = n_days * 240
+    close = 3000 + np.cumsum(rng.normal(0, 1, n))
+    start = datetime(2017, 1, 3, 9, 30)
+
+    bars = []
+    for i in range(n):
+        day, minute = divmod(i, 240)
+        dt = start + timedelta(days=day, minutes=minute)
+        bars.append(BarData(symbol='IF88', exchange=Exchange.CFFEX, datetime=dt, interval=Interval.MINUTE,
+                            open_price=close[i - 1] if i else close[i], high_price=close[i] + 1,
+                            low_price=close[i] - 1, close_price=close[i], volume=100, gateway_name='DB'))
+    return bars
+
+
+def optimize_with_bars(setting, bars):
+    """
+    对照组：每个参数组合都把完整的K线列表发送到子进程，相当于每次重新加载历史数据
+    """
+    engine = make_engine()
+    engine.add_strategy(BenchmarkMaStrategy, setting)
+    engine.history_data = bars
+    engine.run_backtesting()
+    engine.calculate_result()
+    return engine.calculate_statistics(output=False)['sharpe_ratio']
+
+
+def make_engine():
+    engine = BacktestingEngine()
+    engine.output = lambda msg: None
+    engine.set_parameters(vt_symbol='IF88.CFFEX', interval='1m', start=datetime(2017, 1, 1),
+                          end=datetime(2020, 1, 1), rate=0.3 / 10000, slippage=0.2, size=300,
+                          pricetick=0.2, capital=1_000_000)
+    return engine
+
+
+def main():
+    """"""
+    bars = make_bars()
+    print('K线数量：%d' % len(bars))
+
+    optimization_setting = OptimizationSetting()
+    optimization_setting.set_target('sharpe_ratio')
+    optimization_setting.add_parameter('fast_window', 5, 20, 5)
+    optimization_setting.add_parameter('slow_window', 30, 60, 10)
+    settings = optimization_setting.generate_setting()
+
+    # 共享内存的历史数据
+    engine = make_engine()
+    engine.strategy_class = BenchmarkMaStrategy
+    engine.history_data = bars
+    start = time()
+    engine.run_optimization(optimization_setting, output=False)
+    shared_cost = time() - start
+
+    # 每个组合单独传输历史数据
+    ctx = multiprocessing.get_context('spawn')
+    start = time()
+    with ctx.Pool(multiprocessing.cpu_count()) as pool:
+        results = [pool.apply_async(optimize_with_bars, (setting, bars)) for setting in settings]
+        [r.get() for r in results]
+    pickled_cost = time() - start
+
+    print('参数组合：%d' % len(settings))
+    print('共享内存：%.2f 组合/秒' % (len(settings) / shared_cost))
+    print('逐个加载：%.2f 组合/秒' % (len(settings) / pickled_cost))
+
+
+if __name__ == '__main__':
+    main()
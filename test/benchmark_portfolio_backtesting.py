@@ -0,0 +1,202 @@
+import os,sys
+sys.path.insert(0,'D:\\GitHub\\Quantitative-analysis-with-Deep-Learning\\quantitative_analysis_with_deep_learning')
+from datetime import datetime
+from time import time
+
+import numpy as np
+import pandas as pd
+
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.object import BarData
+from vnpy.trader.columnar import BarColumns
+from vnpy.app.cta_strategy import CtaTemplate, PortfolioTemplate
+from vnpy.app.cta_strategy.backtesting import BacktestingEngine
+from vnpy.app.cta_strategy.portfolio_backtesting import PortfolioBacktestingEngine
+
+
+class DailyMaStrategy(CtaTemplate):
+    """
+    单个股票的双均线策略，不依赖talib
+    """
+    fast_window = 5
+    slow_window = 20
+
+    parameters = ['fast_window', 'slow_window']
+    variables = []
+
+    def on_init(self):
+        self.closes = []
+        self.load_bar(30, Interval.DAILY)
+
+    def on_bar(self, bar: BarData):
+        self.cancel_all()
+        self.closes.append(bar.close_price)
+        if len(self.closes) < self.slow_window:
+            return
+        fast = sum(self.closes[-self.fast_window:]) / self.fast_window
+        slow = sum(self.closes[-self.slow_window:]) / self.slow_window
+        if fast > slow and self.pos == 0:
+            self.buy(bar.close_price * 1.01, 100)
+        elif fast < slow and self.pos > 0:
+            self.sell(bar.close_price * 0.99, self.pos)
+
+
+class MomentumRotationStrategy(PortfolioTemplate):
+    """
+    截面动量轮动，每月持有过去20日涨幅最大的若干只股票
+    """
+    window = 20
+    hold_count = 5
+
+    parameters = ['window', 'hold_count']
+    variables = []
+
+    def on_init(self):
+        self.closes = {}
+        self.bar_count = 0
+        self.load_bars(30)
+
+    def on_bars(self, bars):
+        self.cancel_all()
+        self.bar_count += 1
+        for vt_symbol, bar in bars.items():
+            self.closes.setdefault(vt_symbol, []).append(bar.close_price)
+
+        if self.bar_count % 20:
+            return
+
+        momentum = {vt_symbol: closes[-1] / closes[-self.window] - 1
+                    for vt_symbol, closes in self.closes.items()
+                    if len(closes) >= self.window and vt_symbol in bars}
+        targets = set(sorted(momentum, key=momentum.get)[-self.hold_count:])
+
+        for vt_symbol, bar in bars.items():
+            pos = self.get_pos(vt_symbol)
+            if vt_symbol in targets and not pos:
+                self.buy(vt_symbol, bar.close_price * 1.01, 100)
+            elif vt_symbol not in targets and pos > 0:
+                self.sell(vt_symbol, bar.close_price * 0.99, pos)
+
+
+class CrossSectionalMaStrategy(PortfolioTemplate):
+    """
+    所有股票的双均线策略，用CrossSectionalArrayManager一次计算全部股票的均线
+    """
+    fast_window = 5
+    slow_window = 20
+
+    parameters = ['fast_window', 'slow_window']
+    variables = []
+
+    def on_init(self):
+        self.am = self.create_array_manager(self.slow_window)
+        self.load_bars(30)
+
+    def on_bars(self, bars):
+        self.cancel_all()
+        self.am.update_bars(bars)
+
+        fast = self.am.sma(self.fast_window)[:, -1]
+        slow = self.am.sma(self.slow_window)[:, -1]
+
+        for vt_symbol, bar in bars.items():
+            # 也可以像单个股票的策略一样使用ArrayManager
+            am = self.am.get_array_manager(vt_symbol)
+            if not am.inited:
+                continue
+
+            row = self.am.rows[vt_symbol]
+            pos = self.get_pos(vt_symbol)
+            if fast[row] > slow[row] and not pos:
+                self.buy(vt_symbol, bar.close_price * 1.01, 100)
+            elif fast[row] < slow[row] and pos > 0:
+                self.sell(vt_symbol, bar.close_price * 0.99, pos)
+
+
+def make_daily_data(n_symbols=50, years=10, seed=0):
+    """
+    生成多只股票多年的随机游走日线，返回vt_symbol为键的BarColumns
+    """
+    rng = np.random.RandomState(seed)
+    index = pd.bdate_range('2010-01-04', periods=250 * years)
+
+    data = {}
+    for i in range(n_symbols):
+        vt_symbol = '%06d.SSE' % (600000 + i)
+        close = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, len(index))))
+        df = pd.DataFrame({'open': close * (1 + rng.normal(0, 0.005, len(index))),
+                           'close': close, 'vol': 1e6}, index=index)
+        df['high'] = df[['open', 'close']].max(axis=1) * 1.01
+        df['low'] = df[['open', 'close']].min(axis=1) * 0.99
+
+        # 部分股票晚上市
+        df = df.iloc[rng.randint(0, 250):]
+        data[vt_symbol] = BarColumns.from_dataframe(df, vt_symbol.split('.')[0], Exchange.SSE, Interval.DAILY)
+    return data
+
+
+def make_engine(vt_symbols):
+    engine = PortfolioBacktestingEngine()
+    engine.output = lambda msg: None
+    engine.set_parameters(vt_symbols=vt_symbols, interval='d', start=datetime(2010, 1, 1),
+                          end=datetime(2020, 1, 1), rate=0.3 / 1000, slippage=0.01, size=1,
+                          pricetick=0.01, capital=10_000_000)
+    return engine
+
+
+def check_single_symbol(data):
+    """
+    单个股票时与BacktestingEngine的成交一致
+    """
+    vt_symbol = list(data)[0]
+
+    engine = make_engine([vt_symbol])
+    engine.add_strategy(DailyMaStrategy, {})
+    engine.set_history_data(vt_symbol, data[vt_symbol])
+    engine.run_backtesting()
+
+    single = BacktestingEngine()
+    single.output = lambda msg: None
+    single.set_parameters(vt_symbol=vt_symbol, interval='d', start=datetime(2010, 1, 1),
+                          end=datetime(2020, 1, 1), rate=0.3 / 1000, slippage=0.01, size=1,
+                          pricetick=0.01, capital=10_000_000)
+    single.add_strategy(DailyMaStrategy, {})
+    single.history_data = data[vt_symbol]
+    single.run_backtesting()
+
+    expected = [(t.datetime, t.direction, t.price, t.volume) for t in single.get_all_trades()]
+    result = [(t.datetime, t.direction, t.price, t.volume) for t in engine.get_all_trades()]
+    assert expected == result
+    print('单个股票成交一致：%d笔' % len(result))
+
+
+def run(data, strategy_class):
+    engine = make_engine(list(data))
+    engine.add_strategy(strategy_class, {})
+    for vt_symbol, columns in data.items():
+        engine.set_history_data(vt_symbol, columns)
+
+    start = time()
+    engine.run_backtesting()
+    run_cost = time() - start
+    engine.calculate_result()
+    statistics = engine.calculate_statistics(output=False)
+    total_cost = time() - start
+
+    print('%s：回放%.2f秒，共%.2f秒，成交%d笔，总收益率%.2f%%' % (
+        strategy_class.__name__, run_cost, total_cost, statistics['total_trade_count'], statistics['total_return']))
+
+
+def main():
+    """"""
+    data = make_daily_data()
+    print('股票数量：%d，K线数量：%d' % (len(data), sum(len(c) for c in data.values())))
+
+    check_single_symbol(data)
+    run(data, DailyMaStrategy)
+    run(data, MomentumRotationStrategy)
+    run(data, CrossSectionalMaStrategy)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+import os,sys
+sys.path.insert(0,'D:\\GitHub\\Quantitative-analysis-with-Deep-Learning\\quantitative_analysis_with_deep_learning')
+import multiprocessing
+from datetime import datetime
+from time import sleep, time
+
+import numpy as np
+
+from vnpy.event import Event, EventEngine
+from vnpy.trader.constant import Exchange
+from vnpy.trader.engine import MainEngine
+from vnpy.trader.event import EVENT_TICK
+from vnpy.trader.object import TickData
+from vnpy.trader.utility import load_json, save_json
+from vnpy.app.rpc_service.engine import RpcEngine
+from vnpy.gateway.rpc import RpcGateway
+
+
+REP_ADDRESS = 'tcp://127.0.0.1:27000'
+PUB_ADDRESS = 'tcp://127.0.0.1:27001'
+
+SYMBOL_COUNT = 50
+DURATION = 3
+
+
+def run_server(batch_interval, rate, ready, done):
+    """
+    服务端进程：按固定速率向事件引擎推送多个合约的tick，由RpcEngine转发
+    """
+    setting = load_json(RpcEngine.setting_filename)
+
+    main_engine = MainEngine(EventEngine())
+    rpc_engine = main_engine.add_engine(RpcEngine)
+    rpc_engine.batch_interval = batch_interval
+    rpc_engine.start(REP_ADDRESS, PUB_ADDRESS)
+
+    # 恢复原有的RPC服务配置
+    save_json(RpcEngine.setting_filename, setting)
+
+    ready.wait()
+
+    count = 0
+    start = time()
+    while time() - start < DURATION:
+        target = int((time() - start) * rate)
+        while count < target:
+            tick = TickData(
+                symbol='IF%d' % (count % SYMBOL_COUNT),
+                exchange=Exchange.CFFEX,
+                datetime=datetime.now(),
+                gateway_name='CTP',
+                last_price=4000 + count % 10,
+                volume=count
+            )
+            main_engine.event_engine.put(Event(EVENT_TICK, tick))
+            count += 1
+        sleep(0.0005)
+
+    done.wait()
+    main_engine.close()
+
+
+class TickCounter:
+    """"""
+
+    def __init__(self):
+        """"""
+        self.latencies = []
+
+    def process_tick_event(self, event):
+        """"""
+        self.latencies.append((datetime.now() - event.data.datetime).total_seconds())
+
+
+def run(batch_interval, rate, mode):
+    """"""
+    ready = multiprocessing.Event()
+    done = multiprocessing.Event()
+    process = multiprocessing.Process(target=run_server, args=(batch_interval, rate, ready, done))
+    process.start()
+    sleep(2)
+
+    event_engine = EventEngine()
+    counter = TickCounter()
+    event_engine.register(EVENT_TICK, counter.process_tick_event)
+    event_engine.start()
+
+    gateway = RpcGateway(event_engine)
+    gateway.connect({
+        '主动请求地址': REP_ADDRESS,
+        '推送订阅地址': PUB_ADDRESS,
+        '行情推送': mode
+    })
+
+    # 等待服务端收到订阅
+    sleep(1.5)
+    ready.set()
+    sleep(DURATION + 1)
+
+    done.set()
+    gateway.close()
+    event_engine.stop()
+    process.join()
+
+    latencies = np.array(counter.latencies) * 1_000_000
+    print('时间片%.1f毫秒，%s，推送%d条/秒：接收%d条，%.0f条/秒，延迟中位数%.0f微秒，99%%分位%.0f微秒' % (
+        batch_interval * 1000,
+        mode,
+        rate,
+        len(latencies),
+        len(latencies) / DURATION,
+        np.median(latencies),
+        np.percentile(latencies, 99)
+    ))
+
+
+def main():
+    """"""
+    for rate in [2000, 10000]:
+        for batch_interval in [0, 0.001, 0.002, 0.005]:
+            run(batch_interval, rate, '全部')
+        run(0.002, rate, '最新')
+
+
+if __name__ == '__main__':
+    main()
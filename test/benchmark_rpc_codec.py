@@ -0,0 +1,162 @@
+import os,sys
+sys.path.insert(0,'D:\\GitHub\\Quantitative-analysis-with-Deep-Learning\\quantitative_analysis_with_deep_learning')
+import multiprocessing
+from datetime import datetime
+from time import sleep, time
+
+import numpy as np
+
+from vnpy.event import Event
+from vnpy.rpc import RpcServer, RpcClient
+from vnpy.rpc.codec import CODECS, encode, decode
+from vnpy.trader.constant import Exchange
+from vnpy.trader.object import TickData
+
+
+BURST_COUNT = 100_000
+LATENCY_COUNT = 2000
+REQUEST_COUNT = 2000
+
+
+def make_tick():
+    """"""
+    return TickData(
+        symbol='IF2001',
+        exchange=Exchange.CFFEX,
+        datetime=datetime.now(),
+        name='IF2001',
+        gateway_name='CTP',
+        last_price=4000.2,
+        volume=12345,
+        open_interest=67890,
+        bid_price_1=4000,
+        ask_price_1=4000.4,
+        bid_volume_1=3,
+        ask_volume_1=5
+    )
+
+
+def run_server(codec_name, rep_address, pub_address, ready, done):
+    """
+    服务端进程：先连续推送，再按每毫秒一笔推送，用于测试吞吐和延迟
+    """
+    server = RpcServer()
+    server.set_publish_codec(codec_name)
+    server.register(make_tick)
+    server.start(rep_address, pub_address)
+
+    ready.wait()
+    for _ in range(BURST_COUNT):
+        server.publish('eBurst', Event('eBurst', make_tick()))
+    sleep(1)
+
+    for _ in range(LATENCY_COUNT):
+        server.publish('eLatency', Event('eLatency', make_tick()))
+        sleep(0.001)
+
+    done.wait()
+    server.stop()
+    server.join()
+
+
+class Client(RpcClient):
+    """"""
+
+    def __init__(self):
+        """"""
+        super().__init__()
+        self.count = 0
+        self.first_time = 0
+        self.last_time = 0
+        self.latencies = []
+
+    def callback(self, topic, event):
+        """"""
+        if topic == 'eBurst':
+            self.count += 1
+            self.last_time = time()
+            if self.count == 1:
+                self.first_time = self.last_time
+        else:
+            self.latencies.append((datetime.now() - event.data.datetime).total_seconds())
+
+
+def measure_codec(name, codec):
+    """
+    单进程内编解码耗时和消息大小
+    """
+    event = Event('eTick', make_tick())
+    data = encode(event, codec)
+
+    start = time()
+    for _ in range(BURST_COUNT):
+        encode(event, codec)
+    encode_cost = time() - start
+
+    start = time()
+    for _ in range(BURST_COUNT):
+        decode(data)
+    decode_cost = time() - start
+
+    print('%s：消息%d字节，编码%.0f条/秒，解码%.0f条/秒' % (
+        name, len(data), BURST_COUNT / encode_cost, BURST_COUNT / decode_cost))
+
+
+def run(name, port):
+    """"""
+    rep_address = 'tcp://127.0.0.1:%d' % port
+    pub_address = 'tcp://127.0.0.1:%d' % (port + 1)
+
+    ready = multiprocessing.Event()
+    done = multiprocessing.Event()
+    process = multiprocessing.Process(target=run_server, args=(name, rep_address, pub_address, ready, done))
+    process.start()
+
+    client = Client()
+    client.subscribe_topic('eBurst')
+    client.subscribe_topic('eLatency')
+    client.start(rep_address, pub_address)
+
+    start = time()
+    for _ in range(REQUEST_COUNT):
+        client.make_tick()
+    request_cost = time() - start
+
+    sleep(0.5)
+    ready.set()
+
+    # 推送过快时订阅端会丢弃超过缓存上限的数据
+    start = time()
+    while len(client.latencies) < LATENCY_COUNT and time() - start < 30:
+        sleep(0.1)
+    burst_count = client.count
+    burst_cost = client.last_time - client.first_time
+
+    done.set()
+    client.stop()
+    client.join()
+    process.join()
+
+    latencies = np.array(client.latencies) * 1_000_000
+    print('%s：请求往返%.0f微秒，连续推送接收%d/%d条，%.0f条/秒，逐笔推送延迟中位数%.0f微秒，99%%分位%.0f微秒' % (
+        name,
+        request_cost / REQUEST_COUNT * 1_000_000,
+        burst_count,
+        BURST_COUNT,
+        burst_count / burst_cost,
+        np.median(latencies),
+        np.percentile(latencies, 99)
+    ))
+
+
+def main():
+    """"""
+    for name, codec in CODECS.items():
+        measure_codec(name, codec)
+
+    for n, name in enumerate(CODECS):
+        run(name, 25000 + n * 10)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+import os,sys
+sys.path.insert(0,'D:\\GitHub\\Quantitative-analysis-with-Deep-Learning\\quantitative_analysis_with_deep_learning')
+os.environ['VNPY_TESTING'] = '1'
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from time import time
+
+import numpy as np
+from peewee import chunked
+
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.object import TickData
+from vnpy.trader.database.database import Driver
+from vnpy.trader.database.database_sql import init as init_sql
+
+
+START = datetime(2000, 1, 1)
+END = datetime(2100, 1, 1)
+
+
+def insert_bars(manager, count=1_000_000, seed=0):
+    """
+    直接批量写入1分钟K线，不计入测试时间
+    """
+    rng = np.random.RandomState(seed)
+    close = 3000 + np.cumsum(rng.normal(0, 1, count))
+    dt = datetime(2010, 1, 4, 9, 30)
+
+    rows = []
+    for i in range(count):
+        rows.append({
+            'symbol': 'IF88',
+            'exchange': 'CFFEX',
+            'interval': '1m',
+            'datetime': dt + timedelta(minutes=i),
+            'volume': 100.0,
+            'open_interest': 0.0,
+            'open_price': close[i],
+            'high_price': close[i] + 1,
+            'low_price': close[i] - 1,
+            'close_price': close[i],
+        })
+
+    db = manager.class_bar._meta.database
+    with db.atomic():
+        for c in chunked(rows, 1000):
+            manager.class_bar.insert_many(c).execute()
+
+
+def load_by_model(manager):
+    """
+    原有的逐行生成模型对象再转换为BarData
+    """
+    s = (
+        manager.class_bar.select()
+        .where(
+            (manager.class_bar.symbol == 'IF88')
+            & (manager.class_bar.exchange == 'CFFEX')
+            & (manager.class_bar.interval == '1m')
+            & (manager.class_bar.datetime >= START)
+            & (manager.class_bar.datetime <= END)
+        )
+        .order_by(manager.class_bar.datetime)
+    )
+    return [db_bar.to_bar() for db_bar in s]
+
+
+def measure(name, func, *args):
+    """"""
+    start = time()
+    result = func(*args)
+    cost = time() - start
+
+    count = len(result['datetime']) if isinstance(result, dict) else len(result)
+    print('%s：%d行，耗时%.2f秒，%.0f行/秒' % (name, count, cost, count / cost))
+    return result
+
+
+def check_ticks(manager):
+    """
+    逐行读取tick与原有模型转换结果一致
+    """
+    ticks = []
+    for i in range(1000):
+        tick = TickData(
+            symbol='IF88',
+            exchange=Exchange.CFFEX,
+            datetime=datetime(2019, 1, 2, 9, 30) + timedelta(seconds=i / 2),
+            name='IF主力',
+            last_price=3000 + i,
+            volume=i,
+            bid_price_1=2999 + i,
+            ask_price_1=3001 + i,
+            gateway_name='DB'
+        )
+        if i % 2:
+            tick.bid_price_2 = 2998 + i
+        ticks.append(tick)
+    manager.save_tick_data(ticks)
+
+    s = manager.class_tick.select().order_by(manager.class_tick.datetime)
+    expected = [db_tick.to_tick() for db_tick in s]
+    result = manager.load_tick_data('IF88', Exchange.CFFEX, START, END)
+    assert [t.__dict__ for t in expected] == [t.__dict__ for t in result]
+
+    arrays = manager.load_tick_arrays('IF88', Exchange.CFFEX, START, END)
+    assert np.array_equal(arrays['bid_price_2'], [t.bid_price_2 for t in expected])
+    print('Tick读取结果一致：%d行' % len(result))
+
+
+def main():
+    """"""
+    folder = tempfile.mkdtemp()
+    try:
+        manager = init_sql(Driver.SQLITE, {'database': os.path.join(folder, 'database.db')})
+        insert_bars(manager)
+
+        expected = measure('模型对象读取', load_by_model, manager)
+        result = measure('元组读取BarData', manager.load_bar_data, 'IF88', Exchange.CFFEX, Interval.MINUTE, START, END)
+        measure('读取数组', manager.load_bar_arrays, 'IF88', Exchange.CFFEX, Interval.MINUTE, START, END)
+
+        assert [b.__dict__ for b in expected] == [b.__dict__ for b in result]
+        print('K线读取结果一致')
+
+        check_ticks(manager)
+        manager.class_bar._meta.database.close()
+    finally:
+        shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+import os,sys
+sys.path.insert(0,'D:\\GitHub\\Quantitative-analysis-with-Deep-Learning\\quantitative_analysis_with_deep_learning')
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from vnpy.trader.constant import Direction, Exchange, Offset
+from vnpy.trader.object import TradeData
+from vnpy.trader.pnl import trades_to_arrays, calculate_daily_result, calculate_statistics
+from vnpy.app.cta_strategy.backtesting import DailyResult
+
+
+def make_data(n_days=500, n_trades=3000, seed=0):
+    """
+    随机生成逐日收盘价和成交记录
+    """
+    rng = np.random.RandomState(seed)
+    dates = [date(2015, 1, 5) + timedelta(days=i) for i in range(n_days)]
+    closes = 3000 + np.cumsum(rng.normal(0, 20, n_days))
+
+    trades = []
+    for i in range(n_trades):
+        ix = rng.randint(n_days)
+        trade = TradeData(
+            symbol='IF88',
+            exchange=Exchange.CFFEX,
+            orderid=str(i),
+            tradeid=str(i),
+            direction=Direction.LONG if rng.rand() > 0.5 else Direction.SHORT,
+            offset=Offset.OPEN,
+            price=closes[ix] + rng.normal(0, 5),
+            volume=rng.randint(1, 5),
+            gateway_name='BACKTESTING'
+        )
+        trade.datetime = datetime.combine(dates[ix], datetime.min.time()) + timedelta(hours=10)
+        trades.append(trade)
+    trades.sort(key=lambda t: t.datetime)
+    return dates, closes, trades
+
+
+def reference_result(dates, closes, trades, size, rate, slippage, inverse):
+    """
+    原有的逐日DailyResult循环计算
+    """
+    daily_results = {d: DailyResult(d, c) for d, c in zip(dates, closes)}
+    for trade in trades:
+        daily_results[trade.datetime.date()].add_trade(trade)
+
+    pre_close = 0
+    start_pos = 0
+    for daily_result in daily_results.values():
+        daily_result.calculate_pnl(pre_close, start_pos, size, rate, slippage, inverse)
+        pre_close = daily_result.close_price
+        start_pos = daily_result.end_pos
+
+    results = defaultdict(list)
+    for daily_result in daily_results.values():
+        for key, value in daily_result.__dict__.items():
+            results[key].append(value)
+    return pd.DataFrame.from_dict(results).set_index("date")
+
+
+def reference_statistics(df, capital):
+    """
+    原有的pandas统计指标计算
+    """
+    df["balance"] = df["net_pnl"].cumsum() + capital
+    df["return"] = np.log(df["balance"] / df["balance"].shift(1)).fillna(0)
+    df["highlevel"] = df["balance"].rolling(min_periods=1, window=len(df), center=False).max()
+    df["drawdown"] = df["balance"] - df["highlevel"]
+    df["ddpercent"] = df["drawdown"] / df["highlevel"] * 100
+
+    max_drawdown_end = df["drawdown"].idxmin()
+    max_drawdown_start = df["balance"][:max_drawdown_end].idxmax()
+    total_days = len(df)
+    total_return = (df["balance"].iloc[-1] / capital - 1) * 100
+    daily_return = df["return"].mean() * 100
+    return_std = df["return"].std() * 100
+
+    return {
+        "total_days": total_days,
+        "profit_days": len(df[df["net_pnl"] > 0]),
+        "loss_days": len(df[df["net_pnl"] < 0]),
+        "end_balance": df["balance"].iloc[-1],
+        "max_drawdown": df["drawdown"].min(),
+        "max_ddpercent": df["ddpercent"].min(),
+        "max_drawdown_duration": (max_drawdown_end - max_drawdown_start).days,
+        "total_net_pnl": df["net_pnl"].sum(),
+        "total_commission": df["commission"].sum(),
+        "total_slippage": df["slippage"].sum(),
+        "total_turnover": df["turnover"].sum(),
+        "total_trade_count": df["trade_count"].sum(),
+        "total_return": total_return,
+        "annual_return": total_return / total_days * 240,
+        "daily_return": daily_return,
+        "return_std": return_std,
+        "sharpe_ratio": daily_return / return_std * np.sqrt(240),
+        "return_drawdown_ratio": -total_return / df["ddpercent"].min(),
+    }
+
+
+def check_parity(inverse=False, seed=0):
+    """"""
+    size, rate, slippage, capital = 300, 0.3 / 10000, 0.2, 1_000_000
+    dates, closes, trades = make_data(seed=seed)
+
+    expected = reference_result(dates, closes, trades, size, rate, slippage, inverse)
+    result = calculate_daily_result(dates, closes, *trades_to_arrays(trades), size, rate, slippage, inverse)
+
+    for column in result.columns:
+        assert np.allclose(result[column].values, expected[column].values.astype(float)), column
+
+    expected_statistics = reference_statistics(expected, capital)
+    statistics = calculate_statistics(result, capital)
+    for key, value in expected_statistics.items():
+        assert np.isclose(statistics[key], value), key
+
+    for column in ["balance", "return", "highlevel", "drawdown", "ddpercent"]:
+        assert np.allclose(result[column].values, expected[column].values), column
+
+    print('inverse=%s 逐日盈亏和统计指标一致' % inverse)
+
+
+def main():
+    """"""
+    check_parity(inverse=False)
+    check_parity(inverse=True, seed=1)
+
+
+if __name__ == '__main__':
+    main()
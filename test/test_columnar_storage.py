@@ -0,0 +1,183 @@
+import os,sys
+sys.path.insert(0,'D:\\GitHub\\Quantitative-analysis-with-Deep-Learning\\quantitative_analysis_with_deep_learning')
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.object import BarData, TickData
+from vnpy.trader.columnar import TickRing
+from vnpy.trader.database.database_columnar import ColumnarManager
+
+
+def make_bars(start, n, close=10.0):
+    """
+    生成连续的1分钟K线，收盘价依次加1
+    """
+    bars = []
+    for i in range(n):
+        bars.append(BarData(
+            symbol='IF88',
+            exchange=Exchange.CFFEX,
+            datetime=start + timedelta(minutes=i),
+            interval=Interval.MINUTE,
+            gateway_name='DB',
+            open_price=close + i,
+            high_price=close + i + 1,
+            low_price=close + i - 1,
+            close_price=close + i,
+            volume=i
+        ))
+    return bars
+
+
+def load_closes(manager, start=datetime(2000, 1, 1), end=datetime(2100, 1, 1)):
+    """"""
+    bars = manager.load_bar_data('IF88', Exchange.CFFEX, Interval.MINUTE, start, end)
+    return [bar.datetime for bar in bars], [bar.close_price for bar in bars]
+
+
+def list_files(manager):
+    """"""
+    folder = manager.get_bar_folder('IF88', Exchange.CFFEX, Interval.MINUTE)
+    return sorted(os.listdir(folder))
+
+
+def check_storage(path):
+    """
+    保存、追加写日志、覆盖已有K线、跨月分区和最新K线
+    """
+    manager = ColumnarManager(path)
+    manager.min_compact_size = 10
+
+    start = datetime(2019, 1, 31, 23, 0)
+    assert manager.get_newest_bar_data('IF88', Exchange.CFFEX, Interval.MINUTE) is None
+
+    # 第一次保存写入列文件
+    bars = make_bars(start, 20)
+    manager.save_bar_data(bars)
+    assert list_files(manager) == ['201901.npy']
+    dts, closes = load_closes(manager)
+    assert dts == [bar.datetime for bar in bars]
+    assert closes == [bar.close_price for bar in bars]
+
+    # 之后的数据追加写入日志
+    more = make_bars(start + timedelta(minutes=20), 5, close=30)
+    manager.save_bar_data(more)
+    assert list_files(manager) == ['201901.log', '201901.npy']
+    dts, closes = load_closes(manager)
+    assert dts == [bar.datetime for bar in bars + more]
+    assert closes == [bar.close_price for bar in bars + more]
+
+    # 已有时间的K线被覆盖，并合并日志
+    update = make_bars(start + timedelta(minutes=5), 3, close=100)
+    manager.save_bar_data(update)
+    assert list_files(manager) == ['201901.npy']
+    dts, closes = load_closes(manager)
+    assert len(dts) == 25
+    assert dts == sorted(set(dts))
+    assert closes[5:8] == [100, 101, 102]
+    assert closes[4] == bars[4].close_price and closes[8] == bars[8].close_price
+
+    # 跨月的数据分别写入月份分区
+    cross = make_bars(start + timedelta(minutes=50), 20, close=200)
+    manager.save_bar_data(cross)
+    assert list_files(manager) == ['201901.log', '201901.npy', '201902.npy']
+    dts, closes = load_closes(manager)
+    assert len(dts) == 45
+    assert dts == sorted(dts)
+    assert closes[-20:] == [bar.close_price for bar in cross]
+
+    # 区间查询只读取重叠的分区，包含两端
+    dts, closes = load_closes(manager, datetime(2019, 2, 1), datetime(2019, 2, 1, 0, 5))
+    assert dts[0] == datetime(2019, 2, 1) and dts[-1] == datetime(2019, 2, 1, 0, 5)
+    assert len(dts) == 6
+
+    # 日志超过列文件大小后合并
+    for i in range(10):
+        manager.save_bar_data(make_bars(start + timedelta(minutes=25 + i), 1, close=50 + i))
+    assert '201901.log' not in list_files(manager)
+
+    newest = manager.get_newest_bar_data('IF88', Exchange.CFFEX, Interval.MINUTE)
+    assert newest.datetime == cross[-1].datetime
+    assert newest.close_price == cross[-1].close_price
+    assert newest.volume == cross[-1].volume
+
+    # 新的管理器读取同一目录的结果相同
+    reopened = ColumnarManager(path)
+    assert load_closes(reopened) == load_closes(manager)
+
+    print('列存储保存、追加、覆盖、跨月和最新K线检查通过')
+
+
+def make_tick(volume):
+    """"""
+    return TickData(
+        symbol='IF88',
+        exchange=Exchange.CFFEX,
+        datetime=datetime(2019, 1, 2, 9, 30) + timedelta(seconds=volume),
+        gateway_name='CTP',
+        name='IF主力',
+        volume=volume,
+        last_price=3000 + volume
+    )
+
+
+def check_tick_ring():
+    """
+    环形缓冲读取，被覆盖和正在写入的行计为丢失
+    """
+    ring = TickRing('IF88', Exchange.CFFEX, size=8)
+
+    for i in range(5):
+        assert ring.update_tick(make_tick(i)) == i
+
+    rows, end, lost = ring.read(0)
+    assert rows['volume'].tolist() == [0, 1, 2, 3, 4]
+    assert end == 5 and lost == 0
+
+    rows, end, lost = ring.read(end)
+    assert len(rows) == 0 and end == 5 and lost == 0
+
+    ticks = ring.to_ticks(ring.read(3)[0])
+    assert [t.volume for t in ticks] == [3, 4]
+    assert ticks[0].datetime == make_tick(3).datetime
+    assert ticks[0].name == 'IF主力' and ticks[0].gateway_name == 'CTP'
+
+    for i in range(5, 8):
+        ring.update_tick(make_tick(i))
+
+    # 模拟写入线程已写入第8行但尚未发布seq，第0行正被覆盖
+    ring.buffer[0]['volume'] = 8
+    rows, end, lost = ring.read(0)
+    assert rows['volume'].tolist() == [1, 2, 3, 4, 5, 6, 7]
+    assert end == 8 and lost == 1
+
+    # 写入线程超过读取位置一圈以上
+    for i in range(8, 20):
+        ring.update_tick(make_tick(i))
+    rows, end, lost = ring.read(5)
+    assert rows['volume'].tolist() == list(range(13, 20))
+    assert end == 20 and lost == 8
+
+    # 读取位置之前的行不计为丢失
+    rows, end, lost = ring.read(18, 19)
+    assert rows['volume'].tolist() == [18]
+    assert end == 19 and lost == 0
+
+    print('TickRing覆盖检查通过')
+
+
+def main():
+    """"""
+    path = tempfile.mkdtemp()
+    try:
+        check_storage(path)
+    finally:
+        shutil.rmtree(path)
+
+    check_tick_ring()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+import os,sys
+sys.path.insert(0,'D:\\GitHub\\Quantitative-analysis-with-Deep-Learning\\quantitative_analysis_with_deep_learning')
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.object import BarData
+from vnpy.trader.utility import ArrayManager, CrossSectionalArrayManager
+
+
+SIZE = 30
+
+
+def make_bars(n_symbols=5, n_bars=80, seed=0):
+    """
+    随机生成多只股票的K线，每个时间点所有股票都有K线
+    """
+    rng = np.random.RandomState(seed)
+    vt_symbols = ['%06d.SSE' % (600000 + i) for i in range(n_symbols)]
+
+    steps = []
+    for i in range(n_bars):
+        dt = datetime(2020, 1, 2) + timedelta(days=i)
+        bars = {}
+        for vt_symbol in vt_symbols:
+            close = 10 + rng.normal(0, 1)
+            bars[vt_symbol] = BarData(
+                symbol=vt_symbol.split('.')[0],
+                exchange=Exchange.SSE,
+                datetime=dt,
+                interval=Interval.DAILY,
+                gateway_name='DB',
+                open_price=close + rng.normal(0, 0.1),
+                high_price=close + abs(rng.normal(0, 0.3)),
+                low_price=close - abs(rng.normal(0, 0.3)),
+                close_price=close,
+                volume=rng.randint(100, 1000)
+            )
+        steps.append(bars)
+    return vt_symbols, steps
+
+
+def assert_same(result, expected, name):
+    """"""
+    assert np.allclose(result, expected, equal_nan=True), name
+
+
+def check_indicators(handle, am):
+    """
+    向量化指标和talib指标一致，窗口大于数据长度时为NaN
+    """
+    for n in [5, 14, SIZE, SIZE + 10]:
+        assert_same(handle.sma(n, True), am.sma(n, True), 'sma %d' % n)
+        assert_same(handle.std(n, True), am.std(n, True), 'std %d' % n)
+        assert_same(handle.donchian(n, True), am.donchian(n, True), 'donchian %d' % n)
+
+    for n in [5, 14]:
+        assert_same(handle.ema(n, True), am.ema(n, True), 'ema %d' % n)
+        assert_same(handle.atr(n, True), am.atr(n, True), 'atr %d' % n)
+        assert_same(handle.rsi(n, True), am.rsi(n, True), 'rsi %d' % n)
+        assert_same(handle.mom(n, True), am.mom(n, True), 'mom %d' % n)
+        assert_same(handle.roc(n, True), am.roc(n, True), 'roc %d' % n)
+
+    assert np.isnan(handle.std(SIZE + 10))
+    assert all(np.isnan(handle.donchian(SIZE + 10)))
+
+    # 未向量化的指标使用ArrayManager的talib实现
+    assert_same(handle.cci(14, True), am.cci(14, True), 'cci')
+    assert_same(handle.boll(20, 2, True), am.boll(20, 2, True), 'boll')
+
+
+def check_parity():
+    """"""
+    vt_symbols, steps = make_bars()
+
+    group = CrossSectionalArrayManager(vt_symbols, SIZE)
+    ams = {vt_symbol: ArrayManager(SIZE) for vt_symbol in vt_symbols}
+
+    # 部分句柄在更新前创建，部分在更新过程中创建
+    handles = {vt_symbol: group.get_array_manager(vt_symbol) for vt_symbol in vt_symbols[:2]}
+
+    for i, bars in enumerate(steps):
+        group.update_bars(bars)
+        for vt_symbol, bar in bars.items():
+            ams[vt_symbol].update_bar(bar)
+
+        if i == SIZE // 2:
+            for vt_symbol in vt_symbols[2:]:
+                handles[vt_symbol] = group.get_array_manager(vt_symbol)
+
+        for vt_symbol, handle in handles.items():
+            am = ams[vt_symbol]
+            assert handle.count == am.count
+            assert handle.inited == am.inited
+            assert_same(handle.close_array, am.close_array, 'close')
+            assert_same(handle.high, am.high, 'high')
+
+            if i in [5, SIZE - 1, len(steps) - 1]:
+                check_indicators(handle, am)
+
+    print('%d只股票%d根K线，指标与ArrayManager一致' % (len(vt_symbols), len(steps)))
+
+
+def main():
+    """"""
+    check_parity()
+
+
+if __name__ == '__main__':
+    main()